@@ -2,17 +2,53 @@ import requests
 import pandas as pd
 import json
 import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import List, Dict, Optional
 import os
 
+CACHE_DIR = "data/processed/worldbank"
+
 class WorldBankDataFetcher:
     """
     A class to fetch data from the World Bank API and format it for analysis.
+
+    Requests share one pooled session with retries, indicators are fetched concurrently,
+    every result page is followed, and responses are cached on disk per
+    (indicator, countries, year range).
     """
     
-    def __init__(self):
-        self.base_url = "https://api.worldbank.org/v2"
+    def __init__(self, base_url: str = "https://api.worldbank.org/v2", cache_dir: Optional[str] = CACHE_DIR,
+                 max_workers: int = 8, max_age_days: float = 7, per_page: int = 1000, timeout: float = 30):
+        """
+        Args:
+            base_url: API root (point it at a local fixture server for testing)
+            cache_dir: Directory of cached responses, None disables caching
+            max_workers: Concurrent requests (indicators and pages)
+            max_age_days: Age after which a cached response is revalidated with the API
+            per_page: Records requested per page
+            timeout: Seconds before a request is abandoned
+        """
+        self.base_url = base_url.rstrip("/")
         self.format_param = "format=json"
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.per_page = per_page
+        self.timeout = timeout
+
+        # One keep-alive connection pool for every request, retrying throttling and server errors.
+        # Page downloads run in threads of the indicator threads, so the semaphore caps the
+        # requests in flight at the pool size instead of max_workers squared
+        retry = Retry(total=5, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+        self.request_slots = threading.BoundedSemaphore(max_workers)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         
         # World Bank indicators from your CSV
         self.indicators = {
@@ -28,7 +64,7 @@ class WorldBankDataFetcher:
         url = f"{self.base_url}/country?{self.format_param}&per_page=500"
         
         try:
-            response = requests.get(url)
+            response = self.session.get(url, timeout=self.timeout)
             response.raise_for_status()
             data = response.json()
             
@@ -58,6 +94,111 @@ class WorldBankDataFetcher:
             print(f"Error fetching countries: {e}")
             return pd.DataFrame()
     
+    def _cache_path(self, indicator_code: str, countries: Optional[List[str]], start_year: int, end_year: int) -> str:
+        key = json.dumps([indicator_code, sorted(countries) if countries else 'all', start_year, end_year])
+        return os.path.join(self.cache_dir, f"{indicator_code}_{hashlib.sha256(key.encode()).hexdigest()[:16]}.json")
+
+    def _get_page(self, url: str, page: int, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        with self.request_slots:
+            response = self.session.get(f"{url}&page={page}", headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def _revalidate(self, url: str, cached: dict):
+        """
+        Revalidates a stale cache entry with a conditional request for the same first page
+        the cached ETag / Last-Modified came from. A 304, or the same 'lastupdated' date,
+        means unchanged.
+
+        Returns:
+            (unchanged, the first page response when it was downloaded in full)
+        """
+        headers = {}
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        response = self._get_page(url, 1, headers)
+        if response.status_code == 304:
+            return True, None
+        data = response.json()
+        lastupdated = data[0].get('lastupdated') if data and isinstance(data[0], dict) else None
+        return lastupdated is not None and lastupdated == cached.get('lastupdated'), response
+
+    def _fetch_records(self, url: str, first: Optional[requests.Response] = None):
+        """
+        Fetches every page of a query, the pages after the first one concurrently.
+        'first' reuses an already downloaded first page.
+
+        Returns:
+            (records, metadata of the first page, response headers)
+        """
+        first = first if first is not None else self._get_page(url, 1)
+        data = first.json()
+        if len(data) < 2 or not data[1]:
+            return [], data[0] if data else {}, first.headers
+
+        metadata = data[0]
+        records = list(data[1])
+        pages = int(metadata.get('pages', 1))
+        if pages > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for response in executor.map(lambda page: self._get_page(url, page), range(2, pages + 1)):
+                    records.extend(response.json()[1] or [])
+        return records, metadata, first.headers
+
+    def _get_records(self, indicator_code: str, countries: Optional[List[str]], start_year: int, end_year: int) -> list:
+        """
+        Returns the raw records of one query, from the cache when fresh. Stale entries are
+        revalidated first and only downloaded again when the data changed; if that fails,
+        the stale entry is returned with a warning.
+        """
+        country_string = ';'.join(countries) if countries else 'all'
+        url = (f"{self.base_url}/country/{country_string}/indicator/{indicator_code}"
+               f"?{self.format_param}&date={start_year}:{end_year}&per_page={self.per_page}")
+
+        cached = None
+        path = self._cache_path(indicator_code, countries, start_year, end_year) if self.cache_dir else None
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if time.time() - cached['fetched_at'] < self.max_age_seconds:
+                return cached['records']
+
+        try:
+            unchanged, first = self._revalidate(url, cached) if cached is not None else (False, None)
+            if unchanged:
+                # Same data as cached, only restart its max-age clock
+                records, lastupdated = cached['records'], cached.get('lastupdated')
+                response_headers = {'ETag': cached.get('etag'), 'Last-Modified': cached.get('last_modified')}
+            else:
+                records, metadata, response_headers = self._fetch_records(url, first)
+                lastupdated = metadata.get('lastupdated')
+        except (requests.exceptions.RequestException, ValueError) as e:
+            if cached is None:
+                raise
+            print(f"Warning: could not refresh {indicator_code} ({e}), using the cached copy "
+                  f"from {time.strftime('%Y-%m-%d', time.localtime(cached['fetched_at']))}")
+            return cached['records']
+
+        if path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entry = {
+                'indicator': indicator_code,
+                'countries': sorted(countries) if countries else 'all',
+                'start_year': start_year,
+                'end_year': end_year,
+                'fetched_at': time.time(),
+                'lastupdated': lastupdated,
+                'etag': response_headers.get('ETag'),
+                'last_modified': response_headers.get('Last-Modified'),
+                'records': records,
+            }
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(path + '.tmp', path)
+        return records
+
     def get_indicator_data(self, indicator_code: str, countries: List[str] = None, 
                           start_year: int = 2010, end_year: int = 2023) -> pd.DataFrame:
         """
@@ -69,71 +210,62 @@ class WorldBankDataFetcher:
             start_year: Starting year for data
             end_year: Ending year for data
         """
-        
-        # If no specific countries provided, use 'all'
-        country_string = ';'.join(countries) if countries else 'all'
-        
-        url = (f"{self.base_url}/country/{country_string}/indicator/{indicator_code}"
-               f"?{self.format_param}&date={start_year}:{end_year}&per_page=10000")
-        
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            data = response.json()
-            
-            if len(data) > 1 and data[1]:
-                indicator_data = data[1]
-                df = pd.DataFrame(indicator_data)
-                
-                # Clean the data
-                df = df[['country', 'countryiso3code', 'date', 'value', 'indicator']]
-                df['country_name'] = df['country'].apply(
-                    lambda x: x['value'] if isinstance(x, dict) else x
-                )
-                df['indicator_name'] = df['indicator'].apply(
-                    lambda x: x['value'] if isinstance(x, dict) else x
-                )
-                df['year'] = pd.to_numeric(df['date'])
-                df['indicator_code'] = indicator_code
-                
-                # Select final columns
-                df = df[['countryiso3code', 'country_name', 'year', 'value', 
-                        'indicator_code', 'indicator_name']]
-                
-                # Remove rows with null values
-                df = df.dropna(subset=['value'])
-                df['value'] = pd.to_numeric(df['value'], errors='coerce')
-                
-                return df
-            else:
-                print(f"No data found for indicator {indicator_code}")
-                return pd.DataFrame()
-                
-        except requests.exceptions.RequestException as e:
+            indicator_data = self._get_records(indicator_code, countries, start_year, end_year)
+        except (requests.exceptions.RequestException, ValueError) as e:
             print(f"Error fetching data for {indicator_code}: {e}")
             return pd.DataFrame()
+
+        if not indicator_data:
+            print(f"No data found for indicator {indicator_code}")
+            return pd.DataFrame()
+
+        df = pd.DataFrame(indicator_data)
+        
+        # Clean the data
+        df = df[['country', 'countryiso3code', 'date', 'value', 'indicator']]
+        df['country_name'] = df['country'].apply(
+            lambda x: x['value'] if isinstance(x, dict) else x
+        )
+        df['indicator_name'] = df['indicator'].apply(
+            lambda x: x['value'] if isinstance(x, dict) else x
+        )
+        df['year'] = pd.to_numeric(df['date'])
+        df['indicator_code'] = indicator_code
+        
+        # Select final columns
+        df = df[['countryiso3code', 'country_name', 'year', 'value', 
+                'indicator_code', 'indicator_name']]
+        
+        # Remove rows with null values
+        df = df.dropna(subset=['value'])
+        df['value'] = pd.to_numeric(df['value'], errors='coerce')
+        
+        return df
     
     def get_all_indicators(self, countries: List[str] = None, 
                           start_year: int = 2010, end_year: int = 2023) -> Dict[str, pd.DataFrame]:
         """
-        Fetch data for all indicators defined in the class.
+        Fetch data for all indicators defined in the class, concurrently.
         """
         all_data = {}
+        start = time.perf_counter()
         
-        for indicator_name, indicator_code in self.indicators.items():
-            print(f"Fetching data for {indicator_name} ({indicator_code})...")
-            
-            df = self.get_indicator_data(indicator_code, countries, start_year, end_year)
-            
-            if not df.empty:
-                all_data[indicator_name] = df
-                print(f"✓ Successfully fetched {len(df)} records for {indicator_name}")
-            else:
-                print(f"✗ No data retrieved for {indicator_name}")
-            
-            # Be respectful to the API
-            time.sleep(0.5)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                indicator_name: executor.submit(self.get_indicator_data, indicator_code, countries, start_year, end_year)
+                for indicator_name, indicator_code in self.indicators.items()
+            }
+            for indicator_name, future in futures.items():
+                df = future.result()
+                indicator_code = self.indicators[indicator_name]
+                if not df.empty:
+                    all_data[indicator_name] = df
+                    print(f"✓ Successfully fetched {len(df)} records for {indicator_name} ({indicator_code})")
+                else:
+                    print(f"✗ No data retrieved for {indicator_name} ({indicator_code})")
         
+        print(f"Fetched {len(self.indicators)} indicators in {time.perf_counter() - start:.1f}s")
         return all_data
     
     def combine_indicators(self, data_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
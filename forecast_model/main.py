@@ -1,27 +1,174 @@
+import os
 import argparse
-from utils.preprocessing import prepare_data_pipeline, filter_admin1_data
+import pandas as pd
+from utils.preprocessing import prepare_data_pipeline, filter_admin1_data, BOUNDARIES_PATH
+from utils import boundary_cache
+from utils import model_store
 from models.simple_model import train_and_evaluate_model
+from models.reporting import render_figures, render_reports, sanitize_filename
+from models.batch import run_batch
+from models import pooled_model
+from models.backtest import backtest_region, summarise_backtest
+from config import settings
 
-def forecast_admin1_events(target_admin1: str, target_event: str, clean_data: bool = False):
+def forecast_admin1_events(target_admin1: str, target_event: str, clean_data: bool = False,
+                           update_data: bool = False, geocode: bool = False):
     """
     Full modeling pipeline for a given ADMIN1 region and target event type.
     If clean_data=True, skips processing and loads from saved file.
+    If update_data=True, only ACLED events added since the last build are processed.
+    If geocode=True, events are assigned to regions by their coordinates.
     """
-    model_data = prepare_data_pipeline(clean_data=clean_data)
-    region_data = filter_admin1_data(model_data, target_admin1)
+    model_store_dir = prepare_data_pipeline(clean_data=clean_data, load=False, update=update_data,
+                                            geocode=geocode)
+    region_data = filter_admin1_data(
+        model_store_dir, target_admin1, columns=settings.predictors + [target_event]
+    )
     train_and_evaluate_model(region_data, target_event, region_name=target_admin1)
+    render_figures(target_admin1, target_event)
+
+
+def backtest_admin1_events(target_admin1: str, target_event: str, clean_data: bool = False,
+                           update_data: bool = False, workers: int = 1, geocode: bool = False):
+    """
+    Rolling-origin backtest for a given ADMIN1 region and target event type.
+    Prints MAE/MAPE per forecast horizon and saves every forecast to outputs/.
+    """
+    model_store_dir = prepare_data_pipeline(clean_data=clean_data, load=False, update=update_data,
+                                            geocode=geocode)
+    region_data = filter_admin1_data(
+        model_store_dir, target_admin1, columns=settings.predictors + [target_event]
+    )
+    predictions = backtest_region(region_data, target_event, n_jobs=workers)
+    summary = summarise_backtest(predictions)
+
+    print(f"\nBacktest for {target_event} in {target_admin1}")
+    print(summary.to_string(float_format=lambda x: f"{x:.2f}"))
+
+    os.makedirs("outputs", exist_ok=True)
+    predictions.to_csv(
+        os.path.join("outputs", f"backtest_{sanitize_filename(target_admin1)}_{sanitize_filename(target_event)}.csv"),
+        index=False
+    )
+    return summary
+
+
+def report_regions(regions: list, targets: list, workers: int = None):
+    """
+    Renders figures from stored results for the requested regions only.
+    """
+    paths = render_reports([(region, target) for region in regions for target in targets], workers=workers)
+    print(f"Saved {len(paths)} figures to outputs/figures/")
+    return paths
+
+
+def compare_adjacency():
+    """
+    Rebuilds the Admin-1 boundaries and prints the adjacency edges added and removed
+    relative to the exact 'touches' neighbours, refreshing the boundary cache.
+    """
+    _, neighbor_dict = boundary_cache.load_boundaries(BOUNDARIES_PATH, compare=True)
+    return neighbor_dict
+
+
+def forecast_all_regions(targets: list, clean_data: bool = False, update_data: bool = False,
+                         workers: int = None, results_path: str = None,
+                         pooled: str = None, compare: bool = False, geocode: bool = False):
+    """
+    Batch modeling pipeline: loads the model matrix once and trains every region for
+    every target across a process pool, collecting metrics into one table.
+    Re-running with the same results_path resumes an interrupted run.
+    If pooled is 'hgb' or 'rf', one model per target is trained over all regions instead,
+    and compare=True also times it against the per-region loop.
+    """
+    model_store_dir = prepare_data_pipeline(clean_data=clean_data, load=False, update=update_data,
+                                            geocode=geocode)
+    model_data = model_store.load_model_data(model_store_dir, columns=settings.predictors + targets)
+    regions = list(model_data.index.unique(level='matched_admin1_id'))
+
+    if pooled:
+        results_path = results_path or f"outputs/metrics_pooled_{pooled}.csv"
+        os.makedirs(os.path.dirname(results_path) or '.', exist_ok=True)
+        metrics = pd.concat([
+            pooled_model.train_and_evaluate_pooled_model(model_data, target, model_type=pooled)
+            for target in targets
+        ], ignore_index=True)
+        metrics.to_csv(results_path, index=False)
+        if compare:
+            for target in targets:
+                pooled_model.compare_with_per_region(model_data, target, model_type=pooled)
+        print(f"\nSaved pooled metrics for {len(metrics)} region/target pairs to {results_path}")
+        return metrics
+
+    results_path = results_path or "outputs/metrics.csv"
+    metrics = run_batch(model_data, regions, targets, workers=workers, results_path=results_path)
+    print(f"\nSaved metrics for {len(metrics)} region/target pairs to {results_path}")
+    return metrics
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Forecast conflict events at the Admin1 level.")
-    parser.add_argument("--region", type=str, required=True, help="Target ADMIN1 region name")
-    parser.add_argument("--event", type=str, required=True, help="Target event type (e.g., Battles)")
+    parser.add_argument("--region", type=str, help="Target ADMIN1 region name")
+    parser.add_argument("--event", type=str, help="Target event type (e.g., Battles)")
+    parser.add_argument("--all-regions", action="store_true", help="Train every region in one batch run")
+    parser.add_argument("--targets", type=str, nargs="+",
+                        help="Target event types for batch runs, or 'all' for every type in settings.targets")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for batch runs (default: all CPUs)")
+    parser.add_argument("--results", type=str, default=None,
+                        help="Metrics table for batch runs (default: outputs/metrics.csv, or outputs/metrics_pooled_<model>.csv)")
+    parser.add_argument("--report", type=str, nargs="+",
+                        help="Render figures from stored results for these regions (with --targets)")
+    parser.add_argument("--backtest", action="store_true",
+                        help="With --region and --event, run a rolling-origin backtest (parallel over --workers)")
+    parser.add_argument("--pooled", type=str, choices=["hgb", "rf"],
+                        help="With --all-regions, train one model per target over all regions")
+    parser.add_argument("--compare", action="store_true", help="With --pooled, compare against the per-region models")
     parser.add_argument("--clean-data", action="store_true", help="Run full data cleaning pipeline")
+    parser.add_argument("--update-data", action="store_true", help="Incrementally add new ACLED events to the saved data")
+    parser.add_argument("--compare-adjacency", action="store_true",
+                        help="Rebuild the region adjacency and print its edge diff against exact 'touches' neighbours")
+    parser.add_argument("--geocode", action="store_true",
+                        help="Assign events to regions by their coordinates, with name matching as fallback")
 
     args = parser.parse_args()
 
-    forecast_admin1_events(
-        target_admin1=args.region,
-        target_event=args.event,
-        clean_data=args.clean_data
-    )
\ No newline at end of file
+    if args.targets is None or args.targets == ["all"]:
+        targets = settings.targets
+    else:
+        targets = args.targets
+
+    if args.compare_adjacency:
+        compare_adjacency()
+    elif args.report:
+        report_regions(args.report, targets, workers=args.workers)
+    elif args.all_regions:
+        forecast_all_regions(
+            targets=targets,
+            clean_data=args.clean_data,
+            update_data=args.update_data,
+            workers=args.workers,
+            results_path=args.results,
+            pooled=args.pooled,
+            compare=args.compare,
+            geocode=args.geocode
+        )
+    else:
+        if args.region is None or args.event is None:
+            parser.error("--region and --event are required unless --all-regions, --report or --compare-adjacency is given")
+        if args.backtest:
+            backtest_admin1_events(
+                target_admin1=args.region,
+                target_event=args.event,
+                clean_data=args.clean_data,
+                update_data=args.update_data,
+                workers=args.workers or 1,
+                geocode=args.geocode
+            )
+        else:
+            forecast_admin1_events(
+                target_admin1=args.region,
+                target_event=args.event,
+                clean_data=args.clean_data,
+                update_data=args.update_data,
+                geocode=args.geocode
+            )
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.ensemble import RandomForestRegressor
+from config import settings
+from models.simple_model import mean_absolute_percentage_error
+
+
+def horizon_features(X: pd.DataFrame, horizon: int) -> pd.DataFrame:
+    """
+    Features for predicting 'horizon' months ahead: the '(t-1)' lag columns are taken
+    from 'horizon - 1' rows earlier, so every lag is already observed at the forecast
+    origin. Calendar features and weights stay those of the predicted month.
+    """
+    if horizon == 1:
+        return X
+    X = X.copy()
+    lag_cols = [col for col in X.columns if col.endswith('(t-1)')]
+    X[lag_cols] = X[lag_cols].shift(horizon - 1)
+    return X
+
+
+def _run_origin_block(region_data, target_event, origins, first_index, horizon, base_trees, trees_per_origin):
+    """
+    Walks a contiguous block of forecast origins with one warm-started forest per horizon.
+
+    Horizon h is forecast directly from lag-h features ('horizon_features'), so no
+    forecast uses data observed after its origin. The forest at the k-th origin overall
+    ('first_index' is the block's first k) has 'base_trees + k * trees_per_origin' trees,
+    whatever the block split: the block starts with a cold fit of that size and each later
+    origin keeps the existing trees and grows 'trees_per_origin' new ones on the extended
+    history, instead of refitting the whole forest.
+    """
+    X = region_data[settings.predictors]
+    y = region_data[target_event]
+    weights = region_data["importance_weight"]
+
+    features = [horizon_features(X, h) for h in range(1, horizon + 1)]
+    forests = [RandomForestRegressor(warm_start=True, random_state=42) for _ in features]
+    rows = []
+    for i, origin in enumerate(origins):
+        for h, (X_h, rf) in enumerate(zip(features, forests), start=1):
+            target_row = origin + h - 1
+            if target_row >= len(region_data):
+                break
+            # Rows before h - 1 have no lag-h features
+            train = slice(h - 1, origin)
+            rf.n_estimators = base_trees + trees_per_origin * (first_index + i)
+            rf.fit(X_h.iloc[train], y.iloc[train], sample_weight=weights.iloc[train])
+
+            rows.append({
+                'origin': y.index[origin - 1],
+                'month_year': y.index[target_row],
+                'horizon': h,
+                'actual': y.iloc[target_row],
+                'predicted': rf.predict(X_h.iloc[[target_row]])[0],
+            })
+    return rows
+
+
+def backtest_region(region_data: pd.DataFrame, target_event: str, min_train: int = 24, horizon: int = 6,
+                    base_trees: int = 100, trees_per_origin: int = 10, n_jobs: int = 1) -> pd.DataFrame:
+    """
+    Rolling-origin backtest for one region: the forecast origin moves forward one month
+    at a time across the whole history, and the following 'horizon' months are predicted
+    from each origin.
+
+    Each horizon has its own model on lag-h features, so an h-month forecast only uses
+    data observed at its origin. Origins are split into 'n_jobs' contiguous blocks that
+    run in parallel processes; within a block the forests are warm-started rather than
+    refitted from scratch, with the same number of trees at each origin for any 'n_jobs'.
+
+    Parameters:
+        region_data (pd.DataFrame): One region's rows indexed by month_year, in time order.
+        target_event (str): Target event type.
+        min_train (int): Months of history before the first origin.
+        horizon (int): Months predicted from each origin.
+        base_trees (int): Trees at the first origin.
+        trees_per_origin (int): Trees added at every following origin.
+        n_jobs (int): Number of parallel origin blocks.
+
+    Returns:
+        pd.DataFrame: One row per (origin, horizon) with actual and predicted counts.
+    """
+    origins = list(range(min_train, len(region_data)))
+    if not origins:
+        raise ValueError(f"Need more than {min_train} months of data to backtest, got {len(region_data)}")
+
+    blocks = [block for block in np.array_split(np.arange(len(origins)), min(n_jobs, len(origins))) if len(block)]
+    args = [
+        (region_data, target_event, [origins[k] for k in block], int(block[0]), horizon, base_trees, trees_per_origin)
+        for block in blocks
+    ]
+
+    if len(blocks) == 1:
+        results = [_run_origin_block(*args[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=len(blocks)) as executor:
+            results = list(executor.map(_run_origin_block, *zip(*args)))
+
+    return pd.DataFrame([row for block_rows in results for row in block_rows])
+
+
+def summarise_backtest(predictions: pd.DataFrame) -> pd.DataFrame:
+    """
+    MAE and MAPE per forecast horizon from 'backtest_region' output.
+    """
+    summary = {
+        horizon: {
+            'mae': (group['actual'] - group['predicted']).abs().mean(),
+            'mape': mean_absolute_percentage_error(group['actual'], group['predicted']),
+            'n_forecasts': len(group),
+        }
+        for horizon, group in predictions.groupby('horizon')
+    }
+    return pd.DataFrame.from_dict(summary, orient='index').rename_axis('horizon')
@@ -0,0 +1,71 @@
+import os
+import csv
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+from models.simple_model import train_and_evaluate_model
+
+METRICS_COLUMNS = ['region', 'target', 'mae', 'mape']
+
+
+def load_completed(results_path: str) -> set:
+    """
+    Returns the (region, target) pairs already recorded in a metrics file.
+    """
+    if not os.path.exists(results_path):
+        return set()
+    done = pd.read_csv(results_path, usecols=['region', 'target'])
+    return set(zip(done['region'], done['target']))
+
+
+def _evaluate_task(region_data, target_event, region_name):
+    mae, mape = train_and_evaluate_model(region_data, target_event, region_name=region_name)
+    return region_name, target_event, mae, mape
+
+
+def run_batch(model_data: pd.DataFrame, regions: list, targets: list, workers: int = None,
+              results_path: str = "outputs/metrics.csv") -> pd.DataFrame:
+    """
+    Trains and evaluates one model per (region, target) pair across a process pool.
+
+    Each finished pair is appended to 'results_path' straight away, and pairs already
+    in that file are skipped, so an interrupted run resumes where it stopped.
+
+    Parameters:
+        model_data (pd.DataFrame): Model matrix MultiIndexed by (matched_admin1_id, month_year).
+        regions (list): Admin1 ids to model.
+        targets (list): Target event types.
+        workers (int): Number of worker processes (default: number of CPUs).
+        results_path (str): CSV file collecting the metrics table.
+
+    Returns:
+        pd.DataFrame: The full metrics table, including results from earlier runs.
+    """
+    completed = load_completed(results_path)
+    tasks = [(region, target) for region in regions for target in targets if (region, target) not in completed]
+    print(f"{len(completed)} region/target pairs already done, {len(tasks)} to run.")
+
+    os.makedirs(os.path.dirname(results_path) or '.', exist_ok=True)
+    write_header = not os.path.exists(results_path)
+
+    with open(results_path, "a", newline="", encoding="utf-8") as f, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(METRICS_COLUMNS)
+            f.flush()
+
+        futures = {
+            executor.submit(_evaluate_task, model_data.loc[region], target, region): (region, target)
+            for region, target in tasks
+        }
+        for future in tqdm(as_completed(futures), "Training models", total=len(futures)):
+            region, target = futures[future]
+            try:
+                writer.writerow(future.result())
+                f.flush()
+            except Exception as e:
+                # Not recorded, so it is retried on the next run
+                print(f"Failed for {target} in {region}: {e}")
+
+    return pd.read_csv(results_path)
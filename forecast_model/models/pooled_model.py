@@ -0,0 +1,131 @@
+import time
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+from config import settings
+from models.simple_model import fit_region_model, mean_absolute_percentage_error
+from utils.model_store import country_code
+
+ENCODING_FEATURES = ['country_code', 'region_target_mean', 'country_target_mean']
+
+
+def split_panel(model_data: pd.DataFrame, test_months: int = 6):
+    """
+    Splits the panel the same way as the per-region model: the last 'test_months'
+    rows of every region are held out.
+
+    Returns:
+        tuple: (train_data, test_data)
+    """
+    from_end = model_data.groupby(level='matched_admin1_id', sort=False).cumcount(ascending=False)
+    is_test = (from_end < test_months).to_numpy()
+    return model_data[~is_test], model_data[is_test]
+
+
+def add_region_encodings(train_data: pd.DataFrame, test_data: pd.DataFrame, target_event: str):
+    """
+    Adds region/country features to both splits: an ordinal country code and the mean
+    target count per region and per country, computed on the training rows only.
+    """
+    train_regions = train_data.index.get_level_values('matched_admin1_id')
+    test_regions = test_data.index.get_level_values('matched_admin1_id')
+    train_countries = train_regions.map(country_code)
+    test_countries = test_regions.map(country_code)
+
+    countries = pd.Index(sorted(set(train_countries) | set(test_countries)))
+    region_means = train_data[target_event].groupby(train_regions).mean()
+    country_means = train_data[target_event].groupby(train_countries).mean()
+    global_mean = train_data[target_event].mean()
+
+    encoded = []
+    for data, regions, data_countries in [(train_data, train_regions, train_countries),
+                                          (test_data, test_regions, test_countries)]:
+        data = data.copy()
+        data['country_code'] = countries.get_indexer(data_countries)
+        data['region_target_mean'] = regions.map(region_means).fillna(global_mean).to_numpy()
+        data['country_target_mean'] = data_countries.map(country_means).fillna(global_mean).to_numpy()
+        encoded.append(data)
+
+    return encoded[0], encoded[1], len(countries)
+
+
+def train_and_evaluate_pooled_model(model_data: pd.DataFrame, target_event: str, model_type: str = 'hgb',
+                                    test_months: int = 6):
+    """
+    Trains one model over all regions instead of one forest per region, and predicts
+    the held-out months of every region in a single call.
+
+    Parameters:
+        model_data (pd.DataFrame): Model matrix MultiIndexed by (matched_admin1_id, month_year).
+        target_event (str): Target event type.
+        model_type (str): 'hgb' for HistGradientBoostingRegressor, 'rf' for a pooled random forest.
+        test_months (int): Months held out per region.
+
+    Returns:
+        pd.DataFrame: Per-region metrics with columns ['region', 'target', 'mae', 'mape'].
+    """
+    train_data, test_data = split_panel(model_data, test_months)
+    train_data, test_data, n_countries = add_region_encodings(train_data, test_data, target_event)
+
+    features = settings.predictors + ENCODING_FEATURES
+    X_train, y_train = train_data[features], train_data[target_event]
+    X_test, y_test = test_data[features], test_data[target_event]
+
+    if model_type == 'hgb':
+        # Country codes are native categoricals when they fit in the histogram bins
+        categorical = [f == 'country_code' and n_countries <= 255 for f in features]
+        model = HistGradientBoostingRegressor(categorical_features=categorical, random_state=42)
+    elif model_type == 'rf':
+        model = RandomForestRegressor(n_estimators=100, min_samples_leaf=5, n_jobs=-1, random_state=42)
+        X_train, X_test = X_train.fillna(0), X_test.fillna(0)
+    else:
+        raise ValueError(f"Unknown pooled model type: {model_type}")
+
+    model.fit(X_train, y_train, sample_weight=train_data["importance_weight"])
+    y_pred = pd.Series(model.predict(X_test), index=y_test.index)
+
+    regions = y_test.index.get_level_values('matched_admin1_id')
+    metrics = pd.DataFrame({
+        'mae': (y_test - y_pred).abs().groupby(regions, sort=False).mean(),
+        'mape': pd.Series({
+            region: mean_absolute_percentage_error(y_test.loc[region], y_pred.loc[region])
+            for region in regions.unique()
+        }),
+    })
+    metrics.index.name = 'region'
+    metrics = metrics.reset_index()
+    metrics.insert(1, 'target', target_event)
+
+    return metrics
+
+
+def compare_with_per_region(model_data: pd.DataFrame, target_event: str, model_type: str = 'hgb',
+                            regions: list = None) -> pd.DataFrame:
+    """
+    Times the pooled model against the per-region random forest loop on the same
+    regions and reports wall-clock time and mean MAE for both.
+    """
+    if regions is not None:
+        model_data = model_data.loc[model_data.index.get_level_values('matched_admin1_id').isin(regions)]
+    regions = list(model_data.index.unique(level='matched_admin1_id'))
+
+    start = time.perf_counter()
+    pooled = train_and_evaluate_pooled_model(model_data, target_event, model_type=model_type)
+    pooled_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    per_region_mae = []
+    for region in regions:
+        _, _, y_test, y_pred = fit_region_model(model_data.loc[region], target_event)
+        per_region_mae.append(mean_absolute_error(y_test, y_pred))
+    per_region_time = time.perf_counter() - start
+
+    comparison = pd.DataFrame({
+        'wall_clock_s': [pooled_time, per_region_time],
+        'mean_mae': [pooled['mae'].mean(), np.mean(per_region_mae)],
+    }, index=[f'pooled ({model_type})', 'per-region rf'])
+
+    print(f"\nPooled vs per-region models for {target_event} ({len(regions)} regions)")
+    print(comparison.to_string(float_format=lambda x: f"{x:.2f}"))
+    return comparison
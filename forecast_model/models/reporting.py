@@ -0,0 +1,125 @@
+import os
+import json
+import glob
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import matplotlib
+matplotlib.use("Agg")  # headless rendering, safe in worker processes
+from matplotlib.figure import Figure
+import pandas as pd
+from tqdm import tqdm
+
+RESULTS_DIR = "outputs/results"
+FIGURES_DIR = "outputs/figures"
+
+
+def sanitize_filename(name: str) -> str:
+    return name.replace("/", "_").replace(" ", "_").replace(":", "_")
+
+
+def result_path(region_name: str, target_event: str, results_dir: str = RESULTS_DIR) -> str:
+    return os.path.join(results_dir, f"{sanitize_filename(region_name)}__{sanitize_filename(target_event)}.json")
+
+
+def save_result(region_name, target_event, y_test, y_pred, importances, mae, mape,
+                results_dir: str = RESULTS_DIR) -> str:
+    """
+    Writes the test-period predictions and feature importances of one trained model
+    to the results store (one JSON file per region/target pair).
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    result = {
+        'region': region_name,
+        'target': target_event,
+        'mae': float(mae),
+        'mape': float(mape),
+        'months': [str(month) for month in y_test.index],
+        'actual': [float(value) for value in y_test],
+        'predicted': [float(value) for value in y_pred],
+        'feature_importance': {feature: float(value) for feature, value in importances.items()},
+    }
+    path = result_path(region_name, target_event, results_dir)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False)
+    return path
+
+
+def load_result(region_name: str, target_event: str, results_dir: str = RESULTS_DIR) -> dict:
+    with open(result_path(region_name, target_event, results_dir), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_metrics(results_dir: str = RESULTS_DIR) -> pd.DataFrame:
+    """
+    Collects the metrics of every stored result into one table.
+    """
+    rows = []
+    for path in sorted(glob.glob(os.path.join(results_dir, "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+        rows.append({key: result[key] for key in ('region', 'target', 'mae', 'mape')})
+    return pd.DataFrame(rows, columns=['region', 'target', 'mae', 'mape'])
+
+
+def render_figures(region_name: str, target_event: str, results_dir: str = RESULTS_DIR,
+                   output_dir: str = FIGURES_DIR) -> list:
+    """
+    Renders the forecast and feature importance plots for one stored result.
+
+    Returns:
+        list: Paths of the saved figures.
+    """
+    result = load_result(region_name, target_event, results_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    name = f"{sanitize_filename(region_name)}_{sanitize_filename(target_event)}"
+
+    # --- Plot 1: Predictions vs Actual ---
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    ax.plot(result['actual'], label='Actual', marker='o')
+    ax.plot(result['predicted'], label='Predicted', marker='x')
+    ax.set_title(f'{target_event} in {region_name}: Predictions vs Actual')
+    ax.set_xlabel('Month Index')
+    ax.set_ylabel('Event Count')
+    ax.legend()
+    ax.grid(True)
+    fig.tight_layout()
+
+    forecast_path = os.path.join(output_dir, f"forecast_{name}.png")
+    fig.savefig(forecast_path)
+
+    # --- Plot 2: Feature Importance ---
+    importance_series = pd.Series(result['feature_importance']).sort_values()
+
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    importance_series.plot(kind='barh', title=f'Feature Importance: {target_event} in {region_name}', ax=ax)
+    fig.tight_layout()
+
+    importance_path = os.path.join(output_dir, f"feature_importance_{name}.png")
+    fig.savefig(importance_path)
+
+    return [forecast_path, importance_path]
+
+
+def render_reports(pairs: list, workers: int = None, results_dir: str = RESULTS_DIR,
+                   output_dir: str = FIGURES_DIR) -> list:
+    """
+    Renders figures for the requested (region, target) pairs on a background process pool.
+    Pairs without a stored result are reported and skipped.
+
+    Returns:
+        list: Paths of all saved figures.
+    """
+    paths = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(render_figures, region, target, results_dir, output_dir): (region, target)
+            for region, target in pairs
+        }
+        for future in tqdm(as_completed(futures), "Rendering figures", total=len(futures)):
+            region, target = futures[future]
+            try:
+                paths.extend(future.result())
+            except FileNotFoundError:
+                print(f"No stored result for {target} in {region}; train it first.")
+    return paths
@@ -1,23 +1,32 @@
-import os
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error
 from config import settings
+from models.reporting import save_result, RESULTS_DIR
 
-def sanitize_filename(name: str) -> str:
-    return name.replace("/", "_").replace(" ", "_").replace(":", "_")
-    
 
-def train_and_evaluate_model(region_data, target_event, region_name=None):
-    # Ensure output directory exists
-    output_dir = "outputs/figures"
-    os.makedirs(output_dir, exist_ok=True)
+def mean_absolute_percentage_error(y_true, y_pred):
+    """
+    MAPE in percent over the months with non-zero actual counts.
+    """
+    y_true = np.asarray(y_true, dtype=float)
+    y_pred = np.asarray(y_pred, dtype=float)
+    nonzero = y_true != 0
+    return np.mean(np.abs((y_true[nonzero] - y_pred[nonzero]) / y_true[nonzero])) * 100
 
+
+def fit_region_model(region_data, target_event, test_months=6):
+    """
+    Fits the per-region random forest on all but the last 'test_months' rows and
+    predicts the held-out months.
+
+    Returns:
+        tuple: (fitted model, X_train, y_test, y_pred)
+    """
     # Split train/test
-    train_data = region_data.iloc[:-6]
-    test_data = region_data.iloc[-6:]
+    train_data = region_data.iloc[:-test_months]
+    test_data = region_data.iloc[-test_months:]
 
     X_train = train_data[settings.predictors]
     X_test = test_data[settings.predictors]
@@ -29,39 +38,26 @@ def train_and_evaluate_model(region_data, target_event, region_name=None):
     rf.fit(X_train, y_train, sample_weight=train_data["importance_weight"])
     y_pred = rf.predict(X_test)
 
+    return rf, X_train, y_test, y_pred
+
+
+def train_and_evaluate_model(region_data, target_event, region_name=None, results_dir=RESULTS_DIR):
+    """
+    Trains and evaluates the per-region model and stores its test-period predictions
+    and feature importances in the results store. Figures are not drawn here; render
+    them afterwards with 'models.reporting.render_figures' for the regions of interest.
+    """
+    rf, X_train, y_test, y_pred = fit_region_model(region_data, target_event)
+
     # Metrics
     mae = mean_absolute_error(y_test, y_pred)
-    mape = np.mean(np.abs((y_test[y_test != 0] - y_pred[y_test != 0]) / y_test[y_test != 0])) * 100
+    mape = mean_absolute_percentage_error(y_test, y_pred)
 
     print(f"\nForecast Results for {target_event} in {region_name}")
     print(f"MAE: {mae:.2f}")
     print(f"MAPE: {mape:.2f}%")
 
-    # --- Plot 1: Predictions vs Actual ---
-    plt.figure(figsize=(10, 5))
-    plt.plot(y_test.values, label='Actual', marker='o')
-    plt.plot(y_pred, label='Predicted', marker='x')
-    plt.title(f'{target_event} in {region_name}: Predictions vs Actual')
-    plt.xlabel('Month Index')
-    plt.ylabel('Event Count')
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-
-    forecast_path = os.path.join(output_dir, f"forecast_{sanitize_filename(region_name)}_{sanitize_filename(target_event)}.png")
-    plt.savefig(forecast_path)
-    plt.close()
-
-    # --- Plot 2: Feature Importance ---
-    importances = rf.feature_importances_
-    importance_series = pd.Series(importances, index=X_train.columns).sort_values()
-
-    plt.figure(figsize=(8, 6))
-    importance_series.plot(kind='barh', title=f'Feature Importance: {target_event} in {region_name}')
-    plt.tight_layout()
-
-    importance_path = os.path.join(output_dir, f"feature_importance_{sanitize_filename(region_name)}_{sanitize_filename(target_event)}.png")
-    plt.savefig(importance_path)
-    plt.close()
+    importance_series = pd.Series(rf.feature_importances_, index=X_train.columns)
+    save_result(region_name, target_event, y_test, y_pred, importance_series, mae, mape, results_dir)
 
     return mae, mape
@@ -0,0 +1,116 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from tqdm import tqdm
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+ACLED_COLUMNS = [
+    'event_id_cnty', 'country', 'admin1', 'event_type', 'sub_event_type', 'event_date', 'year',
+    'latitude', 'longitude'
+]
+
+ACLED_DTYPES = {
+    'event_id_cnty': str,
+    'country': 'category',
+    'admin1': 'category',
+    'event_type': 'category',
+    'sub_event_type': 'category',
+    'event_date': 'category',
+    'year': np.int16,
+    # ACLED reports coordinates to 4 decimals (~11 m), well within float32 precision
+    'latitude': np.float32,
+    'longitude': np.float32,
+}
+
+ACLED_DATE_FORMAT = '%d %B %Y'
+
+
+def peak_rss_mb() -> float:
+    """
+    Returns the peak resident set size of the current process in MB (None if unavailable).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def _concat_chunks(chunks: list) -> pd.DataFrame:
+    """
+    Concatenates chunks, merging per-chunk categories so categorical columns stay categorical.
+    """
+    if not chunks:
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in ACLED_DTYPES.items()})
+
+    combined = {}
+    for col in chunks[0].columns:
+        if isinstance(chunks[0][col].dtype, pd.CategoricalDtype):
+            # Categories of rows dropped by the year filter are discarded here
+            combined[col] = union_categoricals([chunk[col] for chunk in chunks]).remove_unused_categories()
+        else:
+            combined[col] = np.concatenate([chunk[col].to_numpy() for chunk in chunks])
+    return pd.DataFrame(combined)
+
+
+def add_event_dates(df: pd.DataFrame, date_format: str = ACLED_DATE_FORMAT) -> pd.DataFrame:
+    """
+    Adds 'date' and 'month_year' columns by parsing each distinct 'event_date' string once
+    and mapping the result back through the categorical codes.
+    """
+    event_dates = df['event_date'].astype('category').cat
+    parsed = pd.to_datetime(event_dates.categories, format=date_format)
+    codes = event_dates.codes.to_numpy()
+    missing = codes == -1
+
+    dates = parsed.values.take(codes)
+    dates[missing] = np.datetime64('NaT')
+    df['date'] = dates
+
+    month_years = parsed.to_period('M').astype(str).to_numpy(dtype=object).take(codes)
+    month_years[missing] = None
+    df['month_year'] = month_years
+    return df
+
+
+def load_acled_events(path: str, min_year: int = 2018, chunksize: int = 500_000) -> pd.DataFrame:
+    """
+    Streams the raw ACLED export in chunks, keeping only the columns used downstream
+    with compact dtypes and dropping rows before 'min_year' as each chunk is read.
+
+    Parameters:
+        path (str): Path to the ACLED CSV export.
+        min_year (int): Earliest event year to keep.
+        chunksize (int): Rows per chunk.
+
+    Returns:
+        pd.DataFrame: Filtered events with 'date' and 'month_year' columns added.
+    """
+    start_time = time.perf_counter()
+    rows_read = 0
+    chunks = []
+
+    reader = pd.read_csv(path, usecols=ACLED_COLUMNS, dtype=ACLED_DTYPES, chunksize=chunksize)
+    for chunk in tqdm(reader, "Reading ACLED chunks"):
+        rows_read += len(chunk)
+        chunk = chunk[chunk['year'] >= min_year]
+        if not chunk.empty:
+            chunks.append(chunk.reset_index(drop=True))
+
+    df = _concat_chunks(chunks)
+    df = add_event_dates(df)
+
+    elapsed = time.perf_counter() - start_time
+    rss = peak_rss_mb()
+    print(f"Loaded {len(df):,} of {rows_read:,} ACLED rows in {elapsed:.1f}s "
+          f"({rows_read / max(elapsed, 1e-9):,.0f} rows/sec)")
+    if rss is not None:
+        print(f"Peak RSS: {rss:,.0f} MB")
+
+    return df
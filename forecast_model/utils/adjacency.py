@@ -0,0 +1,194 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import shapely
+
+# Polygons closer than this (in degrees, ~1 km at the equator) are neighbours, so slivers
+# and gaps between neighbouring Natural Earth / World Bank polygons do not drop edges
+NEIGHBOR_DISTANCE = 0.01
+# Simplification before the distance tests; kept well below NEIGHBOR_DISTANCE
+SIMPLIFY_TOLERANCE = 0.001
+POLYGON_TYPES = [int(shapely.GeometryType.POLYGON), int(shapely.GeometryType.MULTIPOLYGON)]
+
+_geometries = None
+
+
+def repair_geometries(geometries, simplify_tolerance: float = SIMPLIFY_TOLERANCE) -> np.ndarray:
+    """
+    Repairs polygons with 'make_valid', keeps only their polygonal parts (make_valid can
+    return lines or points alongside them) and simplifies them, all as array operations.
+
+    Parameters:
+        geometries: Array of WKB bytes or shapely geometries.
+        simplify_tolerance (float): Simplification tolerance in degrees (0 to skip).
+
+    Returns:
+        np.ndarray: Repaired geometries in the same order (empty where nothing polygonal is left).
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    if len(geometries) and isinstance(geometries[0], (bytes, bytearray)):
+        geometries = shapely.from_wkb(geometries)
+    geometries = geometries.copy()
+    invalid = ~shapely.is_valid(geometries)
+    geometries[invalid] = shapely.make_valid(geometries[invalid])
+
+    parts, index = shapely.get_parts(geometries, return_index=True)
+    polygonal = np.isin(shapely.get_type_id(parts), POLYGON_TYPES)
+    parts, index = parts[polygonal], index[polygonal]
+    parts, part_index = shapely.get_parts(parts, return_index=True)  # split multipolygons
+    repaired = np.full(len(geometries), shapely.from_wkt('MULTIPOLYGON EMPTY'), dtype=object)
+    if len(parts):
+        owners = index[part_index]
+        present = np.unique(owners)
+        repaired[present] = shapely.multipolygons(parts, indices=np.searchsorted(present, owners))
+
+    if simplify_tolerance:
+        # Distance tests do not need valid output, so skip the much slower topology-preserving
+        # mode; polygons smaller than the tolerance would collapse and keep their full outline
+        simplified = shapely.simplify(repaired, simplify_tolerance, preserve_topology=False)
+        collapsed = shapely.is_empty(simplified) & ~shapely.is_empty(repaired)
+        simplified[collapsed] = repaired[collapsed]
+        repaired = simplified
+    return repaired
+
+
+def candidate_pairs(geometries: np.ndarray, distance: float = NEIGHBOR_DISTANCE) -> np.ndarray:
+    """
+    Pairs (i < j) of geometries whose bounding boxes come within 'distance' of each other,
+    from one bulk STRtree query.
+    """
+    tree = shapely.STRtree(geometries)
+    xmin, ymin, xmax, ymax = shapely.bounds(geometries).T
+    boxes = shapely.box(xmin - distance, ymin - distance, xmax + distance, ymax + distance)
+    boxes[shapely.is_empty(geometries)] = None
+    left, right = tree.query(boxes)
+    keep = left < right
+    return np.column_stack([left[keep], right[keep]])
+
+
+def _init_worker(geometries):
+    global _geometries
+    _geometries = shapely.from_wkb(geometries)
+    shapely.prepare(_geometries)
+
+
+def _within_distance(pairs: np.ndarray, distance: float) -> np.ndarray:
+    return pairs[shapely.dwithin(_geometries[pairs[:, 0]], _geometries[pairs[:, 1]], distance)]
+
+
+def _partition_pairs(pairs: np.ndarray, countries: np.ndarray, n_tasks: int) -> list:
+    """
+    Splits candidate pairs into tasks: pairs within one country stay together and countries
+    are packed into about 'n_tasks' tasks by pair count, cross-border pairs are split evenly.
+    """
+    same_country = countries[pairs[:, 0]] == countries[pairs[:, 1]]
+    inner, cross = pairs[same_country], pairs[~same_country]
+
+    tasks = []
+    if len(inner):
+        country_codes, inner_country = np.unique(countries[inner[:, 0]], return_inverse=True)
+        order = np.argsort(inner_country, kind='stable')
+        bounds = np.searchsorted(inner_country[order], np.arange(len(country_codes) + 1))
+        by_country = [inner[order[a:b]] for a, b in zip(bounds[:-1], bounds[1:])]
+
+        # Largest countries first, each into the currently smallest task
+        loads = [[] for _ in range(min(n_tasks, len(by_country)))]
+        sizes = np.zeros(len(loads), dtype=np.int64)
+        for group in sorted(by_country, key=len, reverse=True):
+            smallest = sizes.argmin()
+            loads[smallest].append(group)
+            sizes[smallest] += len(group)
+        tasks.extend(np.concatenate(load) for load in loads)
+    if len(cross):
+        tasks.extend(np.array_split(cross, min(n_tasks, len(cross))))
+    return tasks
+
+
+def build_admin1_neighbors(gdf, distance: float = NEIGHBOR_DISTANCE,
+                           simplify_tolerance: float = SIMPLIFY_TOLERANCE,
+                           workers: int = None, compare: bool = False) -> dict:
+    """
+    Builds the Admin-1 neighbour lookup from polygons within 'distance' degrees of each other.
+
+    Geometries are repaired and simplified ('repair_geometries'), candidate pairs come from
+    an STRtree over their bounding boxes, and the exact distance tests run on a process pool,
+    partitioned by country with the cross-border pairs split into separate tasks.
+
+    Parameters:
+        gdf: (Geo)DataFrame with 'geometry' (shapely or WKB), 'adm0_a3' and 'name_en' or 'admin1_id'.
+        workers (int): Worker processes (default: all CPUs, 1 runs in-process).
+        compare (bool): Also run 'map_admin_regions.get_admin1_neighbors' (exact touches)
+            and print the edge difference.
+
+    Returns:
+        dict: Neighbour lookup {admin1_id: [neighbour admin1_ids]}.
+    """
+    start_time = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    admin1_ids = (gdf['admin1_id'] if 'admin1_id' in gdf.columns
+                  else gdf['adm0_a3'] + ' - ' + gdf['name_en']).to_numpy(dtype=object)
+    countries = gdf['adm0_a3'].to_numpy(dtype=object)
+
+    geometries = repair_geometries(gdf['geometry'].to_numpy(), simplify_tolerance)
+    repaired_time = time.perf_counter()
+    pairs = candidate_pairs(geometries, distance)
+    candidates_time = time.perf_counter()
+
+    tasks = _partition_pairs(pairs, countries, n_tasks=workers * 4)
+    wkb = shapely.to_wkb(geometries)
+    if workers == 1 or len(tasks) <= 1:
+        _init_worker(wkb)
+        results = [_within_distance(task, distance) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(wkb,)) as executor:
+            results = list(executor.map(_within_distance, tasks, [distance] * len(tasks)))
+    edges = np.concatenate(results) if results else np.zeros((0, 2), dtype=np.int64)
+
+    # Both directions, without self matches of regions split over several rows
+    edges = pd.DataFrame({'left': admin1_ids[edges[:, 0]], 'right': admin1_ids[edges[:, 1]]})
+    edges = pd.concat([edges, edges.rename(columns={'left': 'right', 'right': 'left'})], ignore_index=True)
+    edges = edges[edges['left'] != edges['right']].drop_duplicates().sort_values(['left', 'right'])
+    neighbor_dict = edges.groupby('left')['right'].apply(list).to_dict()
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Built Admin-1 adjacency for {len(gdf):,} polygons in {elapsed:.2f}s: repair {repaired_time - start_time:.2f}s, "
+          f"{len(pairs):,} candidate pairs {candidates_time - repaired_time:.2f}s, "
+          f"{len(edges) // 2:,} edges from {len(tasks)} tasks {elapsed - (candidates_time - start_time):.2f}s")
+
+    if compare:
+        from utils.map_admin_regions import get_admin1_neighbors
+
+        start_time = time.perf_counter()
+        touches = get_admin1_neighbors(gdf)
+        print(f"Exact 'touches' adjacency built in {time.perf_counter() - start_time:.2f}s")
+        compare_neighbors(neighbor_dict, touches)
+
+    return neighbor_dict
+
+
+def _edge_set(neighbor_dict: dict) -> set:
+    return {tuple(sorted((a, b))) for a, neighbours in neighbor_dict.items()
+            for b in neighbours if isinstance(b, str) and a != b}
+
+
+def compare_neighbors(neighbor_dict: dict, reference: dict, examples: int = 10) -> dict:
+    """
+    Prints the undirected edges added and removed relative to a reference neighbour lookup.
+
+    Returns:
+        dict: {'added': [(a, b)], 'removed': [(a, b)], 'common': int}
+    """
+    new_edges, old_edges = _edge_set(neighbor_dict), _edge_set(reference)
+    diff = {
+        'added': sorted(new_edges - old_edges),
+        'removed': sorted(old_edges - new_edges),
+        'common': len(new_edges & old_edges),
+    }
+    print(f"Adjacency edges: {diff['common']:,} in both, {len(diff['added']):,} added, "
+          f"{len(diff['removed']):,} removed relative to the reference")
+    for label in ('added', 'removed'):
+        for a, b in diff[label][:examples]:
+            print(f"  {label}: {a} <-> {b}")
+    return diff
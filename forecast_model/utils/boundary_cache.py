@@ -0,0 +1,152 @@
+import os
+import json
+import glob
+import hashlib
+import pandas as pd
+from utils import adjacency, map_admin_regions
+
+CACHE_DIR = "data/processed/boundaries"
+CACHE_VERSION = 4
+SHAPEFILE_PARTS = ('.shp', '.shx', '.dbf', '.prj', '.cpg')
+BOUNDARY_COLUMNS = ['adm0_a3', 'name_en', 'name', 'name_alt', 'admin1_id']
+# Content digests of the input files by (path, size, mtime), so unchanged files are not re-read
+DIGESTS_FILE = "file_digests.json"
+
+
+def _shapefile_parts(path: str) -> list:
+    stem, _ = os.path.splitext(path)
+    return sorted(p for p in glob.glob(glob.escape(stem) + '.*') if os.path.splitext(p)[1].lower() in SHAPEFILE_PARTS)
+
+
+def _file_digest(path: str, digests: dict) -> str:
+    """
+    Content digest of a file, reused from 'digests' while its size and mtime are unchanged.
+    """
+    stat = os.stat(path)
+    path = os.path.abspath(path)
+    entry = digests.get(path)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['sha256']
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    digests[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+    return digests[path]['sha256']
+
+
+def boundaries_key(shapefiles: list, countries: list, distance: float = adjacency.NEIGHBOR_DISTANCE,
+                   simplify_tolerance: float = adjacency.SIMPLIFY_TOLERANCE, cache_dir: str = CACHE_DIR) -> str:
+    """
+    Hashes the contents of the input shapefiles (all sidecar files) together with the
+    World Bank replacement country list and the adjacency parameters, so any change to
+    them invalidates the cache.
+
+    File contents are only read again when a file's size or mtime changed since the
+    digest recorded in 'cache_dir'.
+    """
+    digests_path = os.path.join(cache_dir, DIGESTS_FILE)
+    digests = {}
+    if os.path.exists(digests_path):
+        with open(digests_path, "r", encoding="utf-8") as f:
+            digests = json.load(f)
+    known = dict(digests)
+
+    digest = hashlib.sha256()
+    digest.update(f"v{CACHE_VERSION}".encode())
+    for shapefile in shapefiles:
+        for part in _shapefile_parts(shapefile):
+            digest.update(os.path.basename(part).encode())
+            digest.update(_file_digest(part, digests).encode())
+
+    if digests != known:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(digests_path + '.tmp', "w", encoding="utf-8") as f:
+            json.dump(digests, f)
+        os.replace(digests_path + '.tmp', digests_path)
+
+    digest.update('|'.join(sorted(countries)).encode())
+    digest.update(f"|distance={distance!r}|simplify_tolerance={simplify_tolerance!r}".encode())
+    return digest.hexdigest()[:16]
+
+
+def _cache_paths(cache_dir: str, key: str):
+    return (
+        os.path.join(cache_dir, f"boundaries_{key}.parquet"),
+        os.path.join(cache_dir, f"neighbors_{key}.json"),
+    )
+
+
+def build_boundaries(ne_file: str, wb_file: str, countries: list, distance: float = adjacency.NEIGHBOR_DISTANCE,
+                     simplify_tolerance: float = adjacency.SIMPLIFY_TOLERANCE, compare: bool = False):
+    """
+    Reads the Natural Earth shapefile, applies the fix-ups and computes the adjacency
+    (see 'adjacency.build_admin1_neighbors' for 'distance', 'simplify_tolerance' and 'compare').
+
+    Returns:
+        tuple: (GeoDataFrame of fixed-up boundaries, neighbour lookup dict)
+    """
+    import geopandas as gpd
+
+    gdf = gpd.read_file(ne_file)
+    gdf = map_admin_regions.prepare_boundaries(gdf, countries=countries, wb_file=wb_file)
+    neighbor_dict = adjacency.build_admin1_neighbors(gdf, distance=distance, simplify_tolerance=simplify_tolerance,
+                                                     compare=compare)
+    return gdf, neighbor_dict
+
+
+def load_boundaries(ne_file: str, wb_file: str = map_admin_regions.WB_BOUNDARIES_PATH,
+                    countries: list = map_admin_regions.WB_BOUNDARY_COUNTRIES,
+                    cache_dir: str = CACHE_DIR, distance: float = adjacency.NEIGHBOR_DISTANCE,
+                    simplify_tolerance: float = adjacency.SIMPLIFY_TOLERANCE, compare: bool = False):
+    """
+    Returns the fixed-up Admin-1 boundaries and their neighbour lookup, from a cache
+    keyed by the input shapefiles, fix-up country list and adjacency parameters when available.
+
+    The boundaries are a plain DataFrame with the attributes used for name matching
+    and the geometry as WKB bytes, so cache hits never import GeoPandas.
+    Use 'to_geodataframe' when the geometries are needed.
+
+    Parameters:
+        distance (float): Polygons closer than this (in degrees) are neighbours.
+        simplify_tolerance (float): Simplification before the distance tests (0 to skip).
+        compare (bool): Rebuild even on a cache hit and print the adjacency edges added and
+                        removed relative to the exact 'touches' neighbours.
+
+    Returns:
+        tuple: (boundaries DataFrame, neighbour lookup {admin1_id: [neighbour admin1_ids]})
+    """
+    key = boundaries_key([ne_file, wb_file], countries, distance, simplify_tolerance, cache_dir)
+    boundaries_path, neighbors_path = _cache_paths(cache_dir, key)
+
+    if not compare and os.path.exists(boundaries_path) and os.path.exists(neighbors_path):
+        print(f"Loading cached boundaries ({key})...")
+        boundaries = pd.read_parquet(boundaries_path)
+        with open(neighbors_path, "r", encoding="utf-8") as f:
+            neighbor_dict = json.load(f)
+        return boundaries, neighbor_dict
+
+    print(f"Building boundaries and adjacency ({key})...")
+    gdf, neighbor_dict = build_boundaries(ne_file, wb_file, countries, distance, simplify_tolerance, compare)
+
+    boundaries = pd.DataFrame(gdf[BOUNDARY_COLUMNS])
+    boundaries['geometry'] = gdf.geometry.to_wkb().values
+    boundaries.attrs['crs'] = gdf.crs.to_string() if gdf.crs else None
+
+    os.makedirs(cache_dir, exist_ok=True)
+    boundaries.to_parquet(boundaries_path, index=False)
+    with open(neighbors_path, "w", encoding="utf-8") as f:
+        json.dump(neighbor_dict, f)
+
+    return boundaries, neighbor_dict
+
+
+def to_geodataframe(boundaries: pd.DataFrame):
+    """
+    Converts cached boundaries (WKB geometry column) back to a GeoDataFrame.
+    """
+    import geopandas as gpd
+
+    geometry = gpd.GeoSeries.from_wkb(boundaries['geometry'], crs=boundaries.attrs.get('crs') or 'EPSG:4326')
+    return gpd.GeoDataFrame(boundaries.drop(columns='geometry'), geometry=geometry)
@@ -1,43 +1,207 @@
 import numpy as np
 import pandas as pd
-from collections import defaultdict
-from tqdm import tqdm
+from scipy import sparse
 
-def get_monthly_events(df: pd.DataFrame) -> pd.DataFrame:
+INDEX_NAMES = ['matched_admin1_id', 'month_year']
+TREND_START = pd.Timestamp('2018-01-01')
+
+
+def _factorize_sorted(values) -> tuple:
     """
-    Returns a DataFrame showing monthly counts of specified event types 
-    for each matched_admin1_id-region combination, including months with zero events.
+    Integer codes of 'values' against their sorted distinct values (-1 for missing).
+    Categoricals are sorted by value rather than category order, like object columns.
+    """
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Index(np.asarray(uniques, dtype=object))
+    sorter = uniques.argsort()
+    rank = np.empty(len(sorter), dtype=np.int64)
+    rank[sorter] = np.arange(len(sorter))
+    return np.where(codes >= 0, rank[codes.clip(0)], -1), uniques[sorter]
 
-    Parameters:
-        df (pd.DataFrame): The input DataFrame with at least 'matched_admin1_id', 'month_year', 'event_type' columns.
-        event_cols (list): List of event types (columns) to include in the result.
 
-    Returns:
-        pd.DataFrame: A pivoted DataFrame with MultiIndex (matched_admin1_id, month_year) 
-                      and columns for each event_type in event_cols.
+class EventPanel:
     """
+    Monthly event counts as one dense (region x month x type) integer array.
 
-    # Get all unique values
-    admin1_vals = df['matched_admin1_id'].unique()
-    month_year_vals = df['month_year'].unique()
-    event_type_vals = df['event_type'].unique()
+    Regions, months and types are integer-coded once; lags, neighbour sums and calendar
+    features are array operations on the count array and the MultiIndex DataFrame used
+    by the models is only built at the end ('to_frame'). Regions are sorted admin1 ids,
+    months the sorted 'YYYY-MM' months with at least one event, and types the event
+    types followed by the requested sub-event types.
+    """
 
-    # Create a complete multi-index of all combinations
-    full_index = pd.MultiIndex.from_product(
-        [admin1_vals, month_year_vals, event_type_vals],
-        names=['matched_admin1_id', 'month_year', 'event_type']
-    )
+    def __init__(self, admin_ids: pd.Index, months: pd.Index, types: pd.Index, counts: np.ndarray,
+                 event_types: pd.Index):
+        self.admin_ids = admin_ids
+        self.months = months
+        self.types = types
+        self.counts = counts
+        self.event_types = event_types
+
+    @classmethod
+    def from_events(cls, df: pd.DataFrame, subevent_cols: list = None, events: bool = True) -> 'EventPanel':
+        """
+        Counts events per (matched_admin1_id, month_year, event_type) and sub-events per
+        (matched_admin1_id, month_year, sub_event_type) with a single np.bincount.
+        Events without a matched region or month are left out.
+
+        Parameters:
+            df (pd.DataFrame): Events with 'matched_admin1_id', 'month_year', 'event_type', 'sub_event_type'.
+            subevent_cols (list): Sub-event types to count (all of them if None, none if empty).
+            events (bool): Count event types (otherwise only sub-event types).
+        """
+        admin_codes, admin_ids = _factorize_sorted(df['matched_admin1_id'])
+        month_codes, months = _factorize_sorted(df['month_year'])
+        located = (admin_codes >= 0) & (month_codes >= 0)
+        cell = admin_codes * len(months) + month_codes
+
+        # Type codes per row: event types first, then the counted sub-event types (-1 = not counted)
+        type_codes = []
+        event_types = pd.Index([])
+        if events:
+            event_codes, event_types = _factorize_sorted(df['event_type'])
+            type_codes.append(event_codes)
+        if subevent_cols is None or len(subevent_cols):
+            subevent_codes, subevent_types = _factorize_sorted(df['sub_event_type'])
+            subevent_cols = list(subevent_types) if subevent_cols is None else list(subevent_cols)
+            slot = pd.Index(subevent_cols).get_indexer(subevent_types)
+            slot = np.where(slot >= 0, slot + len(event_types), -1)
+            type_codes.append(np.where(subevent_codes >= 0, slot[subevent_codes.clip(0)], -1))
+        else:
+            subevent_cols = []
+
+        types = pd.Index(list(event_types) + subevent_cols)
+        shape = (len(admin_ids), len(months), len(types))
+        flat_idx = [np.zeros(0, dtype=np.int64)]
+        for codes in type_codes:
+            keep = located & (codes >= 0)
+            flat_idx.append(cell[keep] * shape[2] + codes[keep])
+        counts = np.bincount(np.concatenate(flat_idx), minlength=int(np.prod(shape))).reshape(shape)
+        return cls(admin_ids, months, types, counts, event_types)
+
+    @property
+    def month_dates(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(pd.to_datetime(self.months))
+
+    def type_counts(self, types) -> np.ndarray:
+        """
+        Counts of the given types, zero for types that never occur in the events.
+        """
+        type_idx = self.types.get_indexer(types)
+        values = np.zeros(self.counts.shape[:2] + (len(type_idx),), dtype=self.counts.dtype)
+        found = np.flatnonzero(type_idx >= 0)
+        values[:, :, found] = self.counts[:, :, type_idx[found]]
+        return values
+
+    @staticmethod
+    def lagged(values: np.ndarray, lag: int = 1) -> np.ndarray:
+        """
+        Values of the 'lag'-th previous month in the panel along the month axis (NaN for the first months).
+        """
+        shifted = np.full(values.shape, np.nan)
+        if lag < values.shape[1]:
+            shifted[:, lag:] = values[:, :values.shape[1] - lag]
+        return shifted
+
+    def neighbour_sums(self, neighbor_lookup: dict, types=None) -> np.ndarray:
+        """
+        Sum of the counts over each region's neighbours, as one sparse matmul over all
+        months and types. Neighbours with no events are not in the panel and add nothing.
+        """
+        types = self.event_types if types is None else types
+        counts = self.type_counts(types)
+        adjacency = build_adjacency_matrix(neighbor_lookup, self.admin_ids)
+        n_admins, n_months, n_types = counts.shape
+        return (adjacency @ counts.reshape(n_admins, n_months * n_types)).reshape(counts.shape)
+
+    def calendar_features(self) -> dict:
+        """
+        Per-month calendar features: linear month trend (January 2018 = 0), year, month and quarter.
+        """
+        dates = self.month_dates
+        return {
+            'linear_month_trend': ((dates.year - TREND_START.year) * 12 + (dates.month - TREND_START.month)).to_numpy(np.int32),
+            'year': dates.year.to_numpy(np.int32),
+            'month': dates.month.to_numpy(),
+            'quarter': dates.quarter.to_numpy(),
+        }
 
-    # Group data
-    grouped = df.groupby(['matched_admin1_id', 'month_year', 'event_type']).size()
+    def importance_weights(self, decay_rate: float = 0.05) -> np.ndarray:
+        """
+        Per-month recency weights exp(-decay_rate * months before the latest month).
+        """
+        dates = self.month_dates
+        month_number = dates.year.to_numpy() * 12 + dates.month.to_numpy()
+        return np.exp(-decay_rate * (month_number.max(initial=0) - month_number))
+
+    def index(self, dates: bool = True) -> pd.MultiIndex:
+        months = self.month_dates if dates else self.months
+        return pd.MultiIndex.from_product([self.admin_ids, months], names=INDEX_NAMES)
+
+    def counts_frame(self, types=None, dates: bool = True) -> pd.DataFrame:
+        """
+        Counts as a DataFrame indexed by (matched_admin1_id, month_year) with one column per type.
+        """
+        types = self.types if types is None else pd.Index(types)
+        values = self.type_counts(types)
+        return pd.DataFrame(values.reshape(-1, len(types)), index=self.index(dates), columns=list(types))
+
+    def to_frame(self, columns: list, neighbor_lookup: dict, decay_rate: float = 0.05) -> pd.DataFrame:
+        """
+        Exports the model matrix: current counts ('Battles'), previous month counts
+        ('Battles (t-1)') and neighbour sums ('Battles_neighbours (t-1)'), calendar
+        features ('linear_month_trend', 'year', 'month_k', 'quarter_k') and
+        'importance_weight', indexed by (matched_admin1_id, month_year) with month_year
+        as month-start timestamps.
+
+        Parameters:
+            columns (list): Columns to export (e.g. settings.predictors + settings.targets).
+            neighbor_lookup (dict): Neighbour lookup {admin1_id: [neighbour admin1_ids]}.
+        """
+        n_admins, n_months = len(self.admin_ids), len(self.months)
+        neighbour_types = [col[:-len('_neighbours (t-1)')] for col in columns if col.endswith('_neighbours (t-1)')]
+        neighbour_prev = self.lagged(self.neighbour_sums(neighbor_lookup, neighbour_types)) if neighbour_types else None
+        calendar = self.calendar_features()
+
+        def per_cell(values: np.ndarray) -> np.ndarray:
+            return values.reshape(n_admins * n_months)
+
+        def per_month(values: np.ndarray) -> np.ndarray:
+            return np.tile(values, n_admins)
+
+        out = {}
+        for col in columns:
+            if col.endswith('_neighbours (t-1)'):
+                out[col] = per_cell(neighbour_prev[:, :, neighbour_types.index(col[:-len('_neighbours (t-1)')])])
+            elif col.endswith(' (t-1)'):
+                out[col] = per_cell(self.lagged(self.type_counts([col[:-len(' (t-1)')]])[:, :, 0]))
+            elif col in ('linear_month_trend', 'year'):
+                out[col] = per_month(calendar[col])
+            elif col.startswith('month_') or col.startswith('quarter_'):
+                field, number = col.rsplit('_', 1)
+                out[col] = per_month(calendar[field] == int(number))
+            elif col == 'importance_weight':
+                out[col] = per_month(self.importance_weights(decay_rate))
+            else:
+                out[col] = per_cell(self.type_counts([col])[:, :, 0])
+
+        return pd.DataFrame(out, index=self.index())
 
-    # Reindex with the full index and fill missing values with 0
-    grouped_full = grouped.reindex(full_index, fill_value=0)
 
-    #  Unstack to get event_type columns (filtered to event_cols if needed)
-    result = grouped_full.unstack('event_type', fill_value=0)
+def get_monthly_events(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns a DataFrame showing monthly counts of every event type
+    for each matched_admin1_id-region combination, including months with zero events.
 
-    return result
+    Parameters:
+        df (pd.DataFrame): The input DataFrame with at least 'matched_admin1_id', 'month_year', 'event_type' columns.
+
+    Returns:
+        pd.DataFrame: A DataFrame with MultiIndex (matched_admin1_id, month_year)
+                      and columns for each event_type.
+    """
+    panel = EventPanel.from_events(df, subevent_cols=[])
+    return panel.counts_frame(panel.event_types, dates=False)
 
 
 def get_monthly_subevents(df: pd.DataFrame, subevent_cols: list) -> pd.DataFrame:
@@ -47,61 +211,51 @@ def get_monthly_subevents(df: pd.DataFrame, subevent_cols: list) -> pd.DataFrame
 
     Parameters:
         df (pd.DataFrame): Input DataFrame with columns: 'matched_admin1_id', 'month_year', 'sub_event_type'.
-        subevent_cols (list): List of sub-event types (columns) to include in the result.
+        subevent_cols (list): List of sub-event types (columns) to include in the result (all if None).
 
     Returns:
-        pd.DataFrame: A pivoted DataFrame with MultiIndex (matched_admin1_id, month_year)
+        pd.DataFrame: A DataFrame with MultiIndex (matched_admin1_id, month_year)
                       and columns for each sub_event_type in subevent_cols.
     """
+    panel = EventPanel.from_events(df, subevent_cols=subevent_cols or None, events=False)
+    return panel.counts_frame(dates=False)
 
-    # Get all unique values
-    admin1_vals = df['matched_admin1_id'].unique()
-    month_year_vals = df['month_year'].unique()
-    sub_event_type_vals = df['sub_event_type'].unique()
-
-    # Create a complete multi-index of all combinations
-    full_index = pd.MultiIndex.from_product(
-        [admin1_vals, month_year_vals, sub_event_type_vals],
-        names=['matched_admin1_id', 'month_year', 'sub_event_type']
-    )
-
-    # Group data
-    grouped = df.groupby(['matched_admin1_id', 'month_year', 'sub_event_type']).size()
 
-    # Reindex with the full index, fill missing with 0
-    grouped_full = grouped.reindex(full_index, fill_value=0)
-
-    # Unstack to get sub_event_type columns, filtered to subevent_cols if provided
-    result = grouped_full.unstack('sub_event_type', fill_value=0)
-
-    if subevent_cols:
-        result = result[subevent_cols]
-
-    return result
-    
-
-def add_lagged_columns(df: pd.DataFrame, lag: int = 1) -> pd.DataFrame:
+def build_adjacency_matrix(neighbor_lookup: dict, admin_ids) -> sparse.csr_matrix:
     """
-    Adds lagged (t - lag) columns for each column in the input DataFrame,
-    grouped by the first index level (matched_admin1_id), and suffixes them with (t-1), (t-2), etc.
+    Builds a sparse (region x region) adjacency matrix from an admin1 neighbour lookup.
 
     Parameters:
-        df (pd.DataFrame): MultiIndex DataFrame with (matched_admin1_id, month_year) as index.
-        lag (int): The lag step. Default is 1 (previous month).
+        neighbor_lookup (dict): Mapping {admin1_id: [neighbour admin1_ids]}, as produced by
+                                'add_admin1_neighbors'. Non-list values are treated as no neighbours.
+        admin_ids (array-like): Ordered admin1 ids defining the rows/columns of the matrix.
 
     Returns:
-        pd.DataFrame: DataFrame with new lagged columns added.
+        scipy.sparse.csr_matrix: Matrix where entry (i, j) counts how often admin_ids[j]
+                                 is listed as a neighbour of admin_ids[i].
     """
-    # Prepare lagged columns
-    lagged_df = df.groupby(level='matched_admin1_id').shift(lag)
+    admin_index = pd.Index(admin_ids)
+    rows, cols = [], []
+    for row_idx, admin_id in enumerate(admin_index):
+        neighbors = neighbor_lookup.get(admin_id, [])
+        if not isinstance(neighbors, (list, tuple)) or not neighbors:
+            continue
+        col_idx = admin_index.get_indexer(neighbors)
+        # Neighbours with no events are not in the grid and contribute nothing
+        col_idx = col_idx[col_idx >= 0]
+        rows.append(np.full(len(col_idx), row_idx))
+        cols.append(col_idx)
 
-    # Rename columns to include (t-1)
-    lagged_df.columns = [f"{col} (t-{lag})" for col in lagged_df.columns]
+    n = len(admin_index)
+    if not rows:
+        return sparse.csr_matrix((n, n), dtype=np.int64)
 
-    # Combine original and lagged
-    combined = pd.concat([df, lagged_df], axis=1)
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    data = np.ones(len(rows), dtype=np.int64)
 
-    return combined
+    # Duplicate (i, j) entries are summed, matching repeated neighbour listings
+    return sparse.csr_matrix((data, (rows, cols)), shape=(n, n))
 
 
 def summarise_neighbour_events(df_neighbours):
@@ -113,95 +267,15 @@ def summarise_neighbour_events(df_neighbours):
         DataFrame: MultiIndexed by ['matched_admin1_id', 'month_year'] with one column 
                    per event_type, suffixed with '_neighbours'.
     """
-
-    # Step 1: Aggregate counts by (admin1_id, month_year, event_type)
-    grouped = (
-        df_neighbours
-        .groupby(['matched_admin1_id', 'month_year', 'event_type'])
-        .size()
-        .reset_index(name='count')
-    )
-
-    # Step 2: Convert to lookup dict
-    event_dict = defaultdict(lambda: defaultdict(int))
-    for _, row in tqdm(grouped.iterrows(), "Convert to dictionary", total=len(grouped)):
-        key = (row['matched_admin1_id'], row['month_year'])
-        event_dict[key][row['event_type']] += row['count']
-
-    # Step 3: Create full admin-month grid
-    unique_admins = df_neighbours['matched_admin1_id'].unique()
-    unique_months = df_neighbours['month_year'].unique()
-    full_index = pd.MultiIndex.from_product([unique_admins, unique_months], names=['matched_admin1_id', 'month_year'])
-
-    # Step 4: Create neighbor lookup table: {admin_id: neighbors}
+    panel = EventPanel.from_events(df_neighbours, subevent_cols=[])
     neighbor_lookup = df_neighbours.drop_duplicates('matched_admin1_id').set_index('matched_admin1_id')['admin1_neighbors'].to_dict()
+    neighbour_counts = panel.neighbour_sums(neighbor_lookup)
 
-    # Step 5: Compute summary for each admin-month
-    all_event_types = df_neighbours['event_type'].unique().tolist()
-    rows = []
-
-    for admin_id, month in tqdm(full_index, "Get neighbour counts"):
-        neighbors = neighbor_lookup.get(admin_id, [])
-        summary = {f"{etype}_neighbours": 0 for etype in all_event_types}
-
-        if isinstance(neighbors, (list, tuple)) and neighbors:
-            for neighbor_id in neighbors:
-                neighbor_counts = event_dict.get((neighbor_id, month), {})
-                for etype, count in neighbor_counts.items():
-                    summary[f"{etype}_neighbours"] += count
-
-        summary_row = {
-            'matched_admin1_id': admin_id,
-            'month_year': month,
-            **summary
-        }
-        rows.append(summary_row)
-
-    return pd.DataFrame(rows).set_index(['matched_admin1_id', 'month_year'])
-
-
-def add_time_trend_features(df):
-    """
-    Adds temporal trend features (raw year, month and quarter dummies, and linear trend) 
-    to a MultiIndexed DataFrame (matched_admin1_id, month_year).
-    
-    Parameters:
-        df (pd.DataFrame): MultiIndexed with ['matched_admin1_id', 'month_year'].
-                           'month_year' should be datetime-like.
-
-    Returns:
-        pd.DataFrame: DataFrame with added time trend features.
-    """
-    # Reset index to access 'month_year'
-    df = df.reset_index()
-
-    # Ensure datetime format
-    df['month_year'] = pd.to_datetime(df['month_year'])
-
-    # Linear monthly trend (starting Jan 2018 = 0)
-    start_date = pd.Timestamp('2018-01-01')
-    df['linear_month_trend'] = ((df['month_year'].dt.year - start_date.year) * 12 +
-                                (df['month_year'].dt.month - start_date.month))
-
-    # Extract date components
-    df['year'] = df['month_year'].dt.year
-    df['month'] = df['month_year'].dt.month
-    df['quarter'] = df['month_year'].dt.quarter
-
-    # Create dummies for month and quarter (drop first to avoid multicollinearity)
-    month_dummies = pd.get_dummies(df['month'], prefix='month', drop_first=True)
-    quarter_dummies = pd.get_dummies(df['quarter'], prefix='quarter', drop_first=True)
-
-    # Concatenate to original df
-    df = pd.concat([df, month_dummies, quarter_dummies], axis=1)
-
-    # Drop month and quarter columns (keep year as integer)
-    df.drop(columns=['month', 'quarter'], inplace=True)
-
-    # Restore MultiIndex
-    df.set_index(['matched_admin1_id', 'month_year'], inplace=True)
-
-    return df
+    return pd.DataFrame(
+        neighbour_counts.reshape(-1, len(panel.event_types)),
+        index=panel.index(dates=False),
+        columns=[f"{etype}_neighbours" for etype in panel.event_types]
+    )
 
 
 def add_importance_weights(df, decay_rate=0.05):
@@ -219,8 +293,8 @@ def add_importance_weights(df, decay_rate=0.05):
     df['month_year'] = pd.to_datetime(df['month_year'])
 
     # Compute months since most recent observation
-    max_date = df['month_year'].max()
-    months_since = (max_date.to_period('M') - df['month_year'].dt.to_period('M')).apply(lambda x: x.n)
+    month_number = df['month_year'].dt.year * 12 + df['month_year'].dt.month
+    months_since = month_number.max() - month_number
 
     # Exponential decay weights
     df['importance_weight'] = np.exp(-decay_rate * months_since)
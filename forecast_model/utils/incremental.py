@@ -0,0 +1,235 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from collections import defaultdict
+from utils import data_cleaning, model_store
+
+STATE_DIR = "data/processed/pipeline_state"
+COUNTS_FILE = "monthly_counts.parquet"
+NEIGHBORS_FILE = "admin1_neighbors.json"
+WATERMARKS_FILE = "watermarks.json"
+
+
+def parse_event_ids(event_ids: pd.Series) -> pd.DataFrame:
+    """
+    Splits ACLED 'event_id_cnty' values (e.g. 'UKR12345') into a country prefix and
+    a sequence number, which increases as ACLED adds events for that prefix.
+    """
+    parts = event_ids.astype(str).str.extract(r'^(?P<prefix>\D+)(?P<number>\d+)$')
+    parts['number'] = pd.to_numeric(parts['number'], errors='coerce')
+    return parts
+
+
+def compute_watermarks(df: pd.DataFrame) -> dict:
+    """
+    Returns the highest event sequence number seen per event id prefix.
+    """
+    parts = parse_event_ids(df['event_id_cnty']).dropna()
+    return {prefix: int(number) for prefix, number in parts.groupby('prefix')['number'].max().items()}
+
+
+def filter_new_events(df: pd.DataFrame, watermarks: dict) -> pd.DataFrame:
+    """
+    Keeps only events whose id is above the stored watermark for its prefix
+    (or whose prefix has never been seen).
+    """
+    parts = parse_event_ids(df['event_id_cnty'])
+    previous = parts['prefix'].map(watermarks)
+    is_new = previous.isna() | (parts['number'] > previous)
+    return df[is_new.to_numpy()].copy()
+
+
+def monthly_counts(df: pd.DataFrame, subevent_cols: list) -> pd.DataFrame:
+    """
+    Monthly event and sub-event counts per matched admin1, indexed by
+    (matched_admin1_id, month_year) with 'month_year' as a month-start timestamp.
+    """
+    df = df[df['matched_admin1_id'].notna()]
+    event_data = data_cleaning.get_monthly_events(df)
+    subevent_data = data_cleaning.get_monthly_subevents(df, None).reindex(columns=subevent_cols, fill_value=0)
+
+    counts = pd.concat([event_data, subevent_data], axis=1)
+    counts.columns = [str(col) for col in counts.columns]
+    counts.index = counts.index.set_levels(pd.to_datetime(counts.index.levels[1]), level=1)
+    return counts
+
+
+def state_exists(state_dir: str = STATE_DIR) -> bool:
+    return all(
+        os.path.exists(os.path.join(state_dir, name))
+        for name in (COUNTS_FILE, NEIGHBORS_FILE, WATERMARKS_FILE)
+    )
+
+
+def save_state(counts: pd.DataFrame, neighbor_dict: dict, watermarks: dict, state_dir: str = STATE_DIR):
+    """
+    Persists everything an incremental update needs: the monthly count panel,
+    the admin1 neighbour lookup and the event id watermarks.
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    counts.astype(np.int32).to_parquet(os.path.join(state_dir, COUNTS_FILE))
+    with open(os.path.join(state_dir, NEIGHBORS_FILE), "w", encoding="utf-8") as f:
+        json.dump(neighbor_dict, f)
+    with open(os.path.join(state_dir, WATERMARKS_FILE), "w", encoding="utf-8") as f:
+        json.dump(watermarks, f)
+
+
+def load_state(state_dir: str = STATE_DIR):
+    """
+    Loads the state written by 'save_state'.
+
+    Returns:
+        tuple: (counts, neighbor_dict, watermarks)
+    """
+    counts = pd.read_parquet(os.path.join(state_dir, COUNTS_FILE))
+    with open(os.path.join(state_dir, NEIGHBORS_FILE), "r", encoding="utf-8") as f:
+        neighbor_dict = json.load(f)
+    with open(os.path.join(state_dir, WATERMARKS_FILE), "r", encoding="utf-8") as f:
+        watermarks = json.load(f)
+    return counts, neighbor_dict, watermarks
+
+
+def build_model_rows(counts: pd.DataFrame, neighbor_dict: dict, row_index: pd.MultiIndex,
+                     columns: list) -> pd.DataFrame:
+    """
+    Computes model matrix rows for the given (admin1, month) cells directly from the
+    monthly count panel: current counts, previous month counts ('(t-1)'), previous
+    month neighbour sums ('_neighbours (t-1)') and calendar features. The previous
+    month is the previous month of the panel, as in 'EventPanel.lagged', so months
+    without any events are skipped the same way as in a full build.
+    'importance_weight' is left empty; it depends on the whole panel.
+
+    Parameters:
+        counts (pd.DataFrame): Full (admin1 x month) grid of monthly counts.
+        neighbor_dict (dict): Neighbour lookup {admin1_id: [neighbour admin1_ids]}.
+        row_index (pd.MultiIndex): Cells to compute.
+        columns (list): Model matrix columns (e.g. settings.predictors + settings.targets).
+
+    Returns:
+        pd.DataFrame: Rows indexed by row_index with the requested columns.
+    """
+    admins = counts.index.unique(level=0)
+    months = counts.index.unique(level=1).sort_values()
+    grid = counts.reindex(pd.MultiIndex.from_product([admins, months]), fill_value=0)
+    values = grid.to_numpy().reshape(len(admins), len(months), len(counts.columns))
+    type_index = pd.Index(counts.columns)
+
+    row_admins = admins.get_indexer(row_index.get_level_values(0))
+    row_months = pd.DatetimeIndex(row_index.get_level_values(1))
+    month_idx = months.get_indexer(row_months)
+    prev_idx = month_idx - 1
+    has_prev = prev_idx >= 0
+
+    # Neighbour sums of the previous month, one sparse matmul per distinct month
+    adjacency = data_cleaning.build_adjacency_matrix(neighbor_dict, admins)
+    neighbour_prev = np.full((len(row_index), len(type_index)), np.nan)
+    for m in np.unique(prev_idx[has_prev]):
+        rows = np.flatnonzero(prev_idx == m)
+        neighbour_prev[rows] = adjacency[row_admins[rows]] @ values[:, m, :]
+
+    own_prev = np.full((len(row_index), len(type_index)), np.nan)
+    own_prev[has_prev] = values[row_admins[has_prev], prev_idx[has_prev], :]
+    own_now = values[row_admins, month_idx, :]
+
+    start_date = pd.Timestamp('2018-01-01')
+    out = {}
+    for col in columns:
+        if col.endswith('_neighbours (t-1)'):
+            out[col] = neighbour_prev[:, type_index.get_loc(col[:-len('_neighbours (t-1)')])]
+        elif col.endswith(' (t-1)'):
+            out[col] = own_prev[:, type_index.get_loc(col[:-len(' (t-1)')])]
+        elif col == 'linear_month_trend':
+            out[col] = (row_months.year - start_date.year) * 12 + (row_months.month - start_date.month)
+        elif col == 'year':
+            out[col] = row_months.year
+        elif col.startswith('month_'):
+            out[col] = row_months.month == int(col.split('_')[1])
+        elif col.startswith('quarter_'):
+            out[col] = row_months.quarter == int(col.split('_')[1])
+        elif col == 'importance_weight':
+            out[col] = np.nan
+        else:
+            out[col] = own_now[:, type_index.get_loc(col)]
+
+    return pd.DataFrame(out, index=row_index)[columns]
+
+
+def affected_cells(delta: pd.DataFrame, neighbor_dict: dict, months: pd.DatetimeIndex) -> pd.MultiIndex:
+    """
+    Returns the (admin1, month) cells whose model rows change when 'delta' is added
+    to the count panel: the changed cells themselves, their next panel month (own lags)
+    and the next panel month of every region that lists a changed region as a neighbour.
+
+    Parameters:
+        months (pd.DatetimeIndex): Sorted months of the updated panel.
+    """
+    changed = delta.index[delta.to_numpy().sum(axis=1) > 0]
+    next_month = dict(zip(months[:-1], months[1:]))
+
+    reverse_neighbors = defaultdict(list)
+    for admin_id, neighbors in neighbor_dict.items():
+        if isinstance(neighbors, (list, tuple)):
+            for neighbor_id in neighbors:
+                reverse_neighbors[neighbor_id].append(admin_id)
+
+    cells = set()
+    for admin_id, month in changed:
+        cells.add((admin_id, month))
+        if month in next_month:
+            cells.add((admin_id, next_month[month]))
+            for dependent_id in reverse_neighbors.get(admin_id, []):
+                cells.add((dependent_id, next_month[month]))
+
+    return pd.MultiIndex.from_tuples(sorted(cells), names=model_store.INDEX_NAMES)
+
+
+def update_model_data(model_data: pd.DataFrame, counts: pd.DataFrame, delta: pd.DataFrame,
+                      neighbor_dict: dict):
+    """
+    Adds new monthly counts to the panel and patches only the model rows they affect.
+    Rows for new admin1 regions or months are appended.
+
+    Returns:
+        tuple: (model_data, counts, changed_countries) where changed_countries lists the
+               country partitions of the store that need rewriting.
+    """
+    columns = list(model_data.columns)
+    delta = delta.reindex(columns=counts.columns, fill_value=0)
+
+    # Step 1: Add the new counts, extending the grid with new admins and months
+    counts = counts.add(delta, fill_value=0)
+    admins = counts.index.unique(level=0)
+    months = counts.index.unique(level=1).sort_values()
+    full_index = pd.MultiIndex.from_product([admins, months], names=model_store.INDEX_NAMES)
+    counts = counts.reindex(full_index, fill_value=0).astype(np.int64)
+
+    # Step 2: Work out which rows must be recomputed
+    cells = affected_cells(delta, neighbor_dict, months)
+    cells = cells[full_index.get_indexer(cells) >= 0]
+    new_rows = full_index[model_data.index.get_indexer(full_index) < 0]
+    # A month new to the panel becomes the previous month of the one after it, in every region
+    new_month_idx = months.get_indexer(months.difference(model_data.index.unique(level=1)))
+    following = months[new_month_idx[new_month_idx + 1 < len(months)] + 1]
+    recompute = cells.union(new_rows).union(full_index[full_index.get_level_values(1).isin(following)])
+
+    # Step 3: Patch existing rows, append new ones
+    rows = build_model_rows(counts, neighbor_dict, recompute, columns)
+    existing = recompute[model_data.index.get_indexer(recompute) >= 0]
+    previous_max = model_data.index.get_level_values(1).max()
+
+    model_data = model_data.astype(rows.dtypes.to_dict())
+    for col in columns:
+        if col != 'importance_weight':
+            model_data.loc[existing, col] = rows.loc[existing, col].to_numpy()
+    model_data = pd.concat([model_data, rows.loc[new_rows]])
+
+    # Step 4: Recency weights depend on the latest month, so refresh them everywhere
+    model_data = data_cleaning.add_importance_weights(model_data)
+
+    if model_data.index.get_level_values(1).max() != previous_max:
+        changed_countries = {model_store.country_code(admin_id) for admin_id in admins}
+    else:
+        changed_countries = {model_store.country_code(admin_id) for admin_id in recompute.get_level_values(0)}
+
+    return model_data, counts, sorted(changed_countries)
@@ -1,12 +1,86 @@
 import re
+import time
 import numpy as np
 import pandas as pd
-import geopandas as gpd
 import unicodedata
-from shapely.errors import TopologicalError
 from collections import defaultdict
-from fuzzywuzzy import fuzz, process
-from tqdm import tqdm
+from rapidfuzz import fuzz, process
+from utils import adjacency, match_table
+
+# Countries whose Natural Earth Admin-1 polygons are replaced by World Bank boundaries
+WB_BOUNDARY_COUNTRIES = [
+    'NPL', 'ESP', 'BFA', 'LKA', 'PHL', 'LBN', 'MAR', 'BEL', 'BGD',
+    'AFG', 'MAR', 'KEN', 'ISL', 'COD', 'XKX', 'SOM', 'MTQ', 'MNE', 'CIV']
+
+WB_BOUNDARIES_PATH = "data/raw/boundaries/World Bank Official Boundaries - Admin 1/WB_GAD_ADM1.shp"
+
+FUZZY_THRESHOLD = 60
+MATCH_TIERS = ('name_en', 'name', 'alt', 'fuzzy', 'overlap')
+
+# Mapping of French departments to regions (simplified but covers all)
+FRANCE_DEPARTMENT_TO_REGION = {
+    # Auvergne-Rhône-Alpes
+    'Ain': 'Auvergne-Rhone-Alpes', 'Allier': 'Auvergne-Rhone-Alpes', 'Ardèche': 'Auvergne-Rhone-Alpes',
+    'Cantal': 'Auvergne-Rhone-Alpes', 'Drôme': 'Auvergne-Rhone-Alpes', 'Isère': 'Auvergne-Rhone-Alpes',
+    'Haute-Loire': 'Auvergne-Rhone-Alpes', 'Loire': 'Auvergne-Rhone-Alpes', 'Puy-de-Dôme': 'Auvergne-Rhone-Alpes',
+    'Rhône': 'Auvergne-Rhone-Alpes', 'Savoie': 'Auvergne-Rhone-Alpes', 'Haute-Savoie': 'Auvergne-Rhone-Alpes',
+
+    # Bourgogne-Franche-Comté
+    'Côte-d’Or': 'Bourgogne-Franche-Comte', 'Doubs': 'Bourgogne-Franche-Comte', 'Jura': 'Bourgogne-Franche-Comte',
+    'Nièvre': 'Bourgogne-Franche-Comte', 'Haute-Saône': 'Bourgogne-Franche-Comte',
+    'Saône-et-Loire': 'Bourgogne-Franche-Comte', 'Yonne': 'Bourgogne-Franche-Comte',
+    'Territoire de Belfort': 'Bourgogne-Franche-Comte',
+
+    # Bretagne
+    'Côtes-d\'Armor': 'Bretagne', 'Finistère': 'Bretagne', 'Ille-et-Vilaine': 'Bretagne', 'Morbihan': 'Bretagne',
+
+    # Centre-Val de Loire
+    'Cher': 'Centre-Val De Loire', 'Eure-et-Loir': 'Centre-Val De Loire', 'Indre': 'Centre-Val De Loire',
+    'Indre-et-Loire': 'Centre-Val De Loire', 'Loir-et-Cher': 'Centre-Val De Loire',
+    'Loiret': 'Centre-Val De Loire',
+
+    # Corse
+    'Corse-du-Sud': 'Corse', 'Haute-Corse': 'Corse',
+
+    # Grand Est
+    'Ardennes': 'Grand Est', 'Aube': 'Grand Est', 'Bas-Rhin': 'Grand Est', 'Haut-Rhin': 'Grand Est',
+    'Haute-Marne': 'Grand Est', 'Marne': 'Grand Est', 'Meurthe-et-Moselle': 'Grand Est',
+    'Meuse': 'Grand Est', 'Moselle': 'Grand Est', 'Vosges': 'Grand Est',
+
+    # Hauts-de-France
+    'Aisne': 'Hauts-De-France', 'Nord': 'Hauts-De-France', 'Oise': 'Hauts-De-France',
+    'Pas-de-Calais': 'Hauts-De-France', 'Somme': 'Hauts-De-France',
+
+    # Île-de-France
+    'Paris': 'Ile-De-France', 'Seine-et-Marne': 'Ile-De-France', 'Yvelines': 'Ile-De-France',
+    'Essonne': 'Ile-De-France', 'Hauts-de-Seine': 'Ile-De-France', 'Seine-Saint-Denis': 'Ile-De-France',
+    'Val-de-Marne': 'Ile-De-France', "Val-d'Oise": 'Ile-De-France',
+
+    # Normandie
+    'Calvados': 'Normandie', 'Eure': 'Normandie', 'Manche': 'Normandie', 'Orne': 'Normandie',
+    'Seine-Maritime': 'Normandie',
+
+    # Nouvelle-Aquitaine
+    'Charente': 'Nouvelle-Aquitaine', 'Charente-Maritime': 'Nouvelle-Aquitaine', 'Corrèze': 'Nouvelle-Aquitaine',
+    'Creuse': 'Nouvelle-Aquitaine', 'Dordogne': 'Nouvelle-Aquitaine', 'Gironde': 'Nouvelle-Aquitaine',
+    'Landes': 'Nouvelle-Aquitaine', 'Lot-et-Garonne': 'Nouvelle-Aquitaine', 'Pyrénées-Atlantics': 'Nouvelle-Aquitaine',
+    'Deux-Sèvres': 'Nouvelle-Aquitaine', 'Vienne': 'Nouvelle-Aquitaine', 'Haute-Vienne': 'Nouvelle-Aquitaine',
+
+    # Occitanie
+    'Ariège': 'Occitanie', 'Aude': 'Occitanie', 'Aveyron': 'Occitanie', 'Gard': 'Occitanie',
+    'Haute-Garonne': 'Occitanie', 'Gers': 'Occitanie', 'Hérault': 'Occitanie', 'Lot': 'Occitanie',
+    'Lozère': 'Occitanie', 'Hautes-Pyrénées': 'Occitanie', 'Pyrénées-Orientales': 'Occitanie',
+    'Tarn': 'Occitanie', 'Tarn-et-Garonne': 'Occitanie',
+
+    # Pays de la Loire
+    'Loire-Atlantique': 'Pays De La Loire', 'Maine-et-Loire': 'Pays De La Loire',
+    'Mayenne': 'Pays De La Loire', 'Sarthe': 'Pays De La Loire', 'Vendée': 'Pays De La Loire',
+
+    # Provence-Alpes-Côte d'Azur
+    'Alpes-de-Haute-Provence': "Provence-Alpes-Cote D'Azur", 'Hautes-Alpes': "Provence-Alpes-Cote D'Azur",
+    'Alpes-Maritimes': "Provence-Alpes-Cote D'Azur", 'Bouches-du-Rhône': "Provence-Alpes-Cote D'Azur",
+    'Var': "Provence-Alpes-Cote D'Azur", 'Vaucluse': "Provence-Alpes-Cote D'Azur",
+}
 
 
 def normalize(text, strip_punctuation=False):
@@ -20,6 +94,15 @@ def normalize(text, strip_punctuation=False):
     return text.strip().title()
 
 
+def fuzzy_process(text):
+    # Same preprocessing as fuzzywuzzy's full_process: non word characters to spaces, lower case, trimmed
+    return re.sub(r'(?ui)\W', ' ', text).lower().strip()
+
+
+def overlap_tokens(name):
+    return set(normalize(w, strip_punctuation=True) for w in name.split() if len(w) > 3)
+
+
 def fix_france(gdf):
     """
     Spatially dissolves French departments into regions, labels them by region name,
@@ -32,76 +115,12 @@ def fix_france(gdf):
         GeoDataFrame: Original gdf with regional geometries for France appended (name_en = region name).
     """
 
-    # Mapping of departments to regions (simplified but covers all)
-    department_to_region = {
-        # Auvergne-Rhône-Alpes
-        'Ain': 'Auvergne-Rhone-Alpes', 'Allier': 'Auvergne-Rhone-Alpes', 'Ardèche': 'Auvergne-Rhone-Alpes',
-        'Cantal': 'Auvergne-Rhone-Alpes', 'Drôme': 'Auvergne-Rhone-Alpes', 'Isère': 'Auvergne-Rhone-Alpes',
-        'Haute-Loire': 'Auvergne-Rhone-Alpes', 'Loire': 'Auvergne-Rhone-Alpes', 'Puy-de-Dôme': 'Auvergne-Rhone-Alpes',
-        'Rhône': 'Auvergne-Rhone-Alpes', 'Savoie': 'Auvergne-Rhone-Alpes', 'Haute-Savoie': 'Auvergne-Rhone-Alpes',
-
-        # Bourgogne-Franche-Comté
-        'Côte-d’Or': 'Bourgogne-Franche-Comte', 'Doubs': 'Bourgogne-Franche-Comte', 'Jura': 'Bourgogne-Franche-Comte',
-        'Nièvre': 'Bourgogne-Franche-Comte', 'Haute-Saône': 'Bourgogne-Franche-Comte',
-        'Saône-et-Loire': 'Bourgogne-Franche-Comte', 'Yonne': 'Bourgogne-Franche-Comte',
-        'Territoire de Belfort': 'Bourgogne-Franche-Comte',
-
-        # Bretagne
-        'Côtes-d\'Armor': 'Bretagne', 'Finistère': 'Bretagne', 'Ille-et-Vilaine': 'Bretagne', 'Morbihan': 'Bretagne',
-
-        # Centre-Val de Loire
-        'Cher': 'Centre-Val De Loire', 'Eure-et-Loir': 'Centre-Val De Loire', 'Indre': 'Centre-Val De Loire',
-        'Indre-et-Loire': 'Centre-Val De Loire', 'Loir-et-Cher': 'Centre-Val De Loire',
-        'Loiret': 'Centre-Val De Loire',
-
-        # Corse
-        'Corse-du-Sud': 'Corse', 'Haute-Corse': 'Corse',
-
-        # Grand Est
-        'Ardennes': 'Grand Est', 'Aube': 'Grand Est', 'Bas-Rhin': 'Grand Est', 'Haut-Rhin': 'Grand Est',
-        'Haute-Marne': 'Grand Est', 'Marne': 'Grand Est', 'Meurthe-et-Moselle': 'Grand Est',
-        'Meuse': 'Grand Est', 'Moselle': 'Grand Est', 'Vosges': 'Grand Est',
-
-        # Hauts-de-France
-        'Aisne': 'Hauts-De-France', 'Nord': 'Hauts-De-France', 'Oise': 'Hauts-De-France',
-        'Pas-de-Calais': 'Hauts-De-France', 'Somme': 'Hauts-De-France',
-
-        # Île-de-France
-        'Paris': 'Ile-De-France', 'Seine-et-Marne': 'Ile-De-France', 'Yvelines': 'Ile-De-France',
-        'Essonne': 'Ile-De-France', 'Hauts-de-Seine': 'Ile-De-France', 'Seine-Saint-Denis': 'Ile-De-France',
-        'Val-de-Marne': 'Ile-De-France', "Val-d'Oise": 'Ile-De-France',
-
-        # Normandie
-        'Calvados': 'Normandie', 'Eure': 'Normandie', 'Manche': 'Normandie', 'Orne': 'Normandie',
-        'Seine-Maritime': 'Normandie',
-
-        # Nouvelle-Aquitaine
-        'Charente': 'Nouvelle-Aquitaine', 'Charente-Maritime': 'Nouvelle-Aquitaine', 'Corrèze': 'Nouvelle-Aquitaine',
-        'Creuse': 'Nouvelle-Aquitaine', 'Dordogne': 'Nouvelle-Aquitaine', 'Gironde': 'Nouvelle-Aquitaine',
-        'Landes': 'Nouvelle-Aquitaine', 'Lot-et-Garonne': 'Nouvelle-Aquitaine', 'Pyrénées-Atlantics': 'Nouvelle-Aquitaine',
-        'Deux-Sèvres': 'Nouvelle-Aquitaine', 'Vienne': 'Nouvelle-Aquitaine', 'Haute-Vienne': 'Nouvelle-Aquitaine',
-
-        # Occitanie
-        'Ariège': 'Occitanie', 'Aude': 'Occitanie', 'Aveyron': 'Occitanie', 'Gard': 'Occitanie',
-        'Haute-Garonne': 'Occitanie', 'Gers': 'Occitanie', 'Hérault': 'Occitanie', 'Lot': 'Occitanie',
-        'Lozère': 'Occitanie', 'Hautes-Pyrénées': 'Occitanie', 'Pyrénées-Orientales': 'Occitanie',
-        'Tarn': 'Occitanie', 'Tarn-et-Garonne': 'Occitanie',
-
-        # Pays de la Loire
-        'Loire-Atlantique': 'Pays De La Loire', 'Maine-et-Loire': 'Pays De La Loire',
-        'Mayenne': 'Pays De La Loire', 'Sarthe': 'Pays De La Loire', 'Vendée': 'Pays De La Loire',
-
-        # Provence-Alpes-Côte d'Azur
-        'Alpes-de-Haute-Provence': "Provence-Alpes-Cote D'Azur", 'Hautes-Alpes': "Provence-Alpes-Cote D'Azur",
-        'Alpes-Maritimes': "Provence-Alpes-Cote D'Azur", 'Bouches-du-Rhône': "Provence-Alpes-Cote D'Azur",
-        'Var': "Provence-Alpes-Cote D'Azur", 'Vaucluse': "Provence-Alpes-Cote D'Azur",
-    }
 
     # Filter for France departments
-    france_depts = gdf[(gdf['adm0_a3'] == 'FRA') & (gdf['name_en'].isin(department_to_region.keys()))].copy()
+    france_depts = gdf[(gdf['adm0_a3'] == 'FRA') & (gdf['name_en'].isin(FRANCE_DEPARTMENT_TO_REGION.keys()))].copy()
 
     # Assign region name
-    france_depts['region_name'] = france_depts['name_en'].map(department_to_region)
+    france_depts['region_name'] = france_depts['name_en'].map(FRANCE_DEPARTMENT_TO_REGION)
 
     # Dissolve by region name
     regions = france_depts.dissolve(by='region_name').reset_index()
@@ -115,6 +134,19 @@ def fix_france(gdf):
     return gdf
 
 
+def superseded_admin1(boundaries):
+    """
+    Marks the French departments that 'fix_france' also added as a dissolved region, so
+    their points can be assigned to the region only.
+
+    Returns:
+        np.ndarray: Boolean mask over the boundary rows.
+    """
+    departments = (boundaries['adm0_a3'] == 'FRA') & boundaries['name_en'].isin(FRANCE_DEPARTMENT_TO_REGION.keys())
+    regions = set(boundaries.loc[boundaries['adm0_a3'] == 'FRA', 'name_en'])
+    has_region = boundaries['name_en'].map(FRANCE_DEPARTMENT_TO_REGION).isin(regions)
+    return (departments & has_region).to_numpy()
+
 def fix_libya(gdf):
     """
     Replace Libya's Admin-1 regions with grouped 'West', 'East', and 'South' regions.
@@ -175,7 +207,7 @@ def fix_libya(gdf):
     return gdf
 
 
-def update_boundaries(gdf, countries, wb_file="data/raw/boundaries/World Bank Official Boundaries - Admin 1/WB_GAD_ADM1.shp"):
+def update_boundaries(gdf, countries, wb_file=WB_BOUNDARIES_PATH):
     """
     Replaces rows for specified countries (by adm0_a3 code) in a GeoDataFrame with 
     official Admin 1 boundaries from the World Bank shapefile.
@@ -188,6 +220,8 @@ def update_boundaries(gdf, countries, wb_file="data/raw/boundaries/World Bank Of
     Returns:
         GeoDataFrame: Updated GeoDataFrame with specified countries replaced.
     """
+    # Imported here so cached boundaries can be used without GeoPandas installed
+    import geopandas as gpd
 
     # Load World Bank shapefile
     gdf_wb = gpd.read_file(wb_file)
@@ -226,51 +260,176 @@ def update_boundaries(gdf, countries, wb_file="data/raw/boundaries/World Bank Of
     return gdf_out
 
 
-def match_admin1_to_gdf(df, gdf):
-    # Preprocess gdf
+def prepare_boundaries(gdf, countries=WB_BOUNDARY_COUNTRIES, wb_file=WB_BOUNDARIES_PATH):
+    """
+    Applies the Admin-1 boundary fix-ups (French regions, grouped Libya regions and
+    World Bank replacements for 'countries') and adds an 'admin1_id' column.
+
+    Returns:
+        GeoDataFrame: Fixed-up boundaries.
+    """
     gdf = gdf.copy()
     gdf = fix_france(gdf)
     gdf = fix_libya(gdf)
-    gdf = update_boundaries(gdf, [
-        'NPL', 'ESP', 'BFA', 'LKA', 'PHL', 'LBN', 'MAR', 'BEL', 'BGD',
-        'AFG', 'MAR', 'KEN', 'ISL', 'COD', 'XKX', 'SOM', 'MTQ', 'MNE', 'CIV'])
-    gdf['name_en_norm'] = gdf['name_en'].apply(normalize)
-    gdf['name_norm'] = gdf['name'].apply(normalize)
-    gdf['name_alt'] = gdf['name_alt'].fillna('')
-    gdf['name_alt_list'] = gdf['name_alt'].apply(lambda x: [normalize(n) for n in x.split('|') if n.strip()])
+    gdf = update_boundaries(gdf, countries, wb_file=wb_file)
     gdf['admin1_id'] = gdf['adm0_a3'] + ' - ' + gdf['name_en']
+    return gdf
 
-    # Build lookup maps
-    name_en_map = {
-        (row['adm0_a3'], row['name_en_norm']): row['admin1_id']
-        for _, row in gdf.iterrows()
-    }
 
-    name_map = {
-        (row['adm0_a3'], row['name_norm']): row['admin1_id']
-        for _, row in gdf.iterrows()
-    }
+def build_match_pools(gdf):
+    """
+    Precompiles the name lookups used by 'match_admin1_keys' from boundaries that have
+    'name_en_norm', 'name_norm', 'name_alt_list' and 'admin1_id' columns.
 
+    Returns:
+        dict: Exact name maps plus, per country, the fuzzy candidate pool (names in
+        insertion order, their admin1_ids, preprocessed strings and the positions of the
+        non-empty ones) and an inverted word -> first candidate position index for the
+        overlap tier.
+    """
+    name_en_map = {}
+    name_map = {}
     altname_map = defaultdict(dict)
     fuzzy_match_pool = defaultdict(dict)
 
-    for _, row in gdf.iterrows():
-        country = row['adm0_a3']
-        adm1_id = row['admin1_id']
+    for country, name_en_norm, name_norm, alt_list, adm1_id in zip(
+            gdf['adm0_a3'], gdf['name_en_norm'], gdf['name_norm'], gdf['name_alt_list'], gdf['admin1_id']):
+        name_en_map[(country, name_en_norm)] = adm1_id
+        name_map[(country, name_norm)] = adm1_id
         # Add name_en and name
-        fuzzy_match_pool[country][row['name_en_norm']] = adm1_id
-        fuzzy_match_pool[country][row['name_norm']] = adm1_id
+        fuzzy_match_pool[country][name_en_norm] = adm1_id
+        fuzzy_match_pool[country][name_norm] = adm1_id
         # Add alts
-        for alt in row['name_alt_list']:
+        for alt in alt_list:
             altname_map[country][alt] = adm1_id
             fuzzy_match_pool[country][alt] = adm1_id
 
-    # Build word overlap match pool
-    tokenized_name_words = defaultdict(dict)
+    candidates = {}
     for country, names in fuzzy_match_pool.items():
-        for name, adm1_id in names.items():
-            tokens = set(normalize(w, strip_punctuation=True) for w in name.split() if len(w) > 3)
-            tokenized_name_words[country][name] = tokens
+        token_index = {}
+        for position, name in enumerate(names):
+            for token in overlap_tokens(name):
+                token_index.setdefault(token, position)
+        processed = [fuzzy_process(name) for name in names]
+        candidates[country] = {
+            'names': list(names),
+            'ids': list(names.values()),
+            'processed': processed,
+            # Names that preprocess to '' are never fuzzy candidates (rapidfuzz scores '' vs '' as 100)
+            'fuzzy_positions': np.array([position for position, text in enumerate(processed) if text], dtype=np.int64),
+            'token_index': token_index,
+        }
+
+    return {'name_en': name_en_map, 'name': name_map, 'alt': altname_map, 'candidates': candidates}
+
+
+def match_admin1_keys(keys, pools):
+    """
+    Matches (country_code, normalized admin1) keys to admin1_ids with the cascade: exact
+    name_en, exact name, exact alternative name, fuzzy ratio >= 60 over all of the
+    country's names (best score, first candidate on ties) and finally the first candidate
+    sharing a word of more than three letters.
+
+    The fuzzy tier scores all of a country's remaining keys against its candidate pool in
+    one 'rapidfuzz.process.cdist' call; the overlap tier uses the inverted word index.
+    Names that preprocess to an empty string (e.g. only punctuation) are not fuzzy matched.
+
+    Returns:
+        tuple: ({key: admin1_id or None}, {key: tier name}) -- keys matched by no tier are
+        left out of both, empty names map to None.
+    """
+    timings = {}
+    match_cache = {}
+    match_tiers = {}
+
+    # 1-3. Exact matches
+    start_time = time.perf_counter()
+    remaining = defaultdict(list)
+    for key in keys:
+        country_code, admin1 = key
+        if not admin1:
+            match_cache[key] = None
+            continue
+        if key in pools['name_en']:
+            match_cache[key], match_tiers[key] = pools['name_en'][key], 'name_en'
+        elif key in pools['name']:
+            match_cache[key], match_tiers[key] = pools['name'][key], 'name'
+        elif admin1 in pools['alt'].get(country_code, {}):
+            match_cache[key], match_tiers[key] = pools['alt'][country_code][admin1], 'alt'
+        else:
+            remaining[country_code].append(key)
+    timings['exact'] = time.perf_counter() - start_time
+
+    # 4. Fuzzy match, one score matrix per country
+    start_time = time.perf_counter()
+    unmatched = []
+    for country_code, country_keys in remaining.items():
+        pool = pools['candidates'].get(country_code)
+        if not pool:
+            unmatched.extend(country_keys)
+            continue
+        queries = [fuzzy_process(admin1) for _, admin1 in country_keys]
+        scored_keys = [key for key, query in zip(country_keys, queries) if query]
+        unmatched.extend(key for key, query in zip(country_keys, queries) if not query)
+        positions = pool['fuzzy_positions']
+        if not scored_keys or not len(positions):
+            unmatched.extend(scored_keys)
+            continue
+        scores = process.cdist([query for query in queries if query], [pool['processed'][i] for i in positions],
+                               scorer=fuzz.ratio, dtype=np.float64, workers=-1)
+        # fuzzywuzzy rounds scores to integers before picking the first best candidate
+        scores = np.round(scores)
+        best = scores.argmax(axis=1)
+        for key, position, score in zip(scored_keys, positions[best], scores[np.arange(len(best)), best]):
+            if score >= FUZZY_THRESHOLD:
+                match_cache[key], match_tiers[key] = pool['ids'][position], 'fuzzy'
+            else:
+                unmatched.append(key)
+    timings['fuzzy'] = time.perf_counter() - start_time
+
+    # 5. Word overlap match, first candidate (in pool order) sharing a word
+    start_time = time.perf_counter()
+    for key in unmatched:
+        country_code, admin1 = key
+        pool = pools['candidates'].get(country_code)
+        if not pool:
+            continue
+        positions = [pool['token_index'][token] for token in overlap_tokens(admin1) if token in pool['token_index']]
+        if positions:
+            match_cache[key], match_tiers[key] = pool['ids'][min(positions)], 'overlap'
+    timings['overlap'] = time.perf_counter() - start_time
+
+    counts = pd.Series(match_tiers, dtype=object).value_counts() if match_tiers else pd.Series(dtype=int)
+    print("Admin1 matching: " + ", ".join(
+        f"{tier} {counts.get(tier, 0):,}" for tier in MATCH_TIERS
+    ) + f", unmatched {len(unmatched) - int(counts.get('overlap', 0)):,}")
+    print(f"  exact tiers {timings['exact']:.3f}s, fuzzy {timings['fuzzy']:.3f}s, overlap {timings['overlap']:.3f}s")
+
+    return match_cache, match_tiers
+
+
+def match_admin1_to_gdf(df, gdf, fix_boundaries=True, match_table_dir=match_table.TABLE_DIR):
+    """
+    Adds 'matched_admin1_id' to ACLED events by matching their (country code, admin1 name)
+    against the boundary names.
+
+    Resolved keys are kept in a match table per boundary version under 'match_table_dir'
+    (None disables it), so only keys not seen before are matched; rows of that table
+    with tier 'manual' pin overrides by hand.
+
+    Returns:
+        tuple: (events with 'matched_admin1_id', boundaries with the normalized name columns)
+    """
+    # Preprocess gdf (skipped for boundaries already passed through prepare_boundaries)
+    if fix_boundaries:
+        gdf = prepare_boundaries(gdf)
+    else:
+        gdf = gdf.copy()
+    gdf['name_en_norm'] = gdf['name_en'].apply(normalize)
+    gdf['name_norm'] = gdf['name'].apply(normalize)
+    gdf['name_alt'] = gdf['name_alt'].fillna('')
+    gdf['name_alt_list'] = gdf['name_alt'].apply(lambda x: [normalize(n) for n in x.split('|') if n.strip()])
+    gdf['admin1_id'] = gdf['adm0_a3'] + ' - ' + gdf['name_en']
 
     # Prepare df country codes and normalized admin1
     df = df.copy()
@@ -295,7 +454,10 @@ def match_admin1_to_gdf(df, gdf):
     df['admin1'] = np.where(df['country'] == 'Guam', 'Guam', df['admin1'])
     df['admin1'] = np.where(df['country_code'] == 'PRI', 'Puerto Rico', df['admin1'])
 
-    df['admin1_norm'] = df['admin1'].apply(normalize)
+    # Normalize each distinct admin1 name once and map back through the factor codes
+    admin1_codes, admin1_uniques = pd.factorize(df['admin1'])
+    admin1_norm_uniques = np.array([normalize(name) for name in admin1_uniques] + [''], dtype=object)
+    df['admin1_norm'] = admin1_norm_uniques[admin1_codes]  # code -1 (missing) -> ''
     admin_name_fixes = {
         'Hadarom': 'Southern', 'Hazafon': 'Northern', 'Hamerkaz': 'Central', 'Ituri': 'Orientale', 'Province 1': 'Koshi',
         'Vlaanderen': 'Vlaams Gewest', 'Menaka': 'Gao'
@@ -304,82 +466,66 @@ def match_admin1_to_gdf(df, gdf):
 
     unique_keys = df[['country_code', 'admin1_norm']].dropna().drop_duplicates()
 
-    match_cache = {}
-
-    for _, row in tqdm(unique_keys.iterrows(), total=len(unique_keys), desc="Matching"):
-        country_code = row['country_code']
-        admin1 = row['admin1_norm']
-        key = (country_code, admin1)
-
-        if not admin1:
-            match_cache[key] = None
-            continue
-
-        # 1. Exact match with name_en
-        if key in name_en_map:
-            match_cache[key] = name_en_map[key]
-            continue
-
-        # 2. Exact match with name
-        if key in name_map:
-            match_cache[key] = name_map[key]
-            continue
-
-        # 3. Exact match with alt name
-        if admin1 in altname_map.get(country_code, {}):
-            match_cache[key] = altname_map[country_code][admin1]
-            continue
-
-        # 4. Fuzzy match with name_en + name + alt
-        choices_dict = fuzzy_match_pool.get(country_code, {})
-        if choices_dict:
-            result = process.extractOne(admin1, list(choices_dict.keys()), scorer=fuzz.ratio)
-            if result:
-                match, score = result
-                if score >= 60:
-                    match_cache[key] = choices_dict[match]
-                    continue
-
-        # 5. Word overlap match
-        admin1_words = set(normalize(w, strip_punctuation=True) for w in admin1.split() if len(w) > 3)
-        for name_candidate, adm1_id in choices_dict.items():
-            candidate_words = tokenized_name_words[country_code][name_candidate]
-            if admin1_words & candidate_words:
-                match_cache[key] = adm1_id
-                break
-
-    # Map match results back to full df
-    df['matched_admin1_id'] = df.apply(
-        lambda row: match_cache.get((row['country_code'], row['admin1_norm']), None),
-        axis=1
-    )
+    keys = list(unique_keys.itertuples(index=False, name=None))
+    if match_table_dir:
+        version = match_table.boundary_version(gdf)
+        match_cache, match_tiers = match_table.load_match_table(version, gdf['admin1_id'], match_table_dir)
+    else:
+        match_cache, match_tiers = {}, {}
+    new_keys = [key for key in keys if key not in match_cache and key[1]]
+    print(f"Admin1 match table: {len(keys) - len(new_keys):,} of {len(keys):,} keys already resolved")
+    match_cache.update({key: None for key in keys if not key[1]})
+
+    if new_keys:
+        new_cache, new_tiers = match_admin1_keys(new_keys, build_match_pools(gdf))
+        match_cache.update(new_cache)
+        match_tiers.update(new_tiers)
+        # Record keys no tier matched so they are not retried for this boundary version
+        for key in new_keys:
+            if key[1] and key not in new_tiers:
+                match_cache[key], match_tiers[key] = None, match_table.UNMATCHED_TIER
+        if match_table_dir:
+            match_table.save_match_table(version, match_cache, match_tiers, match_table_dir)
+
+    # Map match results back to full df with a single index lookup
+    start_time = time.perf_counter()
+    match_index = pd.MultiIndex.from_tuples(list(match_cache.keys()), names=['country_code', 'admin1_norm'])
+    match_values = np.array(list(match_cache.values()) + [None], dtype=object)
+    row_keys = pd.MultiIndex.from_arrays([df['country_code'], df['admin1_norm']])
+    positions = match_index.get_indexer(row_keys) if len(match_index) else np.full(len(df), -1)
+    df['matched_admin1_id'] = match_values[positions]  # position -1 (no match) -> None
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Mapped matched_admin1_id for {len(df):,} rows in {elapsed:.2f}s "
+          f"({len(df) / max(elapsed, 1e-9):,.0f} rows/sec)")
 
     return df, gdf
     
 
-def add_admin1_neighbors(df, gdf):
+def get_admin1_neighbors(gdf_matched):
     """
-    Adds a 'admin1_neighbors' column to df, listing neighbors for each matched admin1 polygon.
+    Finds touching admin1 polygons in a GeoDataFrame prepared by 'match_admin1_to_gdf'.
+    Kept as the reference for 'adjacency.build_admin1_neighbors', which also links
+    polygons separated by slivers.
 
     Parameters:
-        df (pd.DataFrame): Input dataframe with country/admin1 info.
-        gdf (GeoDataFrame): GeoDataFrame with admin1 geometries and 'adm0_a3', 'name_en', etc.
+        gdf_matched (GeoDataFrame): GeoDataFrame with admin1 geometries and 'adm0_a3', 'name_en'.
 
     Returns:
-        DataFrame: Updated df with a new 'admin1_neighbors' column (list of neighbor admin1_ids).
+        dict: Neighbour lookup {admin1_id: [neighbour admin1_ids]}.
     """
-    # Step 1: Match df rows to gdf admin1 features
-    df_matched, gdf_matched = match_admin1_to_gdf(df, gdf)
+    import geopandas as gpd
+    from shapely.errors import TopologicalError
 
-    # Step 2: Fix geometry issues
+    # Step 1: Fix geometry issues
     gdf_matched = gdf_matched.copy()
     gdf_matched['geometry'] = gdf_matched['geometry'].buffer(0)
 
-    # Step 3: Add admin1_id if not already there
+    # Step 2: Add admin1_id if not already there
     if 'admin1_id' not in gdf_matched.columns:
-        gdf_matched['admin1_id'] = gdf_matched['adm0_a3'] + ' - ' + gdf['name_en']
+        gdf_matched['admin1_id'] = gdf_matched['adm0_a3'] + ' - ' + gdf_matched['name_en']
 
-    # Step 4: Spatial join to find touching geometries (neighbors)
+    # Step 3: Spatial join to find touching geometries (neighbors)
     try:
         neighbors = gpd.sjoin(
             gdf_matched[['admin1_id', 'geometry']],
@@ -393,10 +539,28 @@ def add_admin1_neighbors(df, gdf):
     # Remove self matches
     neighbors = neighbors[neighbors['admin1_id_left'] != neighbors['admin1_id_right']]
 
-    # Step 5: Build neighbor lookup
-    neighbor_dict = neighbors.groupby('admin1_id_left')['admin1_id_right'].apply(list).to_dict()
+    # Step 4: Build neighbor lookup
+    return neighbors.groupby('admin1_id_left')['admin1_id_right'].apply(list).to_dict()
+
+
+def add_admin1_neighbors(df, gdf):
+    """
+    Adds a 'admin1_neighbors' column to df, listing neighbors for each matched admin1 polygon.
+
+    Parameters:
+        df (pd.DataFrame): Input dataframe with country/admin1 info.
+        gdf (GeoDataFrame): GeoDataFrame with admin1 geometries and 'adm0_a3', 'name_en', etc.
+
+    Returns:
+        DataFrame: Updated df with a new 'admin1_neighbors' column (list of neighbor admin1_ids).
+    """
+    # Step 1: Match df rows to gdf admin1 features
+    df_matched, gdf_matched = match_admin1_to_gdf(df, gdf)
+
+    # Step 2: Build neighbor lookup from the matched polygons
+    neighbor_dict = adjacency.build_admin1_neighbors(gdf_matched)
 
-    # Step 6: Add neighbor info to df
+    # Step 3: Add neighbor info to df
     df_matched['admin1_neighbors'] = df_matched['matched_admin1_id'].map(neighbor_dict)
 
     return df_matched
\ No newline at end of file
@@ -0,0 +1,80 @@
+import os
+import glob
+import hashlib
+import pandas as pd
+
+TABLE_DIR = "data/processed/boundaries"
+# Bump when the matching cascade in 'map_admin_regions.match_admin1_keys' changes
+TABLE_VERSION = 1
+TABLE_COLUMNS = ['country_code', 'admin1_norm', 'admin1_id', 'tier']
+NAME_COLUMNS = ['adm0_a3', 'name_en', 'name', 'name_alt', 'admin1_id']
+MANUAL_TIER = 'manual'
+UNMATCHED_TIER = 'unmatched'
+
+
+def boundary_version(gdf: pd.DataFrame) -> str:
+    """
+    Hashes the boundary name columns the matching depends on, so a table is only reused
+    for boundaries whose names are unchanged. Geometry edits keep the same version.
+    """
+    names = gdf[NAME_COLUMNS].astype(object).fillna('').astype(str)
+    digest = hashlib.sha256(f"v{TABLE_VERSION}".encode())
+    digest.update(pd.util.hash_pandas_object(names, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def table_path(version: str, table_dir: str = TABLE_DIR) -> str:
+    return os.path.join(table_dir, f"admin1_matches_{version}.csv")
+
+
+def _read_table(path: str) -> pd.DataFrame:
+    table = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return table[TABLE_COLUMNS]
+
+
+def load_match_table(version: str, admin1_ids, table_dir: str = TABLE_DIR):
+    """
+    Loads the resolved (country_code, admin1_norm) -> admin1_id table of a boundary version.
+
+    Rows with tier 'manual' are overrides pinned by hand: they are never re-matched, and
+    when a boundary version has no table yet they are carried over from the most recent
+    table of another version (if their admin1_id still exists). An empty admin1_id means
+    the key matches no region.
+
+    Returns:
+        tuple: ({key: admin1_id or None}, {key: tier})
+    """
+    path = table_path(version, table_dir)
+    if os.path.exists(path):
+        table = _read_table(path)
+    else:
+        table = pd.DataFrame(columns=TABLE_COLUMNS)
+        previous = sorted(glob.glob(table_path('*', table_dir)), key=os.path.getmtime)
+        if previous:
+            manual = _read_table(previous[-1])
+            manual = manual[manual['tier'] == MANUAL_TIER]
+            kept = manual['admin1_id'].isin(set(admin1_ids)) | (manual['admin1_id'] == '')
+            if len(manual):
+                print(f"Carried {kept.sum()} of {len(manual)} manual admin1 matches over from "
+                      f"{os.path.basename(previous[-1])}")
+            table = manual[kept]
+
+    keys = list(zip(table['country_code'], table['admin1_norm']))
+    match_cache = {key: admin1_id or None for key, admin1_id in zip(keys, table['admin1_id'])}
+    match_tiers = dict(zip(keys, table['tier']))
+    return match_cache, match_tiers
+
+
+def save_match_table(version: str, match_cache: dict, match_tiers: dict, table_dir: str = TABLE_DIR) -> str:
+    """
+    Writes the table of a boundary version (keys without a tier, i.e. empty names, are left out).
+    """
+    rows = [(key[0], key[1], match_cache.get(key) or '', tier) for key, tier in match_tiers.items()]
+    table = pd.DataFrame(rows, columns=TABLE_COLUMNS).sort_values(['country_code', 'admin1_norm'])
+
+    path = table_path(version, table_dir)
+    os.makedirs(table_dir, exist_ok=True)
+    tmp_path = path + '.tmp'
+    table.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
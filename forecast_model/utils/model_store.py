@@ -0,0 +1,188 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+INDEX_FILE = "index.json"
+ROW_GROUP_SIZE = 4096
+INDEX_NAMES = ['matched_admin1_id', 'month_year']
+
+
+def country_code(admin1_id) -> str:
+    """
+    Returns the country code prefix of an admin1 id (e.g. 'UKR - Donetsk' -> 'UKR').
+    """
+    if pd.isna(admin1_id):
+        return 'UNMATCHED'
+    return str(admin1_id).split(' - ')[0]
+
+
+def _partition_path(store_dir: str, code: str) -> str:
+    return os.path.join(store_dir, f"country={code}", "data.parquet")
+
+
+def optimise_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Downcasts model matrix columns for columnar storage.
+
+    Integer-valued columns without missing values become int32 (event counts, trends, year),
+    other numeric columns become float32 (lagged counts, importance weights) and
+    boolean dummies are kept as bool.
+    """
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            df[col] = series.astype(np.int32)
+        elif pd.api.types.is_float_dtype(series):
+            values = series.to_numpy()
+            if not np.isnan(values).any() and np.array_equal(values, np.round(values)):
+                df[col] = series.astype(np.int32)
+            else:
+                df[col] = series.astype(np.float32)
+    return df
+
+
+def save_model_data(model_data: pd.DataFrame, store_dir: str = "data/processed/model_data",
+                    countries: list = None) -> dict:
+    """
+    Saves the model matrix as Parquet files partitioned by country code, together with
+    an admin1 -> row-range index so single regions can be read without a full scan.
+
+    Parameters:
+        model_data (pd.DataFrame): MultiIndexed by ['matched_admin1_id', 'month_year'].
+        store_dir (str): Output directory for the partitioned store.
+        countries (list): If given, only these country partitions are rewritten and the
+                          rest of the existing store is left untouched.
+
+    Returns:
+        dict: The admin1 index {admin1_id: {'country', 'start', 'stop'}}.
+    """
+    df = optimise_dtypes(model_data).reset_index()
+    df.columns = INDEX_NAMES + list(df.columns[2:])
+    df['matched_admin1_id'] = df['matched_admin1_id'].astype('category')
+    df['country_code'] = df['matched_admin1_id'].map(country_code).astype(str)
+
+    if countries is not None and store_exists(store_dir):
+        countries = set(countries)
+        df = df[df['country_code'].isin(countries)]
+        index = {
+            admin1_id: entry for admin1_id, entry in load_index(store_dir).items()
+            if entry['country'] not in countries
+        }
+    else:
+        index = {}
+
+    # Keep each region's rows contiguous (stable, so month order is preserved)
+    df = df.sort_values(['country_code', 'matched_admin1_id'], kind='stable')
+
+    os.makedirs(store_dir, exist_ok=True)
+
+    for code, country_df in df.groupby('country_code', sort=True):
+        country_df = country_df.drop(columns='country_code').reset_index(drop=True)
+        country_df['matched_admin1_id'] = country_df['matched_admin1_id'].cat.remove_unused_categories()
+
+        path = _partition_path(store_dir, code)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.Table.from_pandas(country_df, preserve_index=False)
+        pq.write_table(table, path, row_group_size=ROW_GROUP_SIZE)
+
+        # Row ranges of each admin1 within the partition file
+        codes = country_df['matched_admin1_id'].cat.codes.to_numpy()
+        boundaries = np.flatnonzero(np.diff(codes)) + 1
+        starts = np.concatenate([[0], boundaries])
+        stops = np.concatenate([boundaries, [len(codes)]])
+        for start, stop in zip(starts, stops):
+            admin1_id = country_df['matched_admin1_id'].iloc[start]
+            index[str(admin1_id)] = {'country': code, 'start': int(start), 'stop': int(stop)}
+
+    with open(os.path.join(store_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+        json.dump(index, f)
+
+    return index
+
+
+def store_exists(store_dir: str = "data/processed/model_data") -> bool:
+    return os.path.exists(os.path.join(store_dir, INDEX_FILE))
+
+
+def load_index(store_dir: str = "data/processed/model_data") -> dict:
+    with open(os.path.join(store_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _to_model_frame(df: pd.DataFrame) -> pd.DataFrame:
+    df['matched_admin1_id'] = df['matched_admin1_id'].astype(str)
+    return df.set_index(INDEX_NAMES)
+
+
+def load_model_data(store_dir: str = "data/processed/model_data", columns: list = None) -> pd.DataFrame:
+    """
+    Loads the full model matrix from the partitioned store.
+
+    Parameters:
+        store_dir (str): Directory written by 'save_model_data'.
+        columns (list): Optional column projection (index columns are always read).
+
+    Returns:
+        pd.DataFrame: MultiIndexed by ['matched_admin1_id', 'month_year'].
+    """
+    read_columns = INDEX_NAMES + list(columns) if columns is not None else None
+    codes = sorted({entry['country'] for entry in load_index(store_dir).values()})
+
+    frames = [
+        pq.read_table(_partition_path(store_dir, code), columns=read_columns).to_pandas()
+        for code in codes
+    ]
+    return _to_model_frame(pd.concat(frames, ignore_index=True))
+
+
+def load_admin1_data(admin1_region: str, store_dir: str = "data/processed/model_data",
+                     columns: list = None) -> pd.DataFrame:
+    """
+    Reads a single admin1 region from the store, touching only the row groups that
+    hold its row range and only the requested columns.
+
+    Returns:
+        pd.DataFrame: The region's rows indexed by 'month_year'.
+    """
+    index = load_index(store_dir)
+    if admin1_region not in index:
+        raise KeyError(admin1_region)
+
+    entry = index[admin1_region]
+    start, stop = entry['start'], entry['stop']
+    read_columns = INDEX_NAMES + list(columns) if columns is not None else None
+
+    parquet_file = pq.ParquetFile(_partition_path(store_dir, entry['country']))
+    row_groups, first_row, offset = [], None, 0
+    for i in range(parquet_file.num_row_groups):
+        n_rows = parquet_file.metadata.row_group(i).num_rows
+        if offset < stop and offset + n_rows > start:
+            row_groups.append(i)
+            if first_row is None:
+                first_row = offset
+        offset += n_rows
+
+    table = parquet_file.read_row_groups(row_groups, columns=read_columns)
+    table = table.slice(start - first_row, stop - start)
+
+    return _to_model_frame(table.to_pandas()).loc[admin1_region]
+
+
+def migrate_csv_cache(csv_path: str = "data/processed/model_data.csv",
+                      store_dir: str = "data/processed/model_data") -> pd.DataFrame:
+    """
+    Converts an existing CSV model_data cache into the partitioned Parquet store.
+    The CSV file is left in place.
+    """
+    print(f"Migrating {csv_path} to Parquet store at {store_dir}...")
+    df = pd.read_csv(csv_path, index_col=[0, 1])
+    df.index = df.index.set_levels(pd.to_datetime(df.index.levels[1]), level=1)
+    df.index.names = INDEX_NAMES
+    save_model_data(df, store_dir)
+    return df
@@ -1,48 +1,119 @@
 import os
-import pandas as pd
-import geopandas as gpd
-from utils import data_cleaning, map_admin_regions
+from utils import acled_loader, boundary_cache, data_cleaning, incremental, map_admin_regions, model_store, spatial_join
 from config import settings
 
-def prepare_data_pipeline(clean_data: bool = False):
+RAW_EVENTS_PATH = "data/raw/1997-01-01-2025-07-03.csv"
+BOUNDARIES_PATH = "data/raw/boundaries/ne_10m_admin_1_states_provinces/ne_10m_admin_1_states_provinces.shp"
+SUBEVENT_COLS = ['Excessive force against protesters', 'Agreement']
+
+def assign_admin1(df, boundaries, geocode: bool = False):
+    """
+    Assigns events to Admin-1 regions, by name matching or, with geocode=True, by
+    point-in-polygon on their coordinates with name matching as fallback and cross-check.
+    """
+    if geocode:
+        return spatial_join.geocode_admin1(df, boundaries)
+    return map_admin_regions.match_admin1_to_gdf(df, boundaries, fix_boundaries=False)
+
+
+def prepare_data_pipeline(clean_data: bool = False, load: bool = True, update: bool = False,
+                          geocode: bool = False):
     """
     Builds or loads the model-ready DataFrame.
-    If clean_data=True, load from saved file. Otherwise, run the full pipeline.
+    If clean_data=False, load from the saved Parquet store (migrating a legacy CSV cache
+    if that is all there is). Otherwise, run the full pipeline.
+    If update=True and a previous build exists, only events added since that build are
+    processed and the affected rows of the store are patched.
+    If load=False, only make sure the store exists and return its path, so callers can
+    read single regions with 'filter_admin1_data'.
+    If geocode=True, events are assigned to regions by their coordinates (see 'assign_admin1').
     """
-    output_path = "data/processed/model_data.csv"
+    store_dir = "data/processed/model_data"
+    legacy_csv_path = "data/processed/model_data.csv"
+
+    if update and model_store.store_exists(store_dir) and incremental.state_exists():
+        model_data = update_data_pipeline(store_dir, geocode=geocode)
+        return model_data if load else store_dir
 
-    if not clean_data and os.path.exists(output_path):
-        print("Loading cleaned data from disk...")
-        df = pd.read_csv(output_path, index_col=[0, 1])
-        return df
+    if not clean_data:
+        if not model_store.store_exists(store_dir) and os.path.exists(legacy_csv_path):
+            model_store.migrate_csv_cache(legacy_csv_path, store_dir)
+
+        if model_store.store_exists(store_dir):
+            if not load:
+                return store_dir
+            print("Loading cleaned data from disk...")
+            return model_store.load_model_data(store_dir)
 
     print("Running full data preprocessing pipeline...")
-    df = pd.read_csv("data/raw/1997-01-01-2025-07-03.csv")
-    df = df[df['year'] >= 2018].copy()
-    df['date'] = pd.to_datetime(df['event_date'], format='%d %B %Y')
-    df['month_year'] = df['date'].dt.to_period('M').astype(str)
-
-    gdf = gpd.read_file("data/raw/boundaries/ne_10m_admin_1_states_provinces/ne_10m_admin_1_states_provinces.shp")
-    df_neighbours = map_admin_regions.add_admin1_neighbors(df, gdf)
-
-    neighbour_data = data_cleaning.summarise_neighbour_events(df_neighbours)
-    event_data = data_cleaning.get_monthly_events(df_neighbours)
-    subevent_data = data_cleaning.get_monthly_subevents(
-        df_neighbours, ['Excessive force against protesters', 'Agreement']
+    df = acled_loader.load_acled_events(RAW_EVENTS_PATH, min_year=2018)
+
+    boundaries, neighbor_dict = boundary_cache.load_boundaries(BOUNDARIES_PATH)
+    df_neighbours, _ = assign_admin1(df, boundaries, geocode=geocode)
+
+    # Counts, lags, neighbour sums and calendar features from one integer-coded panel
+    panel = data_cleaning.EventPanel.from_events(df_neighbours, SUBEVENT_COLS)
+    model_data = panel.to_frame(settings.predictors + settings.targets, neighbor_dict)
+
+    # Save to disk for next time, with the state needed for incremental updates
+    model_store.save_model_data(model_data, store_dir)
+    incremental.save_state(
+        incremental.monthly_counts(df_neighbours, SUBEVENT_COLS),
+        neighbor_dict,
+        incremental.compute_watermarks(df)
     )
 
-    combined = pd.concat([event_data, subevent_data], axis=1).join(neighbour_data, how='left')
-    combined = data_cleaning.add_lagged_columns(combined)
-    combined = data_cleaning.add_time_trend_features(combined)
-    combined = data_cleaning.add_importance_weights(combined)
+    if not load:
+        return store_dir
+    return model_data
+
+
+def update_data_pipeline(store_dir: str = "data/processed/model_data", geocode: bool = False):
+    """
+    Incrementally updates the saved model matrix with ACLED events added since the last
+    build, detected with per-country event_id_cnty watermarks. Only the changed
+    (admin1, month) cells, the lag and neighbour rows that depend on them and any new
+    rows are recomputed; only the affected country partitions are rewritten.
+
+    Edited or deleted ACLED events are not detected, so run '--clean-data' periodically.
+    Use the same 'geocode' setting as the full build, or new events may land in other regions.
+    """
+    print("Running incremental data update...")
+    counts, neighbor_dict, watermarks = incremental.load_state()
+
+    df = acled_loader.load_acled_events(RAW_EVENTS_PATH, min_year=2018)
+    df_new = incremental.filter_new_events(df, watermarks)
+    model_data = model_store.load_model_data(store_dir)
 
-    model_data = combined[settings.predictors + settings.targets]
+    if df_new.empty:
+        print("No new events since the last build.")
+        return model_data
 
-    # Save to disk for next time
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    model_data.to_csv(output_path)
+    print(f"Found {len(df_new):,} new events.")
+    boundaries, _ = boundary_cache.load_boundaries(BOUNDARIES_PATH)
+    df_new, _ = assign_admin1(df_new, boundaries, geocode=geocode)
+    delta = incremental.monthly_counts(df_new, SUBEVENT_COLS)
+
+    model_data, counts, changed_countries = incremental.update_model_data(
+        model_data, counts, delta, neighbor_dict
+    )
+    model_store.save_model_data(model_data, store_dir, countries=changed_countries)
+
+    watermarks.update(incremental.compute_watermarks(df_new))
+    incremental.save_state(counts, neighbor_dict, watermarks)
+    print(f"Updated {len(changed_countries)} country partitions.")
 
     return model_data
     
-def filter_admin1_data(df, admin1_region):
-    return df.loc[admin1_region]
\ No newline at end of file
+def filter_admin1_data(df, admin1_region, columns=None):
+    """
+    Returns the rows for one admin1 region. 'df' is either the in-memory model matrix
+    or the path of the Parquet store, in which case only that region's row range
+    (and the requested columns) are read from disk.
+    """
+    if isinstance(df, str):
+        return model_store.load_admin1_data(admin1_region, store_dir=df, columns=columns)
+    region_data = df.loc[admin1_region]
+    if columns is not None:
+        region_data = region_data[columns]
+    return region_data
\ No newline at end of file
@@ -0,0 +1,153 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import shapely
+
+from utils import map_admin_regions
+
+# Events up to this far (in degrees) outside every polygon, e.g. on coasts the Natural
+# Earth polygons simplify away, are snapped to the nearest polygon
+SNAP_DISTANCE = 0.05
+CHUNK_SIZE = 250_000
+
+_tree = None
+
+
+def build_tree(geometries):
+    """
+    Builds an STRtree over the boundary polygons.
+
+    Parameters:
+        geometries: Array of WKB bytes or shapely geometries, in boundary row order.
+
+    Returns:
+        shapely.STRtree: Index whose query results are positions into the boundary rows.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    if len(geometries) and isinstance(geometries[0], (bytes, bytearray)):
+        geometries = shapely.from_wkb(geometries)
+    shapely.prepare(geometries)
+    return shapely.STRtree(geometries)
+
+
+def _init_worker(geometries):
+    global _tree
+    _tree = build_tree(geometries)
+
+
+def locate_points(tree, lon: np.ndarray, lat: np.ndarray, snap_distance: float = SNAP_DISTANCE) -> np.ndarray:
+    """
+    Finds the polygon containing each point with one bulk STRtree query.
+
+    Points on a shared border fall in several polygons and get the lowest polygon position,
+    points outside every polygon the nearest one within 'snap_distance' degrees.
+
+    Returns:
+        np.ndarray: Polygon position per point (-1 where none was found).
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    positions = np.full(len(lon), -1, dtype=np.int64)
+    # Events without coordinates are left to the name matching fallback
+    valid = np.flatnonzero(np.isfinite(lon) & np.isfinite(lat))
+    points = shapely.points(lon[valid], lat[valid])
+
+    point_idx, polygon_idx = tree.query(points, predicate='intersects')
+    point_idx = valid[point_idx]
+    # Keep the lowest polygon position per point so border points are assigned the same way every run
+    order = np.lexsort((polygon_idx, point_idx))
+    first = np.unique(point_idx[order], return_index=True)[1]
+    positions[point_idx[order][first]] = polygon_idx[order][first]
+
+    unmatched = np.flatnonzero(positions[valid] == -1)
+    if snap_distance and len(unmatched):
+        near_idx, near_polygon = tree.query_nearest(points[unmatched], max_distance=snap_distance, all_matches=False)
+        positions[valid[unmatched[near_idx]]] = near_polygon
+    return positions
+
+
+def _locate_chunk(lon: np.ndarray, lat: np.ndarray, snap_distance: float) -> np.ndarray:
+    return locate_points(_tree, lon, lat, snap_distance)
+
+
+def assign_admin1_by_coordinates(df: pd.DataFrame, boundaries: pd.DataFrame, workers: int = None,
+                                 chunk_size: int = CHUNK_SIZE, snap_distance: float = SNAP_DISTANCE) -> pd.Series:
+    """
+    Spatially joins event coordinates to the fixed-up Admin-1 polygons.
+
+    Rows are processed in chunks of 'chunk_size' points across a process pool; every
+    worker builds the STRtree once from the WKB geometries. Inputs of a single chunk
+    are joined in-process. French departments covered by a dissolved region (see
+    'map_admin_regions.superseded_admin1') are left out, so their points get the region.
+
+    Parameters:
+        df (pd.DataFrame): Events with 'longitude' and 'latitude' columns.
+        boundaries (pd.DataFrame): Output of 'boundary_cache.load_boundaries' (WKB geometry).
+        workers (int): Worker processes (default: all CPUs).
+
+    Returns:
+        pd.Series: admin1_id per event (None where the point is in no polygon).
+    """
+    start_time = time.perf_counter()
+    lon = df['longitude'].to_numpy()
+    lat = df['latitude'].to_numpy()
+    # Tree positions -> boundary rows, without the superseded departments
+    rows = np.flatnonzero(~map_admin_regions.superseded_admin1(boundaries))
+    geometries = boundaries['geometry'].to_numpy()[rows]
+    workers = workers or os.cpu_count() or 1
+
+    bounds = list(range(0, len(df), chunk_size)) + [len(df)]
+    chunks = [(lon[a:b], lat[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+    if workers == 1 or len(chunks) <= 1:
+        tree = build_tree(geometries)
+        results = [locate_points(tree, chunk_lon, chunk_lat, snap_distance) for chunk_lon, chunk_lat in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=_init_worker,
+                                 initargs=(geometries,)) as executor:
+            results = list(executor.map(_locate_chunk, *zip(*chunks), [snap_distance] * len(chunks)))
+    positions = np.concatenate(results) if results else np.zeros(0, dtype=np.int64)
+
+    admin1_ids = np.append(boundaries['admin1_id'].to_numpy(dtype=object)[rows], None)
+    elapsed = time.perf_counter() - start_time
+    print(f"Spatially joined {len(df):,} points to {len(boundaries):,} polygons in {elapsed:.2f}s "
+          f"({len(df) / max(elapsed, 1e-9):,.0f} points/sec, {(positions >= 0).mean() if len(df) else 0:.1%} located)")
+    return pd.Series(admin1_ids[positions], index=df.index)  # position -1 (no polygon) -> None
+
+
+def geocode_admin1(df: pd.DataFrame, boundaries: pd.DataFrame, workers: int = None,
+                   snap_distance: float = SNAP_DISTANCE, report_top: int = 10):
+    """
+    Assigns events to Admin-1 regions by coordinates, with name matching as the fallback
+    for events without coordinates or outside every polygon and as a cross-check.
+
+    Adds 'point_admin1_id' and 'name_admin1_id' and sets 'matched_admin1_id' to the
+    point-in-polygon region where there is one and the name match otherwise.
+    Prints the agreement rate between the two and the most frequent disagreements.
+
+    Returns:
+        tuple: (DataFrame with the added columns, the boundaries as returned by 'match_admin1_to_gdf')
+    """
+    df, gdf = map_admin_regions.match_admin1_to_gdf(df, boundaries, fix_boundaries=False)
+    df['name_admin1_id'] = df['matched_admin1_id']
+    df['point_admin1_id'] = assign_admin1_by_coordinates(df, boundaries, workers=workers, snap_distance=snap_distance)
+
+    has_point = df['point_admin1_id'].notna()
+    has_name = df['name_admin1_id'].notna()
+    both = has_point & has_name
+    agree = both & (df['point_admin1_id'] == df['name_admin1_id'])
+    df['matched_admin1_id'] = df['point_admin1_id'].where(has_point, df['name_admin1_id'])
+
+    print(f"Admin-1 assignment: {has_point.sum():,} by coordinates, {(~has_point & has_name).sum():,} by name fallback, "
+          f"{(~has_point & ~has_name).sum():,} unassigned")
+    if both.any():
+        print(f"Coordinates and names agree for {agree.sum() / both.sum():.1%} of {both.sum():,} events matched both ways")
+        disagreements = (df.loc[both & ~agree, ['name_admin1_id', 'point_admin1_id']]
+                         .value_counts().head(report_top))
+        if not disagreements.empty:
+            print("Most frequent disagreements (name -> coordinates):")
+            for (name_id, point_id), count in disagreements.items():
+                print(f"  {name_id} -> {point_id}: {count:,}")
+
+    return df, gdf
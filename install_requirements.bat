@@ -5,7 +5,13 @@ echo Installing required Python packages...
 pip install --upgrade pip
 
 :: Core packages
-pip install openai python-dotenv gnews python-dateutil
+pip install openai python-dotenv gnews python-dateutil scikit-learn
+
+:: Async HTTP client and headless browser
+pip install httpx selenium
+
+:: Compressed article shards (compress articles in config.json)
+pip install zstandard
 
 :: Newspaper3k and parsing dependencies
 pip install newspaper3k lxml html5lib beautifulsoup4
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import httpx
+from newspaper import Article
+
+from news_boy import BrowserPool
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+}
+
+
+def extract_text(url : str, html : str) -> str:
+    '''
+    # Output
+    Article body text extracted from already downloaded html with newspaper3k
+    '''
+    article = Article(url)
+    article.download(input_html=html)
+    article.parse()
+    return article.text or ""
+
+
+class TierStats:
+    def __init__(self) -> None:
+        '''
+        # Output
+        Attempts, successes and latencies recorded per fetch tier
+        '''
+        self.attempts = defaultdict(int)
+        self.successes = defaultdict(int)
+        self.latencies = defaultdict(list)
+
+    def record(self, tier : str, success : bool, latency : float) -> None:
+        self.attempts[tier] += 1
+        self.successes[tier] += int(success)
+        self.latencies[tier].append(latency)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        '''
+        # Output
+        Per tier: attempts, success rate and mean / median / p95 latency in seconds
+        '''
+        result = {}
+        for tier, latencies in self.latencies.items():
+            ordered = sorted(latencies)
+            result[tier] = {
+                "attempts": self.attempts[tier],
+                "success_rate": self.successes[tier] / self.attempts[tier],
+                "mean_latency": sum(ordered) / len(ordered),
+                "p50_latency": ordered[len(ordered) // 2],
+                "p95_latency": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            }
+        return result
+
+    def report(self) -> None:
+        for tier, stats in self.summary().items():
+            print(f"[{tier}] {stats['attempts']} attempts, {stats['success_rate']:.0%} success, "
+                  f"latency mean {stats['mean_latency']:.2f}s / p50 {stats['p50_latency']:.2f}s / p95 {stats['p95_latency']:.2f}s")
+
+
+class TieredFetcher:
+    def __init__(self, min_text_length : int = 500, http_concurrency : int = 20, per_host_limit : int = 2, http_timeout : float = 15, browser_workers : int = 2, page_wait : int = 15, max_pages_per_browser : int = 50, cache = None) -> None:
+        '''
+        # Output
+        Article fetcher that tries a pooled async HTTP client first and sends only the
+        URLs that come back with too little text to a small pool of headless browsers.
+        Pages already in the content cache are not fetched again.
+        '''
+        self.cache = cache
+        self.min_text_length = min_text_length
+        self.http_concurrency = http_concurrency
+        self.per_host_limit = per_host_limit
+        self.http_timeout = http_timeout
+        self.browser_pool = BrowserPool(
+            workers=browser_workers,
+            page_wait=page_wait,
+            min_text_length=min_text_length,
+            max_pages_per_browser=max_pages_per_browser,
+            cache=cache
+        )
+        self.stats = TierStats()
+
+    async def _fetch_http(self, client : httpx.AsyncClient, url : str, host_limits : dict[str, asyncio.Semaphore]) -> str | None:
+        host = urlparse(url).netloc
+        start = time.perf_counter()
+        text = None
+        try:
+            async with host_limits[host]:
+                response = await client.get(url)
+            response.raise_for_status()
+            # Parsing is CPU bound, keep it off the event loop
+            text = await asyncio.to_thread(extract_text, str(response.url), response.text)
+        except Exception as e:
+            print(f"HTTP fetch failed for {url}: {e}")
+        success = text is not None and len(text) >= self.min_text_length
+        self.stats.record("http", success, time.perf_counter() - start)
+        if success and self.cache is not None:
+            self.cache.put(url, text, "http")
+        return text if success else None
+
+    async def _fetch_all_http(self, urls : list[str]) -> dict[str, str | None]:
+        host_limits = defaultdict(lambda: asyncio.Semaphore(self.per_host_limit))
+        limits = httpx.Limits(max_connections=self.http_concurrency, max_keepalive_connections=self.http_concurrency)
+        async with httpx.AsyncClient(headers=HEADERS, limits=limits, timeout=self.http_timeout, follow_redirects=True) as client:
+            texts = await asyncio.gather(*(self._fetch_http(client, url, host_limits) for url in urls))
+        return dict(zip(urls, texts))
+
+    def fetch_all(self, urls : list[str]) -> dict[str, str | None]:
+        '''
+        # Output
+        Dictionary of url to page text (None when neither tier got sufficient text)
+        '''
+        urls = list(dict.fromkeys(urls))
+        results = {}
+        if self.cache is not None:
+            for url in urls:
+                cached = self.cache.get(url)
+                if cached is not None:
+                    results[url] = cached["text"]
+                    self.stats.record("cache", True, 0.0)
+        to_fetch = [url for url in urls if url not in results]
+        if to_fetch:
+            results.update(asyncio.run(self._fetch_all_http(to_fetch)))
+
+        # Only pages that need JavaScript (or block plain clients) reach the browsers
+        fallback_urls = [url for url, text in results.items() if text is None]
+        if fallback_urls:
+            browser_results = self.browser_pool.fetch_all(fallback_urls)
+            for url in fallback_urls:
+                text = browser_results.get(url)
+                self.stats.record("browser", text is not None, self.browser_pool.latencies.get(url, 0.0))
+                results[url] = text
+
+        # Pages already in the cache were not rendered either
+        rendered = len(fallback_urls)
+        print(f"Rendering avoided for {len(urls) - rendered} of {len(urls)} pages")
+        self.stats.report()
+        return results
+
+    def close(self) -> None:
+        '''
+        # Output
+        Quits the browsers kept alive between batches
+        '''
+        self.browser_pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,136 @@
+import glob
+import io
+import json
+import os
+from collections import OrderedDict
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# A writer killed mid-frame leaves a truncated zstd frame at the end of a shard
+TRUNCATION_ERRORS = (zstandard.ZstdError,) if zstandard is not None else ()
+
+OUTPUT_DIR = os.path.join("testing", "outputs", "articles")
+
+
+def article_month(article : dict[str, str]) -> str:
+    '''
+    # Output
+    Publication month of a gnews article as YYYY-MM, or "unknown"
+    '''
+    try:
+        return parsedate_to_datetime(article["published date"]).strftime("%Y-%m")
+    except (KeyError, TypeError, ValueError):
+        return "unknown"
+
+
+def shard_path(root : str, country : str, month : str, run_id : str, compress : bool) -> str:
+    safe_country = country.replace("/", "_").replace(" ", "_")
+    extension = ".jsonl.zst" if compress else ".jsonl"
+    return os.path.join(root, f"country={safe_country}", f"month={month}", f"part-{run_id}{extension}")
+
+
+class ArticleSink:
+    def __init__(self, root : str = OUTPUT_DIR, compress : bool = False, run_id : str | None = None, max_open_files : int = 32) -> None:
+        '''
+        # Output
+        Append-only JSON lines writer sharded by country and publication month. Every
+        article is written (and flushed) as soon as it arrives, so memory use does not
+        grow with the crawl and a crash only loses the article being written. With
+        compress=True every article is its own zstd frame
+        '''
+        if compress and zstandard is None:
+            raise ImportError("Compressed article output needs the zstandard package (pip install zstandard)")
+        self.root = root
+        self.compress = compress
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.max_open_files = max_open_files
+        self.files = OrderedDict()
+        self.compressor = zstandard.ZstdCompressor() if compress else None
+        self.count = 0
+
+    def _file(self, path : str):
+        if path in self.files:
+            self.files.move_to_end(path)
+            return self.files[path]
+        if len(self.files) >= self.max_open_files:
+            _, oldest = self.files.popitem(last=False)
+            oldest.close()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.files[path] = open(path, "ab")
+        return self.files[path]
+
+    def write(self, article : dict[str, str]) -> None:
+        path = shard_path(self.root, article.get("country", "unknown"), article_month(article), self.run_id, self.compress)
+        line = (json.dumps(article, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        f = self._file(path)
+        f.write(self.compressor.compress(line) if self.compress else line)
+        f.flush()
+        self.count += 1
+
+    def close(self) -> None:
+        for f in self.files.values():
+            f.close()
+        self.files.clear()
+        print(f"Saved {self.count} articles to {self.root} (run {self.run_id})")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def iter_articles(root : str = OUTPUT_DIR, countries : list[str] | None = None, months : list[str] | None = None, run_id : str | None = None):
+    '''
+    # Output
+    Generator over stored articles, reading one shard line at a time. Shards can be
+    restricted to some countries, months (YYYY-MM) or a single run
+    '''
+    for path in sorted(glob.glob(os.path.join(root, "country=*", "month=*", "part-*.jsonl*"))):
+        country = os.path.basename(os.path.dirname(os.path.dirname(path)))[len("country="):]
+        month = os.path.basename(os.path.dirname(path))[len("month="):]
+        if countries is not None and country not in {c.replace("/", "_").replace(" ", "_") for c in countries}:
+            continue
+        if months is not None and month not in months:
+            continue
+        if run_id is not None and not os.path.basename(path).startswith(f"part-{run_id}."):
+            continue
+
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise ImportError(f"Reading {path} needs the zstandard package (pip install zstandard)")
+            raw = open(path, "rb")
+            reader = io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True), encoding="utf-8")
+        else:
+            raw = None
+            reader = open(path, "r", encoding="utf-8")
+        with reader:
+            try:
+                for line in reader:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # Last line of a shard whose writer was killed mid-write
+                        continue
+            except TRUNCATION_ERRORS as e:
+                print(f"Stopped reading {path} at a truncated frame: {e}")
+        if raw is not None:
+            raw.close()
+
+
+def migrate_articles_json(path : str, root : str = OUTPUT_DIR, compress : bool = False) -> int:
+    '''
+    # Output
+    Number of articles copied from a legacy json dump (save_articles_json) into the sharded store
+    '''
+    with open(path, "r", encoding="utf-8") as f:
+        articles = json.load(f)
+    with ArticleSink(root=root, compress=compress, run_id="legacy") as sink:
+        for article in articles:
+            sink.write(article)
+    return len(articles)
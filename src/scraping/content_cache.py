@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+
+class ContentCache:
+    def __init__(self, path : str = os.path.join("cache", "content_cache.sqlite"), ttl_days : float = 30, max_mb : float = 500) -> None:
+        '''
+        # Output
+        Persistent cache of fetched content (page text, search results) keyed by URL,
+        stored as zlib compressed blobs in SQLite with TTL and size based eviction
+        '''
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.ttl_seconds = ttl_days * 24 * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                method TEXT,
+                fetched_at REAL,
+                accessed_at REAL,
+                size INTEGER,
+                data BLOB
+            )"""
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON entries (accessed_at)")
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(url : str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def get(self, url : str) -> dict | None:
+        '''
+        # Output
+        Dictionary with text, method and fetched_at for a fresh entry, otherwise None
+        '''
+        key = self.make_key(url)
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT method, fetched_at, data FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self.connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self.connection.commit()
+                self.misses += 1
+                return None
+            self.connection.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.connection.commit()
+            self.hits += 1
+        return {"text": zlib.decompress(row[2]).decode("utf-8"), "method": row[0], "fetched_at": row[1]}
+
+    def put(self, url : str, text : str, method : str) -> None:
+        data = zlib.compress(text.encode("utf-8"))
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries (key, url, method, fetched_at, accessed_at, size, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.make_key(url), url, method, now, now, len(data), data)
+            )
+            self.connection.commit()
+
+    def get_json(self, url : str):
+        entry = self.get(url)
+        return None if entry is None else json.loads(entry["text"])
+
+    def put_json(self, url : str, value, method : str) -> None:
+        self.put(url, json.dumps(value, ensure_ascii=False, default=str), method)
+
+    def evict(self) -> int:
+        '''
+        # Output
+        Number of entries removed: expired entries first, then least recently used
+        entries until the cache fits in max_mb
+        '''
+        with self.lock:
+            removed = self.connection.execute(
+                "DELETE FROM entries WHERE fetched_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+            total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                to_delete = []
+                for key, size in self.connection.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                    if total <= self.max_bytes:
+                        break
+                    to_delete.append((key,))
+                    total -= size
+                self.connection.executemany("DELETE FROM entries WHERE key = ?", to_delete)
+                removed += len(to_delete)
+            self.connection.commit()
+        return removed
+
+    def close(self) -> None:
+        print(f"Content cache: {self.hits} hits, {self.misses} misses, {self.evict()} entries evicted")
+        self.connection.close()
@@ -0,0 +1,126 @@
+import hashlib
+import re
+from collections import defaultdict
+import numpy as np
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "ocid", "cmpid", "ref", "ref_src",
+    "smid", "smtyp", "icid", "ito", "sr_share", "outputtype", "amp"
+}
+HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+
+
+def canonicalize_url(url : str) -> str:
+    '''
+    # Output
+    Canonical form of a url: lower-case host without www/mobile/amp prefixes, no tracking
+    parameters or fragment, AMP path variants collapsed, remaining parameters sorted
+    '''
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    host = host.removesuffix(":80").removesuffix(":443")
+
+    path = re.sub(r"/amp/?$|\.amp$|/amp(?=/)", "", parts.path) or "/"
+    path = path.rstrip("/") or "/"
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit(("https" if parts.scheme in ("http", "https") else parts.scheme, host, path, urlencode(query), ""))
+
+
+class URLDeduplicator:
+    def __init__(self, urls : list[str] | None = None) -> None:
+        '''
+        # Output
+        Hash set of canonical urls with constant time membership checks
+        '''
+        self.seen = set()
+        for url in urls or []:
+            self.add(url)
+
+    def __contains__(self, url : str) -> bool:
+        return canonicalize_url(url) in self.seen
+
+    def __len__(self) -> int:
+        return len(self.seen)
+
+    def add(self, url : str) -> bool:
+        '''
+        # Output
+        True if the url was new (and is now recorded), False if it was already seen
+        '''
+        canonical = canonicalize_url(url)
+        if canonical in self.seen:
+            return False
+        self.seen.add(canonical)
+        return True
+
+
+def simhash(text : str, bits : int = 64, shingle_size : int = 3) -> int:
+    '''
+    # Output
+    SimHash fingerprint of the text built from hashed word shingles
+    '''
+    words = re.findall(r"\w+", text.lower())
+    shingles = [" ".join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))]
+    digests = b"".join(hashlib.blake2b(shingle.encode("utf-8"), digest_size=bits // 8).digest() for shingle in shingles)
+
+    # One row of bits per shingle; a fingerprint bit is set where most shingles have it set
+    shingle_bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(len(shingles), bits)
+    votes = 2 * shingle_bits.sum(axis=0, dtype=np.int64) - len(shingles)
+    return int("".join("1" if vote > 0 else "0" for vote in votes), 2)
+
+
+class SimHashIndex:
+    def __init__(self, max_distance : int = 3, bits : int = 64) -> None:
+        '''
+        # Output
+        Near-duplicate index over SimHash fingerprints. Fingerprints are split into
+        max_distance + 1 bands, so any two within max_distance bits share at least
+        one identical band and only those candidates are compared
+        '''
+        self.max_distance = max_distance
+        self.bits = bits
+        self.bands = max_distance + 1
+        self.band_bits = bits // self.bands
+        self.buckets = defaultdict(list)
+        self.fingerprints = {}
+
+    def _band_keys(self, fingerprint : int) -> list[tuple[int, int]]:
+        mask = (1 << self.band_bits) - 1
+        return [(band, (fingerprint >> (band * self.band_bits)) & mask) for band in range(self.bands)]
+
+    def find(self, text : str) -> str | None:
+        '''
+        # Output
+        Key of an indexed near-duplicate of the text, or None
+        '''
+        return self._find_fingerprint(simhash(text, self.bits))
+
+    def _find_fingerprint(self, fingerprint : int) -> str | None:
+        for band_key in self._band_keys(fingerprint):
+            for key in self.buckets.get(band_key, []):
+                if bin(fingerprint ^ self.fingerprints[key]).count("1") <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, key : str, text : str) -> str | None:
+        '''
+        # Output
+        Key of the near-duplicate already indexed (the text is then not added), or None
+        if the text is new and has been indexed under key
+        '''
+        fingerprint = simhash(text, self.bits)
+        duplicate_of = self._find_fingerprint(fingerprint)
+        if duplicate_of is not None:
+            return duplicate_of
+        self.fingerprints[key] = fingerprint
+        for band_key in self._band_keys(fingerprint):
+            self.buckets[band_key].append(key)
+        return None
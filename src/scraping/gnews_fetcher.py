@@ -1,13 +1,19 @@
 from gnews import GNews
 from datetime import datetime
 
+from dedup import URLDeduplicator
+
 
 class GNewsFetcher:
-    def __init__(self, country : str ="ZA", max_results : int =20, language : str ="en", start_date : datetime | None = datetime(2000,1,1), end_date : datetime | None =datetime(2025,1,1)) -> None:
+    def __init__(self, country : str ="ZA", max_results : int =20, language : str ="en", start_date : datetime | None = datetime(2000,1,1), end_date : datetime | None =datetime(2025,1,1), cache = None, rate_limiter = None) -> None:
         '''
         # Output
-        Initiates gnews search object with desired country, max search results, and relevant dates
+        Initiates gnews search object with desired country, max search results, and relevant dates.
+        If a content cache is given, search results are reused from it instead of querying gnews again.
+        If a rate limiter is given, a token is acquired before every search sent to gnews
         '''
+        self.cache = cache
+        self.rate_limiter = rate_limiter
         self.country = country
         self.max_results = max_results
         self.start_date = start_date
@@ -39,26 +45,45 @@ class GNewsFetcher:
         # Output
         Gets news articles for a single search-country query pair
         '''
-        search_result = self.gnews.get_news(search_country_query["search"])
+        search_result = self.get_news(search_country_query["search"])
         for article in search_result:
             self.add_metadata(article, search_country_query)
         return search_result
 
-    def get_bundle_search(self, search_country_queries : list[dict[str, str]], visited_urls : list[str]) -> list[dict[str, str]]:
+    def get_news(self, search : str) -> list[dict[str, str]]:
+        '''
+        # Output
+        Raw gnews results for a search, read from the content cache when available
+        '''
+        if self.cache is None:
+            return self._search_gnews(search)
+        cache_key = f"gnews://{self.country}/{self.max_results}/{self.start_date}/{self.end_date}/{search}"
+        search_result = self.cache.get_json(cache_key)
+        if search_result is None:
+            search_result = self._search_gnews(search)
+            self.cache.put_json(cache_key, search_result, "gnews")
+        return search_result
+
+    def _search_gnews(self, search : str) -> list[dict[str, str]]:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        return self.gnews.get_news(search)
+
+    def get_bundle_search(self, search_country_queries : list[dict[str, str]], visited_urls : URLDeduplicator) -> list[dict[str, str]]:
         '''
         # Output
-        Gets news articles for multiple search-country query pairs
+        Gets news articles for multiple search-country query pairs, skipping urls whose
+        canonical form (no tracking parameters, AMP or mobile variants) was already seen
         '''
         filtered_results = []
         for query in search_country_queries:
             if query["country"] != self.country:
                 self.update_config(country=query["country"])
-            search_result = self.gnews.get_news(query["search"])
+            search_result = self.get_news(query["search"])
             for article in search_result:
-                if article["url"] not in visited_urls:
+                if visited_urls.add(article["url"]):
                     self.add_metadata(article, query)
                     filtered_results.append(article)
-                    visited_urls.append(article["url"])
         return filtered_results
 
     def add_metadata(self, article : dict[str, str], search_country_query : dict[str, str]) -> None:
@@ -1,10 +1,26 @@
+import asyncio
+import hashlib
 import os
-from openai import OpenAI
+import re
+import time
+from openai import AsyncOpenAI, OpenAI
 from dotenv import load_dotenv
 
+try:
+    import tiktoken
+    ENCODING = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    ENCODING = None
+
 # Load environment and initialize OpenAI
 load_dotenv()
 
+ARTICLE_MARKER = "### ARTICLE {}"
+PACKING_NOTE = (
+    "Several articles are given below, each starting with a line '### ARTICLE n'. "
+    "Answer for every article separately, starting each answer with the same '### ARTICLE n' line."
+)
+
 class TextParser:
     def __init__(self, model="gpt-3.5-turbo"):
         self.ai= OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
@@ -17,3 +33,231 @@ class TextParser:
             input=prompt,
         )
         return response.output_text
+
+
+def count_tokens(text : str) -> int:
+    '''
+    # Output
+    Number of tokens in the text, with tiktoken when installed and about four characters per token otherwise
+    '''
+    if ENCODING is not None:
+        return len(ENCODING.encode(text))
+    return len(text) // 4 + 1
+
+
+def split_into_chunks(text : str, max_tokens : int) -> list[str]:
+    '''
+    # Output
+    Text split on paragraph boundaries into chunks of at most max_tokens tokens.
+    Paragraphs that are longer than max_tokens on their own are cut by characters
+    '''
+    chunks = []
+    current = []
+    current_tokens = 0
+    for paragraph in (p for p in text.split("\n") if p.strip()):
+        tokens = count_tokens(paragraph)
+        if tokens > max_tokens:
+            step = max(1, len(paragraph) * max_tokens // tokens)
+            pieces = [paragraph[i:i + step] for i in range(0, len(paragraph), step)]
+        else:
+            pieces = [paragraph]
+        for piece in pieces:
+            piece_tokens = count_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks or [""]
+
+
+def merge_chunk_responses(responses : list[str]) -> str:
+    '''
+    # Output
+    One response for an article answered in several chunks: "no" if every chunk said no,
+    otherwise "yes" followed by the rows of every other chunk. A chunk counts as positive
+    by the same rule as whole responses, anything but a bare "no"
+    '''
+    positive = [response for response in responses if response.strip().lower() != "no"]
+    if not positive:
+        return "no"
+    rows = [line for response in positive for line in response.strip().split("\n")[1:] if line.strip()]
+    return "\n".join(["yes"] + rows)
+
+
+class OpenAIBackend:
+    def __init__(self, model : str = "gpt-3.5-turbo", base_url : str | None = None, api_key : str | None = None) -> None:
+        '''
+        # Output
+        Async OpenAI responses API backend. base_url can point to any compatible
+        server, e.g. a local stub for testing
+        '''
+        self.model = model
+        self.client = AsyncOpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY") or "unused", base_url=base_url)
+
+    async def complete(self, instruction : str, prompt : str) -> tuple[str, int, int]:
+        '''
+        # Output
+        Response text, input tokens and output tokens
+        '''
+        response = await self.client.responses.create(model=self.model, instructions=instruction, input=prompt)
+        usage = response.usage
+        return response.output_text, getattr(usage, "input_tokens", 0) or 0, getattr(usage, "output_tokens", 0) or 0
+
+
+class StubBackend:
+    def __init__(self, response : str = "no", model : str = "stub") -> None:
+        '''
+        # Output
+        Offline backend answering every article with a fixed response, for dry runs
+        '''
+        self.response = response
+        self.model = model
+
+    async def complete(self, instruction : str, prompt : str) -> tuple[str, int, int]:
+        articles = re.findall(r"^### ARTICLE \d+$", prompt, flags=re.MULTILINE)
+        text = "\n".join(f"{marker}\n{self.response}" for marker in articles) if articles else self.response
+        return text, count_tokens(instruction + prompt), count_tokens(text)
+
+
+class LLMExtractor:
+    def __init__(self, backend, cache = None, concurrency : int = 8, max_chunk_tokens : int = 4000, max_request_tokens : int = 8000) -> None:
+        '''
+        # Output
+        Extraction stage sending articles to an LLM backend. Long articles are split into
+        chunks of max_chunk_tokens tokens, short ones are packed together into requests of up
+        to max_request_tokens tokens, at most `concurrency` requests are in flight and every
+        answer is cached under (model, instruction hash, text hash)
+        '''
+        self.backend = backend
+        self.cache = cache
+        self.concurrency = concurrency
+        self.max_chunk_tokens = max_chunk_tokens
+        self.max_request_tokens = max_request_tokens
+        self.requests = 0
+        self.cache_hits = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.latencies = []
+
+    def cache_key(self, instruction : str, prompt : str) -> str:
+        instruction_hash = hashlib.sha256(instruction.encode("utf-8")).hexdigest()
+        text_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"llm://{self.backend.model}/{instruction_hash}/{text_hash}"
+
+    async def _request(self, semaphore : asyncio.Semaphore, instruction : str, prompt : str) -> str | None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                text, input_tokens, output_tokens = await self.backend.complete(instruction, prompt)
+            except Exception as e:
+                print(f"LLM request failed: {e}")
+                return None
+        self.latencies.append(time.perf_counter() - start)
+        self.requests += 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        return text
+
+    async def _answer_single(self, semaphore : asyncio.Semaphore, instruction : str, prompt : str) -> str | None:
+        text = await self._request(semaphore, instruction, prompt)
+        if text is not None and self.cache is not None:
+            self.cache.put(self.cache_key(instruction, prompt), text, self.backend.model)
+        return text
+
+    async def _answer_pack(self, semaphore : asyncio.Semaphore, instruction : str, prompts : list[str]) -> list[str | None]:
+        if len(prompts) == 1:
+            return [await self._answer_single(semaphore, instruction, prompts[0])]
+        packed = "\n\n".join(f"{ARTICLE_MARKER.format(i)}\n{prompt}" for i, prompt in enumerate(prompts, start=1))
+        text = await self._request(semaphore, f"{instruction}\n\n{PACKING_NOTE}", packed)
+        answers = {}
+        if text is not None:
+            parts = re.split(r"^### ARTICLE (\d+)\s*$", text, flags=re.MULTILINE)
+            answers = {int(number): answer.strip() for number, answer in zip(parts[1::2], parts[2::2])}
+        for i, prompt in enumerate(prompts, start=1):
+            if i in answers and self.cache is not None:
+                self.cache.put(self.cache_key(instruction, prompt), answers[i], self.backend.model)
+        # Articles the model skipped or merged (packed format not kept) are asked for on their own
+        missing = [i for i in range(1, len(prompts) + 1) if i not in answers]
+        retried = await asyncio.gather(*(self._answer_single(semaphore, instruction, prompts[i - 1]) for i in missing))
+        answers.update(zip(missing, retried))
+        return [answers[i] for i in range(1, len(prompts) + 1)]
+
+    def _pack(self, instruction : str, prompts : list[str]) -> list[list[str]]:
+        budget = self.max_request_tokens - count_tokens(instruction) - count_tokens(PACKING_NOTE)
+        packs = []
+        current = []
+        current_tokens = 0
+        for prompt in prompts:
+            tokens = count_tokens(prompt) + 8
+            if current and current_tokens + tokens > budget:
+                packs.append(current)
+                current = []
+                current_tokens = 0
+            current.append(prompt)
+            current_tokens += tokens
+        if current:
+            packs.append(current)
+        return packs
+
+    async def _extract_all(self, pending : dict[str, list[str]]) -> dict[tuple[str, str], str | None]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        jobs = []
+        for instruction, prompts in pending.items():
+            for pack in self._pack(instruction, prompts):
+                jobs.append((instruction, pack))
+        answers = await asyncio.gather(*(self._answer_pack(semaphore, instruction, pack) for instruction, pack in jobs))
+        return {
+            (instruction, prompt): answer
+            for (instruction, pack), pack_answers in zip(jobs, answers)
+            for prompt, answer in zip(pack, pack_answers)
+        }
+
+    def extract_all(self, items : list[dict[str, str]]) -> dict[str, str | None]:
+        '''
+        # Input
+        List of dictionaries with an id, the instruction, the query put before the text, and the text
+        # Output
+        Dictionary of id to response ("no" or "yes" followed by rows), None if a request failed
+        '''
+        start = time.perf_counter()
+        item_prompts = {}
+        pending = {}
+        answered = {}
+        queued = set()
+        for item in items:
+            chunk_tokens = self.max_chunk_tokens - count_tokens(item["query"])
+            prompts = [f"{item['query']} {chunk}" for chunk in split_into_chunks(item["text"], chunk_tokens)]
+            item_prompts[item["id"]] = (item["instruction"], prompts)
+            for prompt in prompts:
+                key = (item["instruction"], prompt)
+                if key in answered or key in queued:
+                    continue
+                cached = None if self.cache is None else self.cache.get(self.cache_key(*key))
+                if cached is not None:
+                    answered[key] = cached["text"]
+                    self.cache_hits += 1
+                else:
+                    queued.add(key)
+                    pending.setdefault(item["instruction"], []).append(prompt)
+
+        if pending:
+            answered.update(asyncio.run(self._extract_all(pending)))
+
+        results = {}
+        for item_id, (instruction, prompts) in item_prompts.items():
+            responses = [answered.get((instruction, prompt)) for prompt in prompts]
+            results[item_id] = None if any(response is None for response in responses) else (
+                responses[0] if len(responses) == 1 else merge_chunk_responses(responses)
+            )
+        self.report(time.perf_counter() - start)
+        return results
+
+    def report(self, elapsed : float) -> None:
+        ordered = sorted(self.latencies)
+        latency = f", latency p50 {ordered[len(ordered) // 2]:.2f}s / p95 {ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]:.2f}s" if ordered else ""
+        print(f"LLM: {self.requests} requests, {self.cache_hits} cached answers, "
+              f"{self.input_tokens} input / {self.output_tokens} output tokens in {elapsed:.1f}s{latency}")
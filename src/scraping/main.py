@@ -1,10 +1,14 @@
 # LOADING AND IMPORTING LIBRARIES
-from gnews_fetcher import GNewsFetcher
+from query_scheduler import QueryScheduler
 import logic_parser as logic
-from news_boy import BrowserSim
+from article_fetcher import TieredFetcher
+from content_cache import ContentCache
+from dedup import URLDeduplicator, SimHashIndex
+from relevance_filter import RelevanceFilter
+from article_sink import ArticleSink, iter_articles
 import utils
 
-import os, json
+import os, json, itertools
 
 print("loading configurations...")
 # LOADING CONFIGURATIONS
@@ -21,6 +25,23 @@ gnews_filter = config['gnews_filter']
 max_results = config['max results']
 page_timeout = config['page timeout']
 min_page_text_length = config['min page text length']
+browser_workers = config['browser workers']
+max_pages_per_browser = config['max pages per browser']
+http_concurrency = config['http concurrency']
+http_per_host = config['http per host']
+near_duplicate_distance = config['near duplicate distance']
+search_workers = config['search workers']
+search_rate = config['search rate']
+search_burst = config['search burst']
+search_retries = config['search retries']
+article_batch_size = config['article batch size']
+articles_dir = config['articles dir']
+compress_articles = config['compress articles']
+content_cache = ContentCache(
+    path=os.path.join(os.path.dirname(__file__), config['cache path']),
+    ttl_days=config['cache ttl days'],
+    max_mb=config['cache max mb']
+)
 
 prompts = json.load(open(os.path.join(os.path.dirname(__file__), "prompts.json")))
 news_instruction = prompts["instructions"]["news_instruction"]
@@ -35,7 +56,7 @@ gnews_searches = utils.generate_search_queries(
     years=years
 )
 print(f"Generated {len(gnews_searches)} searches.")
-visited_urls = []
+visited_urls = URLDeduplicator()
 
 print("generating prompts...")
 # GENERATE PROMPTS FOR PARSING AND FILTERING
@@ -44,55 +65,108 @@ news_reminder = utils.generate_instructions(news_reminder, metrics)
 
 print("fetching news articles...")
 # FETCHING URLS
-news_agent = GNewsFetcher(country=countries[gnews_searches[0]["country"]], max_results=max_results)
-google_news_articles = news_agent.get_bundle_search(search_country_queries=gnews_searches, visited_urls=visited_urls)
+news_agent = QueryScheduler(
+    max_results=max_results,
+    workers=search_workers,
+    rate=search_rate,
+    burst=search_burst,
+    max_retries=search_retries,
+    checkpoint_path=os.path.join(os.path.dirname(__file__), config['search checkpoint path']),
+    cache=content_cache
+)
+google_news_articles = news_agent.run(search_country_queries=gnews_searches, visited_urls=visited_urls)
 print(f"Fetched a whole {len(google_news_articles)} articles...")
 
 print("fetching website data...")
-# BROWSING AND GETTING FULL TEXT
-accessed_articles = []
-browser = BrowserSim(page_wait=page_timeout, min_text_length=min_page_text_length)
-browser.start()
-for article in google_news_articles:
-    full_text = browser.get_page(article["url"])
-    if full_text is None:
-        continue
-    article["full_text"] = full_text
-    accessed_articles.append(article)
-browser.end()
-print(f"Accessed {len(accessed_articles)} articles with full text.")
-
-#TODO testing functionality of saving and loading json
-utils.save_articles_json(accessed_articles, filename="accessed_articles.json")
-
-# print("parsing articles...")
-# parsed_articles = [] # MAKE MORE EFFICIENT
-# # PARSE ARTICLES
-# for article in accessed_articles:
-#     # url = article["url"]
-#     # if url in visited_urls:
-#     #     continue
-#     # visited_urls.append(article["url"])
-    
-#     full_text = get_news_data(article["url"], page_delay=page_timeout, overall_timeout=overall_timeout)
-#     if full_text is None:
-#         print(f"Failed to fetch article at {url}, skipping...")
-#         continue
-        
-#     article["full_text"] = full_text
-#     print(f"Summary: {full_text[:500]}...")  # Print first 500 characters of the article text
+# BROWSING AND GETTING FULL TEXT, in batches written straight to disk so memory stays flat
+article_fetcher = TieredFetcher(
+    min_text_length=min_page_text_length,
+    http_concurrency=http_concurrency,
+    per_host_limit=http_per_host,
+    browser_workers=browser_workers,
+    page_wait=page_timeout,
+    max_pages_per_browser=max_pages_per_browser,
+    cache=content_cache
+)
+# Syndicated copies of the same story only differ by a few words, drop them before parsing
+near_duplicates = SimHashIndex(max_distance=near_duplicate_distance)
+duplicate_count = 0
+article_sink = ArticleSink(root=os.path.join(os.getcwd(), articles_dir), compress=compress_articles)
+for start in range(0, len(google_news_articles), article_batch_size):
+    batch = google_news_articles[start:start + article_batch_size]
+    page_texts = article_fetcher.fetch_all([article["url"] for article in batch])
+    for article in batch:
+        full_text = page_texts.get(article["url"])
+        if full_text is None:
+            continue
+        if near_duplicates.add(article["url"], full_text) is not None:
+            duplicate_count += 1
+            continue
+        article["full_text"] = full_text
+        article_sink.write(article)
+article_fetcher.close()
+article_sink.close()
+print(f"Accessed {article_sink.count} articles with full text ({duplicate_count} near-duplicates dropped).")
 
-#     response = filtering_agent.get_chatgpt_response(
-#         instruction_prompt, 
-#         f"{news_query_prompt.replace('[country]', article['country'])} {article['full_text'][:min(len(article['full_text']), 4000*4)]}" 
-#     )
-#     if response.lower().strip() == "no":
-#         continue
-    
-#     formatted_response = [row.split(',') for row in response.strip().split("\n")[1:]]
-#     article["response"] = formatted_response
-#     print(f"Response: {response}")
-#     parsed_articles.append(article)
+print("filtering and parsing articles...")
+# LOCAL PRE-FILTER, only likely relevant articles (and a small audit sample) reach the LLM
+relevance_filter = RelevanceFilter(
+    metrics=metrics,
+    model_path=os.path.join(os.path.dirname(__file__), config['relevance model path']),
+    labels_path=os.path.join(os.path.dirname(__file__), config['relevance labels path']),
+    threshold=config['relevance threshold'],
+    audit_rate=config['relevance audit rate'],
+    min_labels=config['relevance min labels']
+)
+# PARSE ARTICLES, long articles are chunked rather than truncated and short ones share requests
+if config['llm backend'] == "stub":
+    llm_backend = logic.StubBackend()
+else:
+    llm_backend = logic.OpenAIBackend(model=config['llm model'], base_url=config['llm base url'])
+extractor = logic.LLMExtractor(
+    backend=llm_backend,
+    cache=content_cache,
+    concurrency=config['llm concurrency'],
+    max_chunk_tokens=config['llm max chunk tokens'],
+    max_request_tokens=config['llm max request tokens']
+)
+parsed_articles = []
+filter_results, labels = [], []
+accessed_articles = iter_articles(root=os.path.join(os.getcwd(), articles_dir), run_id=article_sink.run_id)
+while True:
+    batch = list(itertools.islice(accessed_articles, article_batch_size))
+    if not batch:
+        break
+    articles_to_parse, skipped_articles = relevance_filter.split(batch)
+    responses = extractor.extract_all([
+        {
+            "id": article["url"],
+            "instruction": news_instruction.replace("[country]", article["country"]),
+            "query": news_reminder.replace("[country]", article["country"]),
+            "text": article["full_text"]
+        }
+        for article in articles_to_parse
+    ])
+    labelled_articles = [article for article in articles_to_parse if responses.get(article["url"]) is not None]
+    batch_labels = [responses[article["url"]].lower().strip() != "no" for article in labelled_articles]
+    relevance_filter.record_labels(labelled_articles, batch_labels)
+    filter_results.extend({"relevance_passed": article["relevance_passed"]} for article in labelled_articles)
+    labels.extend(batch_labels)
+    for article, label in zip(labelled_articles, batch_labels):
+        if not label:
+            continue
+        article["response"] = [row.split(',') for row in responses[article["url"]].strip().split("\n")[1:]]
+        # Only the extracted rows are needed downstream, the text stays on disk
+        article.pop("full_text")
+        parsed_articles.append(article)
+print(f"Parsed {len(parsed_articles)} articles with relevant events.")
+# The LLM answers are the labels the pre-filter learns from
+relevance_filter.evaluate(filter_results, labels)
+relevance_filter.train()
+content_cache.close()
 
-# #SAVE TO CSV
-# utils.save_to_csv(parsed_articles)
\ No newline at end of file
+#SAVE TO CSV, one table per metric plus the tables merged across runs
+event_rows = [row for article in parsed_articles for row in article["response"]]
+if event_rows:
+    utils.save_to_csv(event_rows, metrics, countries_names, output_dir=os.path.join(os.getcwd(), "outputs"), file_format=config['event table format'])
+    utils.combine_event_tables(output_dir=os.path.join(os.getcwd(), "outputs"), file_format=config['event table format'])
\ No newline at end of file
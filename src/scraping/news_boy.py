@@ -1,6 +1,10 @@
+import threading
+import time
+from queue import Queue, Empty
 from newspaper import Article
 from playwright.sync_api import sync_playwright
 from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -48,8 +52,12 @@ def get_news_site(url, page_delay = 3000, overall_timeout = 30000):
         print(f"Playwright failed for {url}: {e}")
         return None
 
+class BrowserStartError(RuntimeError):
+    pass
+
+
 class BrowserSim:
-    def __init__(self, page_wait = 15, min_text_length = 500):
+    def __init__(self, page_wait = 15, min_text_length = 500, page_timeout = 30, max_pages = 50, cache = None):
         options = Options()
         options.add_argument("--headless=new")
         options.add_argument("--disable-gpu")
@@ -58,12 +66,39 @@ class BrowserSim:
         self.options = options
         self.page_wait = page_wait
         self.min_text_length = min_text_length
+        self.page_timeout = page_timeout
+        self.max_pages = max_pages
+        self.cache = cache
+        self.driver = None
+        self.pages_served = 0
         
     def start(self):
-        self.driver = webdriver.Chrome(options=self.options)
+        self.end()
+        try:
+            self.driver = webdriver.Chrome(options=self.options)
+            self.driver.set_page_load_timeout(self.page_timeout)
+        except Exception as e:
+            self.end()
+            raise BrowserStartError(f"Chrome failed to start: {e}") from e
+        self.pages_served = 0
 
-    def get_page(self, url):
+    def recycle(self):
+        '''
+        # Output
+        Quits the current Chrome process and launches a fresh one
+        '''
         self.start()
+
+    def get_page(self, url):
+        if self.cache is not None:
+            cached = self.cache.get(url)
+            if cached is not None:
+                return cached["text"]
+
+        # Reuse the running browser; only relaunch when missing or past its page budget
+        if self.driver is None or self.pages_served >= self.max_pages:
+            self.recycle()
+        self.pages_served += 1
         try:
             self.driver.get(url)
 
@@ -92,13 +127,122 @@ class BrowserSim:
                 page_text = body_text
 
             print(page_text[:100])
+            if self.cache is not None:
+                self.cache.put(url, page_text, "selenium")
             return page_text
+        except TimeoutException as e:
+            print(f"Continuing... but\nSelenium timed out for {url}: {e}")
+        except WebDriverException as e:
+            # Crashed or hung browser: quit it so the next page starts a clean process
+            print(f"Continuing... but\nSelenium failed for {url}, recycling browser: {e}")
+            self.end()
         except Exception as e:
             print(f"Continuing... but\nSelenium failed for {url}: {e}")
 
     def end(self):
-        self.driver.quit()
-        
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                print(f"Failed to quit browser cleanly: {e}")
+            self.driver = None
+
+
+class BrowserPool:
+    def __init__(self, workers : int = 4, page_wait : int = 15, min_text_length : int = 500, page_timeout : int = 30, max_pages_per_browser : int = 50, cache = None, start_retries : int = 2) -> None:
+        '''
+        # Output
+        Bounded pool of long-lived headless browsers that fetch a queue of URLs concurrently.
+        Browsers are started on first use and kept alive across fetch_all calls, recycled
+        after max_pages_per_browser pages or when they crash, and quit by close().
+        A browser that fails to start is retried start_retries times, after which its
+        worker stops for the call and its URLs go to the other workers
+        '''
+        self.workers = workers
+        self.start_retries = start_retries
+        self.browsers = [
+            BrowserSim(
+                page_wait=page_wait,
+                min_text_length=min_text_length,
+                page_timeout=page_timeout,
+                max_pages=max_pages_per_browser,
+                cache=cache
+            )
+            for _ in range(workers)
+        ]
+        self.stats = {"pages": 0, "succeeded": 0, "seconds": 0.0}
+        self.latencies = {}
+
+    def _worker(self, browser : BrowserSim, url_queue : Queue, results : dict[str, str | None], lock : threading.Lock) -> None:
+        failed_starts = 0
+        while True:
+            try:
+                url = url_queue.get_nowait()
+            except Empty:
+                return
+            start = time.perf_counter()
+            try:
+                page_text = browser.get_page(url)
+            except BrowserStartError as e:
+                # Give the URL back so this or another worker can still fetch it
+                url_queue.put(url)
+                failed_starts += 1
+                if failed_starts > self.start_retries:
+                    print(f"{e}, stopping this browser worker after {failed_starts} attempts")
+                    return
+                print(f"{e}, retrying")
+                time.sleep(failed_starts)
+                continue
+            failed_starts = 0
+            with lock:
+                results[url] = page_text
+                self.latencies[url] = time.perf_counter() - start
+
+    def fetch_all(self, urls : list[str]) -> dict[str, str | None]:
+        '''
+        # Output
+        Dictionary of url to page text (None when no sufficient text could be fetched)
+        '''
+        url_queue = Queue()
+        for url in dict.fromkeys(urls):
+            url_queue.put(url)
+
+        results, lock = {}, threading.Lock()
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._worker, args=(browser, url_queue, results, lock), daemon=True)
+            for browser in self.browsers[:min(self.workers, url_queue.qsize())]
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # URLs left over when no browser could be started
+        while not url_queue.empty():
+            results[url_queue.get_nowait()] = None
+        elapsed = time.perf_counter() - start
+
+        self.stats["pages"] += len(results)
+        self.stats["succeeded"] += sum(text is not None for text in results.values())
+        self.stats["seconds"] += elapsed
+        print(f"Fetched {len(results)} pages with {len(threads)} browsers in {elapsed:.1f}s "
+              f"({len(results) / max(elapsed, 1e-9) * 60:.1f} pages/minute)")
+        return results
+
+    def close(self) -> None:
+        '''
+        # Output
+        Quits every running browser
+        '''
+        for browser in self.browsers:
+            browser.end()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
 def testing():
     url = "https://www.aljazeera.com/news/2025/8/9/india-says-six-pakistani-aircraft-shot-down-during-kashmir-conflict"
     browser = BrowserSim()
@@ -0,0 +1,179 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from dedup import URLDeduplicator
+from gnews_fetcher import GNewsFetcher
+
+
+class TokenBucket:
+    def __init__(self, rate : float = 1.0, capacity : int = 5) -> None:
+        '''
+        # Output
+        Thread safe token bucket allowing `rate` requests per second on average
+        with bursts of up to `capacity` requests
+        '''
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        '''
+        # Output
+        Blocks until a token is available and consumes it
+        '''
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class QueryCheckpoint:
+    def __init__(self, path : str) -> None:
+        '''
+        # Output
+        Append-only JSON lines file of completed queries and their raw results,
+        so an interrupted run can resume from where it stopped
+        '''
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.completed = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A run killed mid-write leaves at most one partial line
+                        continue
+                    self.completed[self.make_key(record)] = record["results"]
+
+    @staticmethod
+    def make_key(query : dict[str, str]) -> tuple[str, str]:
+        return (query["country"], query["search"])
+
+    def __contains__(self, query : dict[str, str]) -> bool:
+        return self.make_key(query) in self.completed
+
+    def __len__(self) -> int:
+        return len(self.completed)
+
+    def get(self, query : dict[str, str]) -> list[dict[str, str]]:
+        return self.completed[self.make_key(query)]
+
+    def add(self, query : dict[str, str], results : list[dict[str, str]]) -> None:
+        line = json.dumps({"country": query["country"], "search": query["search"], "results": results}, ensure_ascii=False, default=str)
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.completed[self.make_key(query)] = results
+
+    def clear(self) -> None:
+        '''
+        # Output
+        Removes the checkpoint once a run has completed, so the next run starts fresh
+        '''
+        with self.lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self.completed = {}
+
+
+class QueryScheduler:
+    def __init__(self, max_results : int = 20, start_date : datetime | None = datetime(2000,1,1), end_date : datetime | None = datetime(2025,1,1), workers : int = 4, rate : float = 1.0, burst : int = 5, max_retries : int = 3, backoff : float = 2.0, checkpoint_path : str | None = None, cache = None) -> None:
+        '''
+        # Output
+        Runs gnews search-country queries concurrently. Queries are grouped by country
+        so each worker reuses one GNewsFetcher per country, all requests sent to gnews share
+        a token bucket rate limiter (cache hits take no token), failed requests are retried with exponential backoff and
+        completed queries are checkpointed so reruns skip them
+        '''
+        self.max_results = max_results
+        self.start_date = start_date
+        self.end_date = end_date
+        self.workers = workers
+        self.rate_limiter = TokenBucket(rate=rate, capacity=burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.checkpoint = QueryCheckpoint(checkpoint_path) if checkpoint_path else None
+        self.cache = cache
+        self.failed = []
+
+    def _search_with_retry(self, fetcher : GNewsFetcher, query : dict[str, str]) -> list[dict[str, str]] | None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return fetcher.get_news(query["search"])
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"Search failed after {attempt + 1} attempts for '{query['search']}': {e}")
+                    return None
+                # Exponential backoff with jitter so workers do not retry in lockstep
+                time.sleep(self.backoff * (2 ** attempt) * (1 + random.random()))
+        return None
+
+    def _run_country(self, country : str, queries : list[dict[str, str]]) -> dict[tuple[str, str], list[dict[str, str]]]:
+        fetcher = GNewsFetcher(country=country, max_results=self.max_results, start_date=self.start_date, end_date=self.end_date, cache=self.cache, rate_limiter=self.rate_limiter)
+        results = {}
+        for query in queries:
+            search_result = self._search_with_retry(fetcher, query)
+            if search_result is None:
+                self.failed.append(query)
+                continue
+            results[QueryCheckpoint.make_key(query)] = search_result
+            if self.checkpoint is not None:
+                self.checkpoint.add(query, search_result)
+        return results
+
+    def run(self, search_country_queries : list[dict[str, str]], visited_urls : URLDeduplicator) -> list[dict[str, str]]:
+        '''
+        # Output
+        Gets news articles for all search-country query pairs, with the same ordering
+        and url deduplication as GNewsFetcher.get_bundle_search
+        '''
+        results = {}
+        by_country = defaultdict(list)
+        for query in search_country_queries:
+            if self.checkpoint is not None and query in self.checkpoint:
+                results[QueryCheckpoint.make_key(query)] = self.checkpoint.get(query)
+            else:
+                by_country[query["country"]].append(query)
+        pending = sum(len(queries) for queries in by_country.values())
+        print(f"{len(search_country_queries) - pending} searches restored from checkpoint, {pending} to run across {len(by_country)} countries")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._run_country, country, queries) for country, queries in by_country.items()]
+            for done, future in enumerate(as_completed(futures), start=1):
+                results.update(future.result())
+                print(f"Countries searched: {done}/{len(futures)}")
+        elapsed = time.perf_counter() - start
+        if pending:
+            print(f"Ran {pending - len(self.failed)} searches in {elapsed:.1f}s ({(pending - len(self.failed)) / max(elapsed, 1e-9):.2f} searches/s), {len(self.failed)} failed")
+
+        if self.checkpoint is not None and not self.failed:
+            self.checkpoint.clear()
+
+        # Merge in the original query order so deduplication keeps the same articles as a serial run
+        filtered_results = []
+        for query in search_country_queries:
+            for article in results.get(QueryCheckpoint.make_key(query), []):
+                if visited_urls.add(article["url"]):
+                    article = dict(article)
+                    article["country"] = query["country"]
+                    article["search"] = query["search"]
+                    filtered_results.append(article)
+        return filtered_results
@@ -0,0 +1,146 @@
+import json
+import os
+import pickle
+import re
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+
+
+class RelevanceFilter:
+    def __init__(self, metrics : list[str], model_path : str | None = None, labels_path : str | None = None, threshold : float = 0.2, audit_rate : float = 0.1, min_labels : int = 200, seed : int = 42) -> None:
+        '''
+        # Output
+        Local pre-filter deciding which articles are worth an LLM call. Until enough LLM
+        labels exist it passes articles that mention both their country and a metric word;
+        after that a hashed-feature logistic regression trained on past LLM yes/no answers
+        scores them. A random `audit_rate` share of rejected articles is still sent to the
+        LLM so recall can be measured
+        '''
+        self.metrics = metrics
+        metric_words = sorted({word for metric in metrics for word in metric.lower().split()}, key=len, reverse=True)
+        self.metric_pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, metric_words)) + r")(?:s|es)?\b", flags=re.IGNORECASE)
+        self.vectorizer = HashingVectorizer(n_features=2 ** 18, ngram_range=(1, 2), alternate_sign=False, stop_words="english")
+        self.model_path = model_path
+        self.labels_path = labels_path
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self.min_labels = min_labels
+        self.rng = np.random.default_rng(seed)
+        self.classifier = None
+        if model_path and os.path.exists(model_path):
+            with open(model_path, "rb") as f:
+                self.classifier = pickle.load(f)
+
+    def keyword_features(self, articles : list[dict[str, str]]) -> np.ndarray:
+        '''
+        # Output
+        Array of shape (articles, 2): article mentions its own country, article mentions a metric word
+        '''
+        frame = pd.DataFrame({
+            "text": [article.get("full_text", "") for article in articles],
+            "country": [article["country"] for article in articles]
+        })
+        metric_hit = frame["text"].str.contains(self.metric_pattern, regex=True).to_numpy()
+        country_hit = np.zeros(len(frame), dtype=bool)
+        for country, rows in frame.groupby("country").groups.items():
+            pattern = re.compile(r"\b" + re.escape(country) + r"\b", flags=re.IGNORECASE)
+            country_hit[rows] = frame.loc[rows, "text"].str.contains(pattern, regex=True).to_numpy()
+        return np.column_stack([country_hit, metric_hit]).astype(np.float64)
+
+    def features(self, articles : list[dict[str, str]]) -> sparse.csr_matrix:
+        texts = [f"{article.get('title', '')} {article.get('full_text', '')}" for article in articles]
+        return sparse.hstack([self.vectorizer.transform(texts), sparse.csr_matrix(self.keyword_features(articles))]).tocsr()
+
+    def score(self, articles : list[dict[str, str]]) -> np.ndarray:
+        '''
+        # Output
+        Relevance score per article in [0, 1], scored as one batch
+        '''
+        if not articles:
+            return np.zeros(0)
+        if self.classifier is None:
+            return self.keyword_features(articles).min(axis=1)
+        return self.classifier.predict_proba(self.features(articles))[:, 1]
+
+    def split(self, articles : list[dict[str, str]]) -> tuple[list[dict[str, str]], list[dict[str, str]]]:
+        '''
+        # Output
+        Articles to send to the LLM (likely relevant plus the audit sample) and articles skipped.
+        Each sent article gets "relevance_score" and "relevance_passed" fields
+        '''
+        scores = self.score(articles)
+        passed = scores >= self.threshold
+        audited = ~passed & (self.rng.random(len(articles)) < self.audit_rate)
+        to_send, skipped = [], []
+        for article, article_score, article_passed, article_audited in zip(articles, scores, passed, audited):
+            article["relevance_score"] = float(article_score)
+            article["relevance_passed"] = bool(article_passed)
+            (to_send if article_passed or article_audited else skipped).append(article)
+        print(f"Relevance filter: {passed.sum()} of {len(articles)} articles passed, {audited.sum()} rejected articles audited, "
+              f"{len(skipped)} LLM calls saved ({len(skipped) / max(len(articles), 1):.0%})")
+        return to_send, skipped
+
+    def evaluate(self, articles : list[dict[str, str]], labels : list[bool]) -> dict[str, float]:
+        '''
+        # Output
+        Precision and recall of the filter against LLM labels of the articles sent. Audited
+        articles stand in for all rejected ones, so they are weighted by 1 / audit_rate
+        '''
+        passed = np.array([article["relevance_passed"] for article in articles], dtype=bool)
+        labels = np.asarray(labels, dtype=bool)
+        weights = np.where(passed, 1.0, 1.0 / self.audit_rate) if self.audit_rate > 0 else np.ones(len(passed))
+        true_positive = weights[passed & labels].sum()
+        false_negative = weights[~passed & labels].sum()
+        result = {
+            "precision": true_positive / passed.sum() if passed.any() else float("nan"),
+            "recall": true_positive / (true_positive + false_negative) if labels.any() else float("nan"),
+        }
+        print(f"Relevance filter vs LLM labels: precision {result['precision']:.2f}, recall {result['recall']:.2f} (estimated from audited rejections)")
+        return result
+
+    def record_labels(self, articles : list[dict[str, str]], labels : list[bool]) -> None:
+        '''
+        # Output
+        Appends LLM yes/no labels to the labels file used for training
+        '''
+        if not self.labels_path:
+            return
+        os.makedirs(os.path.dirname(self.labels_path) or ".", exist_ok=True)
+        with open(self.labels_path, "a", encoding="utf-8") as f:
+            for article, label in zip(articles, labels):
+                record = {key: article.get(key, "") for key in ("url", "country", "title", "full_text")}
+                record["label"] = bool(label)
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def load_labels(self) -> tuple[list[dict[str, str]], list[bool]]:
+        records = {}
+        if self.labels_path and os.path.exists(self.labels_path):
+            with open(self.labels_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    records[record["url"]] = record
+        return list(records.values()), [record["label"] for record in records.values()]
+
+    def train(self) -> bool:
+        '''
+        # Output
+        True if the classifier was (re)trained on the stored labels and saved. Needs
+        min_labels labels covering both answers
+        '''
+        articles, labels = self.load_labels()
+        if len(labels) < self.min_labels or len(set(labels)) < 2:
+            print(f"Relevance filter: {len(labels)} labels stored, keyword rule stays in use until {self.min_labels} with both answers")
+            return False
+        classifier = SGDClassifier(loss="log_loss", class_weight="balanced", alpha=1e-5, max_iter=50, random_state=42)
+        classifier.fit(self.features(articles), np.asarray(labels, dtype=int))
+        self.classifier = classifier
+        if self.model_path:
+            os.makedirs(os.path.dirname(self.model_path) or ".", exist_ok=True)
+            with open(self.model_path, "wb") as f:
+                pickle.dump(classifier, f)
+        print(f"Relevance filter: classifier trained on {len(labels)} labels ({sum(labels)} relevant)")
+        return True
@@ -1,8 +1,9 @@
 import os
+import re
 from datetime import datetime
 from dateutil import parser
+import numpy as np
 import pandas as pd
-import json
 
 def generate_search_queries(google_search_templates : list[str], country_names : list[str], search_metrics : list[str], years : list[str]) -> list[dict]:
     '''
@@ -33,30 +34,88 @@ def display_article_results(articles : list[dict]):
 def generate_instructions(any_text : str, metrics : list[str]) -> str:
     return any_text.replace("[all metrics]", ", ".join(metrics))
 
-def save_articles_json(articles, filename="articles.json"):
-    output_dir = os.path.join(os.getcwd(),"testing", "outputs")
-    os.makedirs(output_dir, exist_ok=True)
-    filepath = os.path.join(output_dir, filename)
+def parse_dates(date_strings : list[str]) -> dict[str, datetime | None]:
+    '''
+    # Outputs
+    Dictionary of each distinct date string to its first-of-month datetime (None if unparseable).
+    Every distinct string is parsed once, however often it appears
+    '''
+    parsed = {}
+    for date_str in dict.fromkeys(date_strings):
+        try:
+            # Missing day fields default to the 1st rather than today's day, which breaks short months
+            parsed[date_str] = parser.parse(date_str, default=datetime(2000, 1, 1)).replace(day=1)
+        except Exception as e:
+            print(f"Skipping unparseable date {date_str}: {e}")
+            parsed[date_str] = None
+    return parsed
+
+
+def build_event_matrix(
+    data: list[list[str]],
+    metrics: list[str],
+    countries: list[str],
+) -> tuple[np.ndarray, list[str], pd.DatetimeIndex]:
+    """
+    Builds a binary (metric, country, month) event array from parsed article rows.
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(articles, f, ensure_ascii=False, indent=2)
-    print(f"Saved {len(articles)} articles to {filepath}")
+    Dates are parsed once per distinct string, every (country, metric, month) triple is
+    mapped to integer coordinates and the array is filled in a single scatter.
 
-def load_articles_json(filename="articles.json"):
-    filepath = os.path.join(os.getcwd(), "testing", "outputs", filename)
-    with open(filepath, "r", encoding="utf-8") as f:
-        return json.load(f)
+    Parameters
+    ----------
+    data : list[list[str]]
+        List of rows, each [country, metric, date1, date2, ...].
+    metrics : list[str]
+        Known metrics; rows with other metrics are ignored.
+    countries : list[str]
+        Country names. Countries only found in the data are appended.
 
+    Returns
+    -------
+    tuple
+        Array of shape (metrics, countries, months), the country list and the months.
+    """
+    # Flatten rows into one (country, metric, date string) record per date
+    row_countries, row_metrics, row_dates = [], [], []
+    for row in data:
+        if len(row) < 3:
+            continue
+        country, metric, *dates = row
+        for date_str in dates:
+            row_countries.append(country.strip())
+            row_metrics.append(metric.strip())
+            row_dates.append(date_str.strip())
+
+    parsed = parse_dates(row_dates)
+    months = pd.Series([parsed[date_str] for date_str in row_dates], dtype="datetime64[ns]")
+    if months.notna().sum() == 0:
+        raise ValueError("No valid dates found!")
+    all_months = pd.date_range(start=months.min(), end=months.max(), freq="MS")
 
-def save_to_csv( # TODO
+    countries = list(dict.fromkeys(list(countries) + row_countries))
+    country_idx = pd.Index(countries).get_indexer(row_countries)
+    metric_idx = pd.Index(metrics).get_indexer(row_metrics)
+    month_idx = all_months.get_indexer(months)
+
+    keep = (metric_idx >= 0) & (month_idx >= 0)
+    events = np.zeros((len(metrics), len(countries), len(all_months)), dtype=np.int8)
+    events[metric_idx[keep], country_idx[keep], month_idx[keep]] = 1
+    return events, countries, all_months
+
+
+def save_to_csv(
     data: list[list[str]],
     metrics: list[str],
     countries: list[str],
     output_dir: str = "outputs",
     date_format: str = "%m-%Y",  # default numeric month-year
-) -> None:
+    file_format: str = "csv",
+) -> list[str]:
     """
-    Saves parsed article data into CSV files, one per metric.
+    Saves parsed article data into CSV (or Parquet) files, one per metric.
+
+    All metric tables come from one event array built by build_event_matrix.
 
     Parameters
     ----------
@@ -72,56 +131,74 @@ def save_to_csv( # TODO
     date_format : str, optional
         Format string for month-year labels (default: "%m-%Y").
         Examples: "%m-%Y" → "08-2022", "%B-%Y" → "August-2022"
-    """
-    print("Saving results to CSV...")
-
-    # Parse all dates and determine full month range
-    all_dates = []
-    for row in data:
-        for date_str in row[2:]:
-            try:
-                dt = parser.parse(date_str)
-                all_dates.append(dt.replace(day=1))
-            except Exception as e:
-                print(f"Skipping unparseable date {date_str}: {e}")
-
-    if not all_dates:
-        raise ValueError("No valid dates found!")
+    file_format : str, optional
+        "csv" (default) or "parquet".
 
-    start = min(all_dates)
-    end = max(all_dates)
-
-    # Generate full list of month-year strings
-    all_months = pd.date_range(start=start, end=end, freq="MS")
+    Returns
+    -------
+    list[str]
+        Paths of the saved files.
+    """
+    print(f"Saving results to {file_format.upper()}...")
+    events, countries, all_months = build_event_matrix(data, metrics, countries)
     all_months_str = [d.strftime(date_format) for d in all_months]
 
     # Ensure output directory exists
     os.makedirs(output_dir, exist_ok=True)
 
-    # Generate one DataFrame per metric and save
-    for metric in metrics:
-        # Initialize DataFrame
-        df_metric = pd.DataFrame(0, index=countries, columns=all_months_str)
-
-        # Fill DataFrame
-        for row in data:
-            country, row_metric, *dates = row
-            if row_metric != metric:
-                continue
-            for date_str in dates:
-                try:
-                    dt = parser.parse(date_str)
-                    month_str = dt.strftime(date_format)
-                    if month_str in df_metric.columns:
-                        df_metric.loc[country, month_str] = 1
-                except Exception as e:
-                    print(f"Skipping unparseable date {date_str}: {e}")
-
-        # Reset index for saving
-        df_metric = df_metric.reset_index().rename(columns={"index": "country"})
-
-        # Save to CSV
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        filename = os.path.join(output_dir, f"{metric.replace(' ', '_')}_{timestamp}.csv")
-        df_metric.to_csv(filename, index=False)
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    paths = []
+    for metric, metric_events in zip(metrics, events):
+        df_metric = pd.DataFrame(metric_events, index=countries, columns=all_months_str)
+        df_metric = df_metric.rename_axis("country").reset_index()
+
+        filename = os.path.join(output_dir, f"{metric.replace(' ', '_')}_{timestamp}.{file_format}")
+        if file_format == "parquet":
+            df_metric.to_parquet(filename, index=False)
+        else:
+            df_metric.to_csv(filename, index=False)
+        paths.append(filename)
         print(f"Saved metric '{metric}' to {filename}")
+    return paths
+
+
+def combine_event_tables(
+    output_dir: str = "outputs",
+    date_format: str = "%m-%Y",
+    file_format: str = "csv",
+) -> list[str]:
+    """
+    Merges the per-metric tables of several runs (files named <metric>_<timestamp>)
+    into one table per metric: the union of countries and months, with a 1 wherever
+    any run recorded an event.
+
+    Returns
+    -------
+    list[str]
+        Paths of the combined files, named <metric>_combined.
+    """
+    pattern = re.compile(r"^(?P<metric>.+)_\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}\." + re.escape(file_format) + "$")
+    runs = {}
+    for filename in sorted(os.listdir(output_dir)):
+        match = pattern.match(filename)
+        if match:
+            runs.setdefault(match.group("metric"), []).append(os.path.join(output_dir, filename))
+
+    paths = []
+    for metric, files in runs.items():
+        read = pd.read_parquet if file_format == "parquet" else pd.read_csv
+        tables = [read(path).set_index("country") for path in files]
+        combined = pd.concat(tables).fillna(0).astype(np.int8).groupby(level=0, sort=False).max()
+        # Put the month columns back in calendar order
+        months = pd.to_datetime(pd.Series(combined.columns), format=date_format)
+        combined = combined[combined.columns[months.argsort()]]
+        combined = combined.rename_axis("country").reset_index()
+
+        filename = os.path.join(output_dir, f"{metric}_combined.{file_format}")
+        if file_format == "parquet":
+            combined.to_parquet(filename, index=False)
+        else:
+            combined.to_csv(filename, index=False)
+        paths.append(filename)
+        print(f"Combined {len(files)} '{metric}' tables into {filename}")
+    return paths
@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The forecast model and the scraper are run from their own directories and import
+# their modules flat; forecast_model goes first so 'utils' is its package
+sys.path.insert(0, os.path.join(ROOT, "src", "scraping"))
+sys.path.insert(0, os.path.join(ROOT, "forecast_model"))
@@ -0,0 +1,511 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _france_departments():
+    gpd = pytest.importorskip("geopandas")
+    shapely = pytest.importorskip("shapely")
+    # Rough department boxes around Paris, plus a department outside the regional mapping
+    departments = {
+        'Paris': (2.22, 48.81, 2.47, 48.91),
+        'Hauts-de-Seine': (2.10, 48.73, 2.22, 48.95),
+        'Seine-et-Marne': (2.47, 48.12, 3.56, 49.12),
+        'Gironde': (-1.26, 44.19, 0.32, 45.58),
+        'Guadeloupe': (-61.81, 15.83, -61.0, 16.52),
+    }
+    return gpd.GeoDataFrame(
+        {
+            'adm0_a3': 'FRA',
+            'name_en': list(departments),
+            'name': list(departments),
+            'name_alt': None,
+        },
+        geometry=[shapely.box(*bounds) for bounds in departments.values()],
+        crs='EPSG:4326',
+    )
+
+
+def test_fix_france_adds_regions_and_marks_their_departments():
+    from utils import map_admin_regions
+
+    gdf = map_admin_regions.fix_france(_france_departments())
+
+    assert set(gdf['name_en']) == {'Paris', 'Hauts-de-Seine', 'Seine-et-Marne', 'Gironde', 'Guadeloupe',
+                                   'Ile-De-France', 'Nouvelle-Aquitaine'}
+    superseded = map_admin_regions.superseded_admin1(gdf)
+    assert set(gdf.loc[superseded, 'name_en']) == {'Paris', 'Hauts-de-Seine', 'Seine-et-Marne', 'Gironde'}
+
+
+def test_point_in_paris_resolves_to_region(tmp_path, monkeypatch):
+    from utils import map_admin_regions, spatial_join
+
+    # The name matcher keeps its match table under the working directory
+    monkeypatch.chdir(tmp_path)
+    gdf = map_admin_regions.fix_france(_france_departments())
+    gdf['admin1_id'] = gdf['adm0_a3'] + ' - ' + gdf['name_en']
+    boundaries = pd.DataFrame(gdf.drop(columns='geometry'))
+    boundaries['geometry'] = gdf.geometry.to_wkb().values
+
+    events = pd.DataFrame({
+        'event_id_cnty': ['FRA1', 'FRA2'],
+        'country': ['France', 'France'],
+        'admin1': ['Ile-de-France', 'Ile-de-France'],
+        'longitude': np.array([2.3522, 2.15], dtype=np.float32),
+        'latitude': np.array([48.8566, 48.85], dtype=np.float32),
+    })
+    geocoded, _ = spatial_join.geocode_admin1(events, boundaries, workers=1)
+
+    assert geocoded['point_admin1_id'].tolist() == ['FRA - Ile-De-France'] * 2
+    assert (geocoded['point_admin1_id'] == geocoded['name_admin1_id']).all()
+
+
+class _RecordedSession:
+    """Stands in for requests.Session, replaying World Bank pages and recording the requests."""
+
+    def __init__(self, pages, etag='"v1"', fail=False):
+        self.pages = pages
+        self.etag = etag
+        self.fail = fail
+        self.requests = []
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def get(self, url, headers=None, timeout=None):
+        import requests
+
+        self.requests.append((url, dict(headers or {})))
+        if self.fail:
+            raise requests.exceptions.ConnectionError("offline")
+        response = requests.Response()
+        response.url = url
+        response.headers['ETag'] = self.etag
+        if headers and headers.get('If-None-Match') == self.etag:
+            response.status_code = 304
+            return response
+        page = int(url.rsplit('&page=', 1)[1])
+        metadata = {'page': page, 'pages': len(self.pages), 'lastupdated': '2024-01-01'}
+        response.status_code = 200
+        response._content = json.dumps([metadata, self.pages[page - 1]]).encode()
+        return response
+
+
+def _indicator_pages():
+    def record(country, year, value):
+        return {'country': {'value': country}, 'countryiso3code': country, 'date': str(year),
+                'value': value, 'indicator': {'value': 'Inflation'}}
+
+    return [[record('FRA', 2020, 0.5), record('FRA', 2021, 1.6)],
+            [record('KEN', 2020, 5.4), record('KEN', 2021, 6.1)],
+            [record('PER', 2020, 1.8)]]
+
+
+def test_world_bank_pagination_and_revalidation(tmp_path):
+    from data.fetch_world_bank_data import WorldBankDataFetcher
+
+    fetcher = WorldBankDataFetcher(base_url="http://fixture", cache_dir=str(tmp_path), per_page=2)
+    fetcher.session = _RecordedSession(_indicator_pages())
+    df = fetcher.get_indicator_data('FP.CPI.TOTL.ZG', start_year=2020, end_year=2021)
+    assert sorted(df['countryiso3code']) == ['FRA', 'FRA', 'KEN', 'KEN', 'PER']
+    assert sorted(url.rsplit('&page=', 1)[1] for url, _ in fetcher.session.requests) == ['1', '2', '3']
+    first_url = fetcher.session.requests[0][0]
+
+    # A stale entry is revalidated on the exact URL it was cached from; a 304 keeps it
+    stale = WorldBankDataFetcher(base_url="http://fixture", cache_dir=str(tmp_path), per_page=2, max_age_days=0)
+    stale.session = _RecordedSession(_indicator_pages())
+    assert len(stale.get_indicator_data('FP.CPI.TOTL.ZG', start_year=2020, end_year=2021)) == 5
+    assert stale.session.requests == [(first_url, {'If-None-Match': '"v1"'})]
+
+    # Without the network the stale copy is returned instead of an empty frame
+    stale.session = _RecordedSession(_indicator_pages(), fail=True)
+    assert len(stale.get_indicator_data('FP.CPI.TOTL.ZG', start_year=2020, end_year=2021)) == 5
+
+
+def _summarise_neighbour_events_rowwise(df_neighbours):
+    # The row-wise implementation 'summarise_neighbour_events' replaced, without the progress bars
+    grouped = df_neighbours.groupby(['matched_admin1_id', 'month_year', 'event_type']).size()
+    event_dict = {}
+    for (admin_id, month, etype), count in grouped.items():
+        event_dict.setdefault((admin_id, month), {})[etype] = count
+
+    neighbor_lookup = df_neighbours.drop_duplicates('matched_admin1_id').set_index('matched_admin1_id')['admin1_neighbors'].to_dict()
+    all_event_types = df_neighbours['event_type'].unique().tolist()
+    rows = []
+    for admin_id in df_neighbours['matched_admin1_id'].unique():
+        for month in df_neighbours['month_year'].unique():
+            neighbors = neighbor_lookup.get(admin_id, [])
+            summary = {f"{etype}_neighbours": 0 for etype in all_event_types}
+            if isinstance(neighbors, (list, tuple)) and neighbors:
+                for neighbor_id in neighbors:
+                    for etype, count in event_dict.get((neighbor_id, month), {}).items():
+                        summary[f"{etype}_neighbours"] += count
+            rows.append({'matched_admin1_id': admin_id, 'month_year': month, **summary})
+    return pd.DataFrame(rows).set_index(['matched_admin1_id', 'month_year'])
+
+
+def _neighbour_events(n_events=2_000, seed=0):
+    rng = np.random.default_rng(seed)
+    admin_ids = [f"KEN - Region {i}" for i in range(12)]
+    # Unmatched neighbour ids, repeated neighbours, regions without neighbours and NaN lists
+    neighbours = {
+        admin_id: [admin_ids[j] for j in rng.choice(len(admin_ids), size=rng.integers(0, 4))]
+        + (['KEN - Unmatched'] if i % 5 == 0 else [])
+        for i, admin_id in enumerate(admin_ids)
+    }
+    neighbours[admin_ids[3]] = np.nan
+    neighbours[admin_ids[4]] = [admin_ids[5], admin_ids[5]]
+    events = pd.DataFrame({
+        'matched_admin1_id': rng.choice(admin_ids, n_events),
+        'month_year': rng.choice([f"2020-{m:02d}" for m in range(1, 13)], n_events),
+        'event_type': rng.choice(['Battles', 'Protests', 'Riots'], n_events),
+    })
+    events['admin1_neighbors'] = events['matched_admin1_id'].map(neighbours)
+    return events, neighbours
+
+
+def test_adjacency_matrix_matches_neighbour_lists():
+    from utils.data_cleaning import build_adjacency_matrix
+
+    _, neighbours = _neighbour_events()
+    admin_ids = sorted(neighbours)
+    expected = np.zeros((len(admin_ids), len(admin_ids)), dtype=np.int64)
+    for i, admin_id in enumerate(admin_ids):
+        listed = neighbours[admin_id]
+        for neighbour in listed if isinstance(listed, list) else []:
+            if neighbour in admin_ids:
+                expected[i, admin_ids.index(neighbour)] += 1
+    np.testing.assert_array_equal(build_adjacency_matrix(neighbours, admin_ids).toarray(), expected)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_summarise_neighbour_events_matches_rowwise(seed):
+    from utils.data_cleaning import summarise_neighbour_events
+
+    events, _ = _neighbour_events(seed=seed)
+    expected = _summarise_neighbour_events_rowwise(events).sort_index()
+    result = summarise_neighbour_events(events)
+    assert sorted(result.columns) == sorted(expected.columns)
+    pd.testing.assert_frame_equal(result.astype(np.int64), expected[result.columns].astype(np.int64))
+
+
+def test_boundaries_key_covers_adjacency_parameters(tmp_path):
+    from utils import boundary_cache
+
+    shapefile = tmp_path / "admin1.shp"
+    shapefile.write_bytes(b"shape")
+    key = boundary_cache.boundaries_key([str(shapefile)], ['FRA'], cache_dir=str(tmp_path))
+    assert key == boundary_cache.boundaries_key([str(shapefile)], ['FRA'], distance=0.01, simplify_tolerance=0.001,
+                                                cache_dir=str(tmp_path))
+    assert key != boundary_cache.boundaries_key([str(shapefile)], ['FRA'], distance=0.02, cache_dir=str(tmp_path))
+    assert key != boundary_cache.boundaries_key([str(shapefile)], ['FRA'], simplify_tolerance=0, cache_dir=str(tmp_path))
+
+
+def test_boundaries_key_rehashes_only_changed_files(tmp_path):
+    import os
+    from utils import boundary_cache
+
+    shapefile = tmp_path / "admin1.shp"
+    shapefile.write_bytes(b"shape")
+    key = boundary_cache.boundaries_key([str(shapefile)], ['FRA'], cache_dir=str(tmp_path))
+
+    # Same size and mtime: the recorded digest is reused without reading the file
+    stat = shapefile.stat()
+    shapefile.write_bytes(b"SHAPE")
+    os.utime(shapefile, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert boundary_cache.boundaries_key([str(shapefile)], ['FRA'], cache_dir=str(tmp_path)) == key
+
+    # A new mtime makes it read the content again
+    os.utime(shapefile, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert boundary_cache.boundaries_key([str(shapefile)], ['FRA'], cache_dir=str(tmp_path)) != key
+
+
+
+def test_compare_rebuilds_cached_boundaries_with_edge_diff(tmp_path, monkeypatch):
+    from utils import boundary_cache
+
+    gdf = _france_departments()
+    gdf['admin1_id'] = 'FRA - ' + gdf['name_en']
+    shapefile, wb_file = tmp_path / "admin1.shp", tmp_path / "wb.shp"
+    shapefile.write_bytes(b"shape")
+    wb_file.write_bytes(b"wb")
+    calls = []
+
+    def build_boundaries(ne_file, wb_file, countries, distance, simplify_tolerance, compare=False):
+        calls.append(compare)
+        return gdf, {'FRA - Paris': ['FRA - Hauts-de-Seine']}
+
+    monkeypatch.setattr(boundary_cache, "build_boundaries", build_boundaries)
+    load = dict(wb_file=str(wb_file), countries=['FRA'], cache_dir=str(tmp_path / "cache"))
+    boundary_cache.load_boundaries(str(shapefile), **load)
+    boundary_cache.load_boundaries(str(shapefile), **load)
+    assert calls == [False]
+
+    # A cache hit does not skip the comparison
+    _, neighbor_dict = boundary_cache.load_boundaries(str(shapefile), compare=True, **load)
+    assert calls == [False, True]
+    assert neighbor_dict == {'FRA - Paris': ['FRA - Hauts-de-Seine']}
+
+
+def test_chunked_acled_loader_matches_read_csv(tmp_path):
+    from utils import acled_loader
+
+    rng = np.random.default_rng(0)
+    n_rows = 500
+    dates = pd.to_datetime('2015-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 365 * 7, n_rows)), unit='D')
+    raw = pd.DataFrame({
+        'event_id_cnty': [f"KEN{i}" for i in range(n_rows)],
+        'event_date': dates.strftime('%d %B %Y'),
+        'year': dates.year,
+        'event_type': rng.choice(['Battles', 'Protests', 'Riots'], n_rows),
+        'sub_event_type': rng.choice(['Armed clash', 'Peaceful protest', 'Mob violence'], n_rows),
+        'country': rng.choice(['Kenya', 'Uganda'], n_rows),
+        'admin1': rng.choice(['Nairobi', 'Mombasa', 'Kampala', None], n_rows),
+        'latitude': rng.uniform(-5, 5, n_rows).round(4),
+        'longitude': rng.uniform(30, 40, n_rows).round(4),
+        'fatalities': rng.integers(0, 10, n_rows),
+        'notes': 'unused',
+    })
+    # Early chunks only hold rows before min_year, later chunks see different categories
+    raw.loc[raw['year'] >= 2020, 'admin1'] = raw.loc[raw['year'] >= 2020, 'admin1'].replace('Nairobi', 'Kisumu')
+    path = tmp_path / "acled.csv"
+    raw.to_csv(path, index=False)
+
+    result = acled_loader.load_acled_events(str(path), min_year=2018, chunksize=37)
+
+    # The pipeline before the chunked loader
+    expected = pd.read_csv(path)
+    expected = expected[expected['year'] >= 2018].copy()
+    expected['date'] = pd.to_datetime(expected['event_date'], format='%d %B %Y')
+    expected['month_year'] = expected['date'].dt.to_period('M').astype(str)
+    expected = expected.reset_index(drop=True)
+
+    assert sorted(result.columns) == sorted(acled_loader.ACLED_COLUMNS + ['date', 'month_year'])
+    for col, dtype in acled_loader.ACLED_DTYPES.items():
+        if dtype == 'category':
+            assert isinstance(result[col].dtype, pd.CategoricalDtype), col
+            assert set(result[col].cat.categories) == set(expected[col].dropna()), col
+            pd.testing.assert_series_equal(result[col].astype(object), expected[col].astype(object), check_names=False)
+        elif dtype is str:
+            pd.testing.assert_series_equal(result[col], expected[col], check_names=False)
+        else:
+            assert result[col].dtype == dtype, col
+            np.testing.assert_allclose(result[col].to_numpy(), expected[col].to_numpy(), atol=1e-4)
+    pd.testing.assert_series_equal(result['date'], expected['date'], check_names=False)
+    pd.testing.assert_series_equal(result['month_year'], expected['month_year'], check_names=False)
+
+
+def test_match_table_reused_for_unchanged_boundary_version(tmp_path, monkeypatch):
+    from utils import map_admin_regions, match_table
+
+    boundaries = pd.DataFrame({
+        'adm0_a3': ['KEN', 'KEN', 'KEN', 'UGA'],
+        'name_en': ['Nairobi', 'Mombasa', 'Kisumu', 'Kampala'],
+        'name': ['Nairobi', 'Mombasa', 'Kisumu', 'Kampala'],
+        'name_alt': [None, 'Mvita', None, None],
+        'geometry': ['a', 'b', 'c', 'd'],
+    })
+    boundaries['admin1_id'] = boundaries['adm0_a3'] + ' - ' + boundaries['name_en']
+    events = pd.DataFrame({
+        'event_id_cnty': ['KEN1', 'KEN2', 'KEN3', 'UGA1', 'UGA2'],
+        'country': ['Kenya', 'Kenya', 'Kenya', 'Uganda', 'Uganda'],
+        'admin1': ['Nairobi', 'Mvita', 'Nairobbi', 'Kampala', 'Atlantis'],
+    })
+    matched_keys = []
+    match_admin1_keys = map_admin_regions.match_admin1_keys
+
+    def recording_match(keys, pools):
+        matched_keys.append(sorted(keys))
+        return match_admin1_keys(keys, pools)
+
+    monkeypatch.setattr(map_admin_regions, "match_admin1_keys", recording_match)
+
+    def match(df, gdf):
+        matched, _ = map_admin_regions.match_admin1_to_gdf(df, gdf, fix_boundaries=False, match_table_dir=str(tmp_path))
+        return matched['matched_admin1_id'].replace({np.nan: None}).tolist()
+
+    first = match(events, boundaries)
+    assert first == ['KEN - Nairobi', 'KEN - Mombasa', 'KEN - Nairobi', 'UGA - Kampala', None]
+    assert len(matched_keys) == 1 and len(matched_keys[0]) == 5
+
+    # Same names (geometry edits keep the version): nothing is matched again, not even the unmatched key
+    moved = boundaries.assign(geometry=['e', 'f', 'g', 'h'])
+    assert match_table.boundary_version(moved) == match_table.boundary_version(boundaries)
+    assert match(events, moved) == first
+    assert len(matched_keys) == 1
+
+    # Only keys not in the table are matched
+    more = pd.concat([events, pd.DataFrame({'event_id_cnty': ['KEN4'], 'country': ['Kenya'], 'admin1': ['Kisumu']})],
+                     ignore_index=True)
+    assert match(more, boundaries) == first + ['KEN - Kisumu']
+    assert matched_keys[1] == [('KEN', 'Kisumu')]
+
+    # A manual override is kept for this version and carried over to the next one
+    path = match_table.table_path(match_table.boundary_version(boundaries), str(tmp_path))
+    table = pd.read_csv(path, dtype=str, keep_default_na=False)
+    table.loc[table['admin1_norm'] == 'Atlantis', ['admin1_id', 'tier']] = ['UGA - Kampala', match_table.MANUAL_TIER]
+    table.to_csv(path, index=False)
+    assert match(events, boundaries)[-1] == 'UGA - Kampala'
+
+    renamed = boundaries.assign(name_en=['Nairobi', 'Mombasa', 'Kisumu City', 'Kampala'])
+    renamed['admin1_id'] = renamed['adm0_a3'] + ' - ' + renamed['name_en']
+    assert match_table.boundary_version(renamed) != match_table.boundary_version(boundaries)
+    assert match(events, renamed) == first[:-1] + ['UGA - Kampala']
+    assert matched_keys[-1] == [('KEN', 'Mvita'), ('KEN', 'Nairobbi'), ('KEN', 'Nairobi'), ('UGA', 'Kampala')]
+
+WB_BOUNDARIES_DBF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "forecast_model", "data", "raw",
+                                 "boundaries", "World Bank Official Boundaries - Admin 1", "WB_GAD_ADM1.dbf")
+
+
+def _extract_one_cascade(keys, gdf):
+    # The per-key cascade 'match_admin1_keys' replaced, with fuzzywuzzy's extractOne as the fuzzy tier
+    from fuzzywuzzy import fuzz, process
+    from utils.map_admin_regions import normalize
+
+    name_en_map = {(c, n): i for c, n, i in zip(gdf['adm0_a3'], gdf['name_en_norm'], gdf['admin1_id'])}
+    name_map = {(c, n): i for c, n, i in zip(gdf['adm0_a3'], gdf['name_norm'], gdf['admin1_id'])}
+    altname_map, pool = {}, {}
+    for country, name_en_norm, name_norm, alt_list, admin1_id in zip(
+            gdf['adm0_a3'], gdf['name_en_norm'], gdf['name_norm'], gdf['name_alt_list'], gdf['admin1_id']):
+        pool.setdefault(country, {})[name_en_norm] = admin1_id
+        pool[country][name_norm] = admin1_id
+        for alt in alt_list:
+            altname_map.setdefault(country, {})[alt] = admin1_id
+            pool[country][alt] = admin1_id
+
+    def words(name):
+        return set(normalize(w, strip_punctuation=True) for w in name.split() if len(w) > 3)
+
+    matches = {}
+    for key in keys:
+        country_code, admin1 = key
+        if key in name_en_map:
+            matches[key] = name_en_map[key]
+        elif key in name_map:
+            matches[key] = name_map[key]
+        elif admin1 in altname_map.get(country_code, {}):
+            matches[key] = altname_map[country_code][admin1]
+        else:
+            choices = pool.get(country_code, {})
+            result = process.extractOne(admin1, list(choices), scorer=fuzz.ratio) if choices else None
+            if result and result[1] >= 60:
+                matches[key] = choices[result[0]]
+            else:
+                matches[key] = next((admin1_id for name, admin1_id in choices.items() if words(admin1) & words(name)), None)
+    return matches
+
+
+def _perturb(name, rng):
+    kind = rng.integers(6)
+    if kind == 0 and len(name) > 3:  # typo
+        i = rng.integers(len(name))
+        return name[:i] + rng.choice(list('aeioubcdklmnrst')) + name[i + 1:]
+    if kind == 1 and len(name) > 3:  # dropped letter
+        i = rng.integers(len(name))
+        return name[:i] + name[i + 1:]
+    if kind == 2:
+        return f"{name} {rng.choice(['Province', 'Region', 'State', 'District'])}"
+    if kind == 3 and ' ' in name:  # dropped word
+        return ' '.join(name.split()[1:])
+    if kind == 4:
+        return name.upper().replace('A', 'Á')
+    return name
+
+
+def test_batch_admin1_matching_matches_extract_one_cascade():
+    pytest.importorskip("fuzzywuzzy")
+    pyogrio = pytest.importorskip("pyogrio")
+    from utils import map_admin_regions
+
+    if not os.path.exists(WB_BOUNDARIES_DBF):
+        pytest.skip("World Bank Admin-1 attribute table not available")
+    wb = pyogrio.read_dataframe(WB_BOUNDARIES_DBF, read_geometry=False)
+    wb = wb[wb['NAM_1'].notna()]
+    rng = np.random.default_rng(0)
+    gdf = pd.DataFrame({'adm0_a3': wb['ISO_A3'], 'name_en': wb['NAM_1'],
+                        'name': [_perturb(name, rng) for name in wb['NAM_1']], 'name_alt': None})
+
+    # Perturbed names of each country, plus names looked up in the wrong country
+    sample = wb.sample(2_000, random_state=0)
+    other_country = rng.permutation(sample['ISO_A3'].to_numpy())
+    events = pd.DataFrame({
+        'event_id_cnty': [f"{code}{i}" for i, code in enumerate(np.where(rng.random(len(sample)) < 0.9, sample['ISO_A3'], other_country))],
+        'country': 'Synthetic',
+        'admin1': [_perturb(name, rng) for name in sample['NAM_1']],
+    })
+    df, gdf = map_admin_regions.match_admin1_to_gdf(events, gdf, fix_boundaries=False, match_table_dir=None)
+
+    keys = list(dict.fromkeys(zip(df['country_code'], df['admin1_norm'])))
+    expected = _extract_one_cascade(keys, gdf)
+    matched = dict(zip(zip(df['country_code'], df['admin1_norm']), df['matched_admin1_id'].replace({np.nan: None})))
+    assert len(keys) > 1_900
+    assert {key: matched[key] for key in keys} == expected
+
+
+def test_punctuation_only_admin1_names_are_not_fuzzy_matched():
+    from utils import map_admin_regions
+
+    gdf = pd.DataFrame({'adm0_a3': 'KEN', 'name_en': ['Nairobi', '--'], 'name': ['Nairobi', '--'], 'name_alt': None})
+    events = pd.DataFrame({'event_id_cnty': ['KEN1', 'KEN2'], 'country': 'Kenya', 'admin1': ['???', 'Nairobbi']})
+    df, _ = map_admin_regions.match_admin1_to_gdf(events, gdf, fix_boundaries=False, match_table_dir=None)
+    assert df['matched_admin1_id'].replace({np.nan: None}).tolist() == [None, 'KEN - Nairobi']
+
+
+def _model_matrix(seed=0):
+    rng = np.random.default_rng(seed)
+    admin_ids = [f"{country} - Region {i}" for country, n in (('KEN', 7), ('UGA', 5), ('ZWE', 3)) for i in range(n)]
+    months = pd.date_range('2018-01-01', periods=30, freq='MS')
+    index = pd.MultiIndex.from_product([admin_ids, months], names=['matched_admin1_id', 'month_year'])
+    df = pd.DataFrame({
+        'Battles': rng.poisson(2, len(index)),
+        'Battles (t-1)': rng.poisson(2, len(index)).astype(float),
+        'month_2': np.tile(months.month == 2, len(admin_ids)),
+        'importance_weight': rng.random(len(index)),
+    }, index=index)
+    df.loc[df.index.get_level_values(1) == months[0], 'Battles (t-1)'] = np.nan
+    # Regions interleaved, so the store has to group each region's rows
+    return df.sample(frac=1, random_state=seed)
+
+
+def test_model_store_reads_single_regions_from_row_ranges(tmp_path, monkeypatch):
+    from utils import model_store
+
+    # Small row groups so regions straddle row group boundaries
+    monkeypatch.setattr(model_store, "ROW_GROUP_SIZE", 40)
+    model_data = _model_matrix()
+    index = model_store.save_model_data(model_data, str(tmp_path))
+    expected = model_store.optimise_dtypes(model_data)
+
+    assert sorted(index) == sorted(model_data.index.unique(level=0))
+    for admin1_id in ['KEN - Region 0', 'KEN - Region 3', 'UGA - Region 4', 'ZWE - Region 2']:
+        region = model_store.load_admin1_data(admin1_id, str(tmp_path))
+        pd.testing.assert_frame_equal(region, expected.loc[admin1_id])
+        columns = model_store.load_admin1_data(admin1_id, str(tmp_path), columns=['Battles (t-1)'])
+        pd.testing.assert_frame_equal(columns, expected.loc[admin1_id, ['Battles (t-1)']])
+    with pytest.raises(KeyError):
+        model_store.load_admin1_data('KEN - Nowhere', str(tmp_path))
+
+    # Rewriting one country keeps the other partitions and their index entries
+    updated = model_data.copy()
+    updated.loc['UGA - Region 1', 'Battles'] = 99
+    model_store.save_model_data(updated, str(tmp_path), countries=['UGA'])
+    assert (model_store.load_admin1_data('UGA - Region 1', str(tmp_path))['Battles'] == 99).all()
+    pd.testing.assert_frame_equal(model_store.load_admin1_data('KEN - Region 3', str(tmp_path)), expected.loc['KEN - Region 3'])
+    pd.testing.assert_frame_equal(model_store.load_model_data(str(tmp_path)).sort_index(),
+                                  model_store.optimise_dtypes(updated).sort_index())
+
+
+def test_model_store_migrates_csv_cache(tmp_path):
+    from utils import model_store
+
+    model_data = _model_matrix(seed=1)
+    csv_path = tmp_path / "model_data.csv"
+    model_data.to_csv(csv_path)
+    store_dir = str(tmp_path / "model_data")
+
+    model_store.migrate_csv_cache(str(csv_path), store_dir)
+    assert model_store.store_exists(store_dir) and csv_path.exists()
+    loaded = model_store.load_model_data(store_dir)
+    pd.testing.assert_frame_equal(loaded.sort_index(), model_store.optimise_dtypes(model_data).sort_index())
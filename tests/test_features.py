@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+SUBEVENT_COLS = ['Excessive force against protesters', 'Agreement']
+EVENT_TYPES = ['Battles', 'Explosions/Remote violence', 'Protests', 'Riots',
+               'Strategic developments', 'Violence against civilians']
+
+
+def _acled_events(n_events=3_000, seed=0, event_types=EVENT_TYPES, months=None):
+    rng = np.random.default_rng(seed)
+    admin_ids = [f"KEN - Region {i}" for i in range(8)] + [f"UGA - Region {i}" for i in range(4)]
+    months = months or [f"{year}-{month:02d}" for year in (2019, 2020) for month in range(1, 13)]
+    events = pd.DataFrame({
+        'matched_admin1_id': rng.choice(admin_ids, n_events),
+        'month_year': rng.choice(months, n_events),
+        'event_type': rng.choice(event_types, n_events),
+        'sub_event_type': rng.choice(SUBEVENT_COLS + ['Peaceful protest', 'Armed clash'], n_events),
+    })
+    neighbours = {admin_id: [admin_ids[j] for j in rng.choice(len(admin_ids), size=3, replace=False) if admin_ids[j] != admin_id]
+                  for admin_id in admin_ids}
+    return events, neighbours
+
+
+def _add_lagged_columns(df, lag=1):
+    # The per-frame helpers the event panel replaced, as they were in the pipeline
+    lagged_df = df.groupby(level='matched_admin1_id').shift(lag)
+    lagged_df.columns = [f"{col} (t-{lag})" for col in lagged_df.columns]
+    return pd.concat([df, lagged_df], axis=1)
+
+
+def _add_time_trend_features(df):
+    df = df.reset_index()
+    df['month_year'] = pd.to_datetime(df['month_year'])
+    start_date = pd.Timestamp('2018-01-01')
+    df['linear_month_trend'] = ((df['month_year'].dt.year - start_date.year) * 12 +
+                                (df['month_year'].dt.month - start_date.month))
+    df['year'] = df['month_year'].dt.year
+    df['month'] = df['month_year'].dt.month
+    df['quarter'] = df['month_year'].dt.quarter
+    month_dummies = pd.get_dummies(df['month'], prefix='month', drop_first=True)
+    quarter_dummies = pd.get_dummies(df['quarter'], prefix='quarter', drop_first=True)
+    df = pd.concat([df, month_dummies, quarter_dummies], axis=1)
+    df.drop(columns=['month', 'quarter'], inplace=True)
+    df.set_index(['matched_admin1_id', 'month_year'], inplace=True)
+    return df
+
+
+def _frame_pipeline(events, neighbours, columns):
+    from utils import data_cleaning
+
+    events = events.copy()
+    events['admin1_neighbors'] = events['matched_admin1_id'].map(neighbours)
+    neighbour_data = data_cleaning.summarise_neighbour_events(events)
+    event_data = data_cleaning.get_monthly_events(events)
+    subevent_data = data_cleaning.get_monthly_subevents(events, SUBEVENT_COLS)
+
+    combined = pd.concat([event_data, subevent_data], axis=1).join(neighbour_data, how='left')
+    # Types without any events count zero (the frame pipeline raised a KeyError on them)
+    counted = [col[:-len(' (t-1)')] for col in columns if col.endswith(' (t-1)')]
+    combined = combined.reindex(columns=list(dict.fromkeys(list(combined.columns) + counted)), fill_value=0)
+    combined = _add_lagged_columns(combined)
+    combined = _add_time_trend_features(combined)
+    combined = data_cleaning.add_importance_weights(combined)
+    return combined[columns]
+
+
+@pytest.mark.parametrize("event_types", [EVENT_TYPES, [t for t in EVENT_TYPES if t != 'Riots']])
+def test_panel_frame_matches_frame_pipeline(event_types):
+    from config import settings
+    from utils import data_cleaning
+
+    columns = settings.predictors + settings.targets
+    events, neighbours = _acled_events(event_types=event_types)
+    panel = data_cleaning.EventPanel.from_events(events, SUBEVENT_COLS)
+    result = panel.to_frame(columns, neighbours)
+    expected = _frame_pipeline(events, neighbours, columns)
+
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    if 'Riots' not in event_types:
+        assert (result['Riots (t-1)'].dropna() == 0).all()
+        assert (result['Riots_neighbours (t-1)'].dropna() == 0).all()
+
+
+def test_incremental_update_matches_full_rebuild():
+    from config import settings
+    from utils import data_cleaning, incremental
+
+    columns = settings.predictors + settings.targets
+    # No events in March and August 2020; the batch fills in March, August stays empty
+    months = [f"{year}-{month:02d}" for year in (2019, 2020) for month in range(1, 13)
+              if (year, month) not in ((2020, 3), (2020, 8))]
+    events, neighbours = _acled_events(months=months)
+    # Appended batch: events in existing cells (also just before the empty month), a new
+    # region, a new last month and the month missing so far
+    batch, _ = _acled_events(n_events=300, seed=1, months=['2019-06', '2020-03', '2020-07', '2020-12', '2021-01'])
+    batch.loc[batch.index[:20], 'matched_admin1_id'] = 'TZA - Region 0'
+    neighbours['TZA - Region 0'] = ['KEN - Region 0']
+    neighbours['KEN - Region 0'].append('TZA - Region 0')
+
+    def rebuild(df):
+        return data_cleaning.EventPanel.from_events(df, SUBEVENT_COLS).to_frame(columns, neighbours)
+
+    model_data = rebuild(events)
+    counts = incremental.monthly_counts(events, SUBEVENT_COLS)
+    delta = incremental.monthly_counts(batch, SUBEVENT_COLS)
+    updated, _, changed_countries = incremental.update_model_data(model_data, counts, delta, neighbours)
+
+    expected = rebuild(pd.concat([events, batch], ignore_index=True))
+    pd.testing.assert_frame_equal(updated.sort_index(), expected, check_dtype=False, check_index_type=False)
+    assert changed_countries == ['KEN', 'TZA', 'UGA']
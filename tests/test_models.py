@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _region_data(months=36, seed=0):
+    from config import settings
+
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2018-01-01', periods=months, freq='MS', name='month_year')
+    data = pd.DataFrame(rng.poisson(3, (months, len(settings.predictors))).astype(float),
+                        index=index, columns=settings.predictors)
+    data['importance_weight'] = np.exp(-0.05 * np.arange(months)[::-1])
+    for target in settings.targets:
+        data[target] = rng.poisson(3, months)
+    return data
+
+
+def test_backtest_forecasts_ignore_data_after_origin():
+    from models.backtest import backtest_region
+
+    data = _region_data()
+    origin = 30
+    # Everything first observed after the origin month (index origin - 1): targets from
+    # 'origin' on and the lag features of the rows after 'origin'
+    perturbed = data.copy()
+    perturbed.iloc[origin:, perturbed.columns.get_loc('Battles')] += 50
+    lag_cols = [col for col in data.columns if col.endswith('(t-1)')]
+    perturbed.iloc[origin + 1:, [perturbed.columns.get_loc(col) for col in lag_cols]] += 50
+
+    kwargs = dict(min_train=24, horizon=6, base_trees=5, trees_per_origin=1)
+    original = backtest_region(data, 'Battles', **kwargs)
+    changed = backtest_region(perturbed, 'Battles', **kwargs)
+
+    at_origin = original['origin'] == data.index[origin - 1]
+    assert at_origin.sum() == 6
+    np.testing.assert_allclose(original.loc[at_origin, 'predicted'], changed.loc[at_origin, 'predicted'])
+
+
+def test_backtest_tree_count_independent_of_blocks(monkeypatch):
+    from models import backtest
+    from sklearn.ensemble import RandomForestRegressor
+
+    sizes = []
+
+    class RecordingForest(RandomForestRegressor):
+        def fit(self, X, y, sample_weight=None):
+            sizes.append((len(X), self.n_estimators))
+            return super().fit(X, y, sample_weight=sample_weight)
+
+    monkeypatch.setattr(backtest, 'RandomForestRegressor', RecordingForest)
+    data = _region_data(30)
+    origins = list(range(24, 30))
+
+    backtest._run_origin_block(data, 'Battles', origins, 0, 1, 5, 2)
+    single_block = list(sizes)
+    sizes.clear()
+    backtest._run_origin_block(data, 'Battles', origins[:3], 0, 1, 5, 2)
+    backtest._run_origin_block(data, 'Battles', origins[3:], 3, 1, 5, 2)
+
+    assert sizes == single_block
+    assert [n for _, n in single_block] == [5, 7, 9, 11, 13, 15]
+
+
+def test_batch_resume_skips_recorded_regions(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from models import batch
+
+    regions = ['KEN - Region 0', 'KEN - Region 1', 'UGA - Region 0']
+    model_data = pd.concat({region: _region_data(seed=i) for i, region in enumerate(regions)},
+                           names=['matched_admin1_id'])
+    trained, failing = [], {'UGA - Region 0'}
+
+    def train_and_evaluate_model(region_data, target_event, region_name=None):
+        if region_name in failing:
+            raise RuntimeError("interrupted")
+        trained.append((region_name, target_event))
+        return 1.0, 10.0
+
+    # Threads share the patched trainer, worker processes would not
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(batch, "train_and_evaluate_model", train_and_evaluate_model)
+    results_path = str(tmp_path / "metrics.csv")
+
+    first = batch.run_batch(model_data, regions, ['Battles'], workers=2, results_path=results_path)
+    assert set(first['region']) == {'KEN - Region 0', 'KEN - Region 1'}
+
+    # The resumed run trains the failed region and the new target only
+    trained.clear()
+    failing.clear()
+    metrics = batch.run_batch(model_data, regions, ['Battles', 'Riots'], workers=2, results_path=results_path)
+    assert sorted(trained) == [('KEN - Region 0', 'Riots'), ('KEN - Region 1', 'Riots'),
+                               ('UGA - Region 0', 'Battles'), ('UGA - Region 0', 'Riots')]
+    assert list(metrics.columns) == batch.METRICS_COLUMNS
+    assert len(metrics) == 6 and not metrics.duplicated(['region', 'target']).any()
+
+
+def _panel(lengths):
+    return pd.concat({region: _region_data(months=months, seed=i)
+                      for i, (region, months) in enumerate(lengths.items())},
+                     names=['matched_admin1_id'])
+
+
+def test_pooled_split_and_encodings_use_training_rows_only():
+    from models import pooled_model
+
+    model_data = _panel({'KEN - Region 0': 36, 'KEN - Region 1': 30, 'UGA - Region 0': 40})
+    train_data, test_data = pooled_model.split_panel(model_data, test_months=6)
+    # Same held-out rows as the per-region model's split
+    for region in ['KEN - Region 0', 'KEN - Region 1', 'UGA - Region 0']:
+        region_data = model_data.loc[region]
+        pd.testing.assert_frame_equal(test_data.loc[region], region_data.iloc[-6:])
+        pd.testing.assert_frame_equal(train_data.loc[region], region_data.iloc[:-6])
+
+    train, test, n_countries = pooled_model.add_region_encodings(train_data, test_data, 'Battles')
+    assert n_countries == 2
+    assert set(test['country_code']) == {0, 1}
+    region_means = train_data['Battles'].groupby(level='matched_admin1_id').mean()
+    np.testing.assert_allclose(test['region_target_mean'],
+                               test.index.get_level_values('matched_admin1_id').map(region_means))
+
+    # Held-out targets never reach the encodings
+    leaked = test_data.copy()
+    leaked['Battles'] += 100
+    _, leaked_test, _ = pooled_model.add_region_encodings(train_data, leaked, 'Battles')
+    pd.testing.assert_frame_equal(leaked_test[pooled_model.ENCODING_FEATURES], test[pooled_model.ENCODING_FEATURES])
+
+
+def test_pooled_model_reports_every_region():
+    from models import pooled_model
+
+    model_data = _panel({'KEN - Region 0': 36, 'KEN - Region 1': 30, 'UGA - Region 0': 40})
+    for model_type in ('hgb', 'rf'):
+        metrics = pooled_model.train_and_evaluate_pooled_model(model_data, 'Battles', model_type=model_type)
+        assert list(metrics.columns) == ['region', 'target', 'mae', 'mape']
+        assert sorted(metrics['region']) == ['KEN - Region 0', 'KEN - Region 1', 'UGA - Region 0']
+        assert (metrics['target'] == 'Battles').all()
+        assert metrics[['mae', 'mape']].notna().all().all()
+    with pytest.raises(ValueError):
+        pooled_model.train_and_evaluate_pooled_model(model_data, 'Battles', model_type='xgb')
@@ -0,0 +1,453 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def test_merge_chunk_responses_uses_the_label_rule():
+    logic_parser = pytest.importorskip("logic_parser")
+
+    assert logic_parser.merge_chunk_responses(["no", " No "]) == "no"
+    # Any chunk that is not a bare "no" is positive, as for whole responses
+    assert logic_parser.merge_chunk_responses(["no", "Events:\nKEN,protest", "yes\nKEN,riot"]) == "yes\nKEN,protest\nKEN,riot"
+
+
+def test_extractor_chunks_packs_and_reasks_missing_articles():
+    logic_parser = pytest.importorskip("logic_parser")
+
+    class DroppingBackend(logic_parser.StubBackend):
+        """Answers 'yes' for text mentioning a protest and leaves the last article of a pack out."""
+
+        def __init__(self):
+            super().__init__()
+            self.prompts = []
+
+        async def complete(self, instruction, prompt):
+            self.prompts.append(prompt)
+            parts = re.split(r"^### ARTICLE (\d+)\s*$", prompt, flags=re.MULTILINE)
+            if len(parts) == 1:
+                return self.answer(prompt), 0, 0
+            articles = list(zip(parts[1::2], parts[2::2]))[:-1]
+            return "\n".join(f"### ARTICLE {number}\n{self.answer(text)}" for number, text in articles), 0, 0
+
+        @staticmethod
+        def answer(text):
+            return "Found\nKEN,protest" if "protest" in text else "no"
+
+    paragraph = "Quiet day in the capital with nothing much to report. " * 3
+    other_paragraph = "Traffic was light on the roads into the city today. " * 3
+    items = [
+        {"id": "long", "instruction": "extract", "query": "Q:", "text": f"{paragraph}\n{other_paragraph}\nA protest in Nairobi."},
+        {"id": "short-1", "instruction": "extract", "query": "Q:", "text": "A protest in Mombasa."},
+        {"id": "short-2", "instruction": "extract", "query": "Q:", "text": "Markets were calm."},
+    ]
+    backend = DroppingBackend()
+    extractor = logic_parser.LLMExtractor(backend, max_chunk_tokens=logic_parser.count_tokens(paragraph) + 5,
+                                          max_request_tokens=10_000)
+    results = extractor.extract_all(items)
+
+    assert results == {"long": "yes\nKEN,protest", "short-1": "Found\nKEN,protest", "short-2": "no"}
+    # The chunks of the long article and both short articles go out in one packed request,
+    # the article the backend left out is then asked for on its own
+    packed, *single = backend.prompts
+    assert packed.count("### ARTICLE") == 5
+    assert single == ["Q: Markets were calm."]
+
+
+class _FakeChrome:
+    """Stands in for selenium's Chrome driver: every page has a long body text."""
+
+    started = 0
+    quit_count = 0
+    start_failures = 0
+
+    def __init__(self, options=None):
+        if _FakeChrome.start_failures:
+            _FakeChrome.start_failures -= 1
+            raise RuntimeError("chromedriver missing")
+        _FakeChrome.started += 1
+        self.url = None
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def get(self, url):
+        self.url = url
+
+    def find_element(self, by, value):
+        class Element:
+            text = f"Text of {self.url}. " + "Lorem ipsum dolor sit amet. " * 40
+        return Element()
+
+    def quit(self):
+        _FakeChrome.quit_count += 1
+
+
+@pytest.fixture
+def fake_chrome(monkeypatch):
+    news_boy = pytest.importorskip("news_boy")
+    monkeypatch.setattr(_FakeChrome, "started", 0)
+    monkeypatch.setattr(_FakeChrome, "quit_count", 0)
+    monkeypatch.setattr(_FakeChrome, "start_failures", 0)
+    monkeypatch.setattr(news_boy.webdriver, "Chrome", _FakeChrome)
+    monkeypatch.setattr(news_boy.time, "sleep", lambda seconds: None)
+    return _FakeChrome
+
+
+def test_browser_pool_keeps_browsers_across_batches(fake_chrome):
+    from news_boy import BrowserPool
+
+    pool = BrowserPool(workers=2)
+    first = pool.fetch_all([f"https://example.com/{i}" for i in range(6)])
+    started = fake_chrome.started
+    second = pool.fetch_all([f"https://example.com/{i}" for i in range(6, 12)])
+    assert all(text.startswith("Text of https://example.com/") for text in {**first, **second}.values())
+    # The second batch reuses the running browsers (a worker with nothing left to take may not have started one)
+    assert 1 <= started <= 2 and fake_chrome.started <= 2 and fake_chrome.quit_count == 0
+    pool.close()
+    assert fake_chrome.quit_count == fake_chrome.started
+
+
+def test_browser_pool_requeues_urls_when_chrome_fails_to_start(fake_chrome):
+    from news_boy import BrowserPool
+
+    fake_chrome.start_failures = 2
+    with BrowserPool(workers=1, start_retries=2) as pool:
+        results = pool.fetch_all(["https://example.com/a", "https://example.com/b"])
+    assert all(text is not None for text in results.values()) and len(results) == 2
+
+    # A browser that never starts leaves its URLs unfetched instead of hanging or crashing
+    fake_chrome.start_failures = 100
+    with BrowserPool(workers=2, start_retries=1) as pool:
+        assert pool.fetch_all(["https://example.com/c", "https://example.com/d"]) == {
+            "https://example.com/c": None, "https://example.com/d": None}
+
+
+def test_tiered_fetcher_tries_cache_then_http_then_browsers(fake_chrome, monkeypatch, tmp_path):
+    httpx = pytest.importorskip("httpx")
+    article_fetcher = pytest.importorskip("article_fetcher")
+    import news_boy
+    from content_cache import ContentCache
+
+    long_text = "Lorem ipsum dolor sit amet. " * 40
+    pages = {
+        "https://example.com/static": (200, f"Static page. {long_text}"),
+        "https://example.com/script": (200, "Enable JavaScript"),
+        "https://example.com/blocked": (403, "Forbidden"),
+    }
+    requested, rendered = [], []
+
+    def handler(request):
+        requested.append(str(request.url))
+        status, body = pages[str(request.url)]
+        return httpx.Response(status, text=body)
+
+    class MockClient(httpx.AsyncClient):
+        def __init__(self, **kwargs):
+            super().__init__(transport=httpx.MockTransport(handler), **kwargs)
+
+    class RecordingChrome(fake_chrome):
+        def get(self, url):
+            rendered.append(url)
+            super().get(url)
+
+    monkeypatch.setattr(article_fetcher.httpx, "AsyncClient", MockClient)
+    monkeypatch.setattr(article_fetcher, "extract_text", lambda url, html: html)
+    monkeypatch.setattr(news_boy.webdriver, "Chrome", RecordingChrome)
+
+    cache = ContentCache(str(tmp_path / "cache.sqlite"))
+    cache.put("https://example.com/cached", f"Cached page. {long_text}", "http")
+    urls = ["https://example.com/cached"] + list(pages)
+    with article_fetcher.TieredFetcher(min_text_length=500, browser_workers=1, cache=cache) as fetcher:
+        results = fetcher.fetch_all(urls)
+
+        # Cached pages skip both tiers, only pages with too little text reach the browsers
+        assert sorted(requested) == sorted(pages)
+        assert sorted(rendered) == ["https://example.com/blocked", "https://example.com/script"]
+        assert results["https://example.com/cached"].startswith("Cached page.")
+        assert results["https://example.com/static"].startswith("Static page.")
+        assert results["https://example.com/script"].startswith("Text of https://example.com/script")
+        assert results["https://example.com/blocked"].startswith("Text of https://example.com/blocked")
+        assert {tier: stats["attempts"] for tier, stats in fetcher.stats.summary().items()} == {
+            "cache": 1, "http": 3, "browser": 2}
+
+        # Every tier stored its pages, so a second pass fetches nothing
+        requested.clear()
+        rendered.clear()
+        assert fetcher.fetch_all(urls) == results
+        assert requested == [] and rendered == []
+    assert cache.get("https://example.com/static")["method"] == "http"
+    assert cache.get("https://example.com/script")["method"] == "selenium"
+
+def test_token_bucket_allows_the_burst_then_the_rate(monkeypatch):
+    query_scheduler = pytest.importorskip("query_scheduler")
+
+    clock = [100.0]
+    monkeypatch.setattr(query_scheduler.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(query_scheduler.time, "sleep", lambda seconds: clock.__setitem__(0, clock[0] + seconds))
+
+    bucket = query_scheduler.TokenBucket(rate=2.0, capacity=5)
+    acquired_at = []
+    for _ in range(25):
+        bucket.acquire()
+        acquired_at.append(clock[0] - 100.0)
+    # The first 'capacity' tokens are free, every further one waits 1 / rate
+    np.testing.assert_allclose(acquired_at[:5], 0.0)
+    np.testing.assert_allclose(acquired_at[5:], np.arange(1, 21) / 2.0)
+
+    # Idle time refills the bucket, but never beyond its capacity
+    clock[0] += 60
+    start = clock[0]
+    for _ in range(6):
+        bucket.acquire()
+    assert clock[0] - start == pytest.approx(0.5)
+
+
+def test_query_scheduler_resumes_from_checkpoint(monkeypatch, tmp_path):
+    query_scheduler = pytest.importorskip("query_scheduler")
+    from dedup import URLDeduplicator
+
+    searched, failing = [], {"riot Kampala"}
+
+    class FakeGNewsFetcher:
+        def __init__(self, country, **kwargs):
+            self.country = country
+
+        def get_news(self, search):
+            if search in failing:
+                raise RuntimeError("429 Too Many Requests")
+            searched.append((self.country, search))
+            return [{"url": f"https://news.example/{self.country}/{search.replace(' ', '-')}", "title": search}]
+
+    monkeypatch.setattr(query_scheduler, "GNewsFetcher", FakeGNewsFetcher)
+    monkeypatch.setattr(query_scheduler.time, "sleep", lambda seconds: None)
+    queries = [{"country": country, "search": f"{event} {city}"}
+               for country, city in (("KE", "Nairobi"), ("UG", "Kampala")) for event in ("protest", "riot")]
+    checkpoint_path = str(tmp_path / "checkpoint.jsonl")
+
+    def run():
+        scheduler = query_scheduler.QueryScheduler(workers=2, rate=1000, max_retries=1, checkpoint_path=checkpoint_path)
+        return scheduler, scheduler.run(queries, URLDeduplicator())
+
+    scheduler, _ = run()
+    assert scheduler.failed == [{"country": "UG", "search": "riot Kampala"}]
+    assert sorted(searched) == [("KE", "protest Nairobi"), ("KE", "riot Nairobi"), ("UG", "protest Kampala")]
+    # A run killed mid-write leaves a partial line behind
+    with open(checkpoint_path, "a", encoding="utf-8") as f:
+        f.write('{"country": "UG", "sea')
+
+    searched.clear()
+    failing.clear()
+    scheduler, articles = run()
+    assert searched == [("UG", "riot Kampala")]
+    assert [(article["country"], article["search"]) for article in articles] == [
+        (query["country"], query["search"]) for query in queries]
+    # A complete run removes its checkpoint
+    assert not os.path.exists(checkpoint_path)
+
+def _labelled_articles(n_articles, seed):
+    rng = np.random.default_rng(seed)
+    relevant = ["Police fired tear gas at protesters in {city}, {country}.", "Armed clashes left several dead near {city}, {country}.",
+                "Rioters set fire to shops in {city}, {country}, after the vote."]
+    irrelevant = ["The {country} central bank held interest rates in {city}.", "A new football stadium opened in {city}, {country}.",
+                  "Farmers in {city}, {country} expect a good maize harvest."]
+    articles, labels = [], []
+    for i in range(n_articles):
+        country, city = [("Kenya", "Nairobi"), ("Uganda", "Kampala"), ("Sudan", "Khartoum")][rng.integers(3)]
+        label = bool(rng.integers(2))
+        template = (relevant if label else irrelevant)[rng.integers(3)]
+        articles.append({"url": f"https://news.example/{seed}/{i}", "country": country, "title": f"News from {city}",
+                         "full_text": template.format(city=city, country=country) + f" Report {i}."})
+        labels.append(label)
+    return articles, labels
+
+
+def test_relevance_filter_trains_saves_and_reloads(tmp_path):
+    relevance_filter = pytest.importorskip("relevance_filter")
+
+    metrics = ["protest", "riot", "armed clash"]
+    paths = dict(model_path=str(tmp_path / "model.pkl"), labels_path=str(tmp_path / "labels.jsonl"))
+    model = relevance_filter.RelevanceFilter(metrics, min_labels=100, **paths)
+    train_articles, train_labels = _labelled_articles(300, seed=0)
+    test_articles, test_labels = _labelled_articles(100, seed=1)
+
+    # Keyword rule until enough labels are stored
+    assert model.score([{"country": "Kenya", "full_text": "A riot broke out in Kenya."},
+                        {"country": "Kenya", "full_text": "A riot broke out in Uganda."}]).tolist() == [1.0, 0.0]
+    model.record_labels(train_articles[:50], train_labels[:50])
+    assert not model.train() and model.classifier is None
+
+    model.record_labels(train_articles[50:], train_labels[50:])
+    assert model.train()
+    scores = model.score(test_articles)
+    assert ((scores >= 0.5) == np.array(test_labels)).mean() > 0.9
+
+    # A new filter loads the saved classifier and scores the same
+    reloaded = relevance_filter.RelevanceFilter(metrics, **paths)
+    np.testing.assert_allclose(reloaded.score(test_articles), scores)
+
+    reloaded.threshold, reloaded.audit_rate = 0.5, 0.0
+    to_send, skipped = reloaded.split([dict(article) for article in test_articles])
+    assert len(to_send) + len(skipped) == len(test_articles)
+    assert all(article["relevance_passed"] for article in to_send)
+    assert not any(article["relevance_passed"] for article in skipped)
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_article_sink_round_trip(tmp_path, compress):
+    article_sink = pytest.importorskip("article_sink")
+    if compress:
+        pytest.importorskip("zstandard")
+
+    articles = [{"url": f"https://news.example/{i}", "country": country, "title": f"Über Unruhen {i}",
+                 "published date": f"Mon, {day:02d} {month} 2024 08:00:00 GMT"}
+                for i, (country, day, month) in enumerate([("Kenya", 1, "Jan"), ("South Sudan", 5, "Jan"), ("Kenya", 3, "Feb"),
+                                                           ("Kenya", 9, "Jan"), ("South Sudan", 7, "Feb"), ("Kenya", 2, "Jan")])]
+    articles.append({"url": "https://news.example/undated", "country": "Kenya", "title": "No date"})
+    # Fewer open files than shards, so shards are closed and appended to again
+    with article_sink.ArticleSink(root=str(tmp_path), compress=compress, run_id="run1", max_open_files=2) as sink:
+        for article in articles:
+            sink.write(article)
+    with article_sink.ArticleSink(root=str(tmp_path), compress=compress, run_id="run2") as sink:
+        sink.write({"url": "https://news.example/later", "country": "Kenya", "published date": "Tue, 02 Jan 2024 08:00:00 GMT"})
+
+    def urls(**filters):
+        return sorted(article["url"] for article in article_sink.iter_articles(str(tmp_path), **filters))
+
+    assert sorted(map(str, article_sink.iter_articles(str(tmp_path), run_id="run1"))) == sorted(map(str, articles))
+    assert urls(countries=["South Sudan"]) == ["https://news.example/1", "https://news.example/4"]
+    assert urls(countries=["Kenya"], months=["2024-01"]) == [
+        "https://news.example/0", "https://news.example/3", "https://news.example/5", "https://news.example/later"]
+    assert urls(months=["unknown"]) == ["https://news.example/undated"]
+    assert urls(run_id="run2") == ["https://news.example/later"]
+
+    # A writer killed mid-article only loses that article
+    path = article_sink.shard_path(str(tmp_path), "Kenya", "2024-01", "run1", compress)
+    with open(path, "ab") as f:
+        line = b'{"url": "https://news.example/partial", "country": "Kenya"}\n'
+        f.write(article_sink.zstandard.ZstdCompressor().compress(line)[:-5] if compress else line[:20])
+    assert urls(countries=["Kenya"], months=["2024-01"], run_id="run1") == [
+        "https://news.example/0", "https://news.example/3", "https://news.example/5"]
+
+def _cell_by_cell_tables(data, metrics, countries):
+    # The per-cell metric tables save_to_csv built before the event array
+    from dateutil import parser
+
+    all_dates = [parser.parse(date_str).replace(day=1) for row in data for date_str in row[2:]]
+    all_months_str = [d.strftime("%m-%Y") for d in pd.date_range(start=min(all_dates), end=max(all_dates), freq='MS')]
+    tables = {}
+    for metric in metrics:
+        df_metric = pd.DataFrame(0, index=countries, columns=all_months_str)
+        for row in data:
+            country, row_metric, *dates = row
+            if row_metric != metric:
+                continue
+            for date_str in dates:
+                month_str = parser.parse(date_str).strftime("%m-%Y")
+                if month_str in df_metric.columns:
+                    df_metric.loc[country, month_str] = 1
+        tables[metric] = df_metric.reset_index().rename(columns={"index": "country"})
+    return tables
+
+
+def _event_rows(n_rows, seed, years):
+    rng = np.random.default_rng(seed)
+    countries, metrics = ["Kenya", "Uganda", "Sudan"], ["coup", "election", "economic crisis"]
+    return [[countries[rng.integers(3)], metrics[rng.integers(3)]]
+            + [f"{rng.integers(1, 29)} {month} {rng.choice(years)}" for month in rng.choice(["Jan", "Mar", "Jun", "Nov"], rng.integers(1, 4))]
+            for _ in range(n_rows)]
+
+
+def test_event_tables_match_cell_by_cell_tables(tmp_path):
+    import importlib.util
+
+    # 'utils' on the path is the forecast model's package, load the scraper's module by file
+    spec = importlib.util.spec_from_file_location(
+        "scraping_utils", os.path.join(os.path.dirname(__file__), os.pardir, "src", "scraping", "utils.py"))
+    utils = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(utils)
+
+    metrics, countries = ["coup", "election", "economic crisis"], ["Kenya", "Uganda", "Sudan"]
+    runs = [_event_rows(200, seed=0, years=[2021, 2022]), _event_rows(150, seed=1, years=[2022, 2023])]
+
+    paths = utils.save_to_csv(runs[0], metrics, countries, output_dir=str(tmp_path / "single"))
+    expected = _cell_by_cell_tables(runs[0], metrics, countries)
+    for metric, path in zip(metrics, paths):
+        pd.testing.assert_frame_equal(pd.read_csv(path), expected[metric], check_dtype=False)
+
+    # Runs saved separately and combined equal the tables of all rows at once
+    output_dir = tmp_path / "runs"
+    output_dir.mkdir()
+    for run, timestamp in zip(runs, ["2024-01-01_00-00-00", "2024-02-01_00-00-00"]):
+        for metric, table in _cell_by_cell_tables(run, metrics, countries).items():
+            table.to_csv(output_dir / f"{metric.replace(' ', '_')}_{timestamp}.csv", index=False)
+    combined = utils.combine_event_tables(output_dir=str(output_dir))
+    expected = _cell_by_cell_tables(runs[0] + runs[1], metrics, countries)
+    assert sorted(os.path.basename(path) for path in combined) == [
+        "coup_combined.csv", "economic_crisis_combined.csv", "election_combined.csv"]
+    for metric in metrics:
+        result = pd.read_csv(output_dir / f"{metric.replace(' ', '_')}_combined.csv", dtype={"country": str})
+        pd.testing.assert_frame_equal(result.sort_values("country", ignore_index=True),
+                                      expected[metric].sort_values("country", ignore_index=True), check_dtype=False)
+
+def test_canonicalize_url_normalizes_tracking_fragments_host_and_slashes():
+    dedup = pytest.importorskip("dedup")
+
+    canonical = "https://example.com/news/story?id=7&page=2"
+    for url in [
+        "https://example.com/news/story?id=7&page=2",
+        "http://WWW.Example.com/news/story/?page=2&id=7",
+        "https://m.example.com/news/story?id=7&page=2&utm_source=twitter&utm_medium=social#comments",
+        "https://www.example.com:443/news/story/amp?fbclid=abc&id=7&page=2&gclid=x",
+        " https://amp.example.com/news/story/?id=7&ref=home&page=2 ",
+    ]:
+        assert dedup.canonicalize_url(url) == canonical, url
+    assert dedup.canonicalize_url("https://example.com/") == dedup.canonicalize_url("https://www.example.com")
+    # Parameters that select content are kept
+    assert dedup.canonicalize_url("https://example.com/story?id=8") != dedup.canonicalize_url("https://example.com/story?id=7")
+
+    seen = dedup.URLDeduplicator(["https://www.example.com/a/?utm_campaign=x"])
+    assert "http://example.com/a#top" in seen
+    assert not seen.add("https://example.com/a")
+    assert seen.add("https://example.com/b") and len(seen) == 2
+
+
+def test_simhash_index_separates_near_duplicates_from_different_texts():
+    dedup = pytest.importorskip("dedup")
+
+    rng = np.random.default_rng(0)
+    vocabulary = [f"word{i}" for i in range(2_000)]
+    story = " ".join(rng.choice(vocabulary, 1_200))
+    # A syndicated copy: same story with a different byline and one sentence edited
+    copy = "By Wire Staff. " + story.replace(story.split()[200], "protesters", 1) + " Reporting by agencies."
+    other = " ".join(rng.choice(vocabulary, 1_200))
+
+    def distance(a, b):
+        return bin(dedup.simhash(a) ^ dedup.simhash(b)).count("1")
+
+    assert distance(story, copy) <= 3
+    assert distance(story, other) > 3
+
+    index = dedup.SimHashIndex(max_distance=3)
+    assert index.add("original", story) is None
+    assert index.add("copy", copy) == "original"
+    assert index.add("other", other) is None
+    assert index.find(copy) == "original" and index.find(other) == "other"
+    assert set(index.fingerprints) == {"original", "other"}
+
+
+def test_simhash_index_finds_every_fingerprint_within_the_threshold():
+    dedup = pytest.importorskip("dedup")
+
+    rng = np.random.default_rng(1)
+    index = dedup.SimHashIndex(max_distance=4)
+    base = int(rng.integers(0, 2 ** 63))
+    index.fingerprints["base"] = base
+    for band_key in index._band_keys(base):
+        index.buckets[band_key].append("base")
+    for flips in range(9):
+        fingerprint = base
+        for bit in rng.choice(64, flips, replace=False):
+            fingerprint ^= 1 << int(bit)
+        assert (index._find_fingerprint(fingerprint) == "base") == (flips <= 4), flips